@@ -10,11 +10,19 @@ from dragonfly.windows.window import Window
 
 logging.basicConfig(format = "%(asctime)s : %(levelname)s : %(funcName)s\n%(msg)s")   
 
+from castervoice.lib.ctrl import lifecycle_profiler  # requires nothing
+_PROFILER = lifecycle_profiler.get_instance()
+_STARTUP_START = _PROFILER.now()
+
 from castervoice.lib import settings  # requires toml
 settings.initialize()
+if settings.SETTINGS["miscellaneous"]["lifecycle_profiler"]:
+    _PROFILER.enable()
+_PROFILER.add_span("settings", "startup", _STARTUP_START, _PROFILER.now())
 
 from castervoice.lib.ctrl.dependencies import DependencyMan  # requires nothing
-DependencyMan().initialize()
+with _PROFILER.span("dependencies", "startup"):
+    DependencyMan().initialize()
 _NEXUS = None
 
 class LoggingHandler(logging.Handler):
@@ -54,13 +62,24 @@ from castervoice.lib import control
 if control.nexus() is None:
     from castervoice.lib.ctrl.mgr.loading.load.content_loader import ContentLoader
     from castervoice.lib.ctrl.mgr.loading.load.content_request_generator import ContentRequestGenerator
-    _crg = ContentRequestGenerator()
+    _scan_manifest = None
+    if settings.SETTINGS["miscellaneous"]["content_scan_manifest"]:
+        from castervoice.lib.ctrl.mgr.loading.load.content_scan_manifest import ContentScanManifest
+        _scan_manifest = ContentScanManifest(settings.SETTINGS["paths"]["CONTENT_MANIFEST_PATH"])
+    _rule_metadata_extractor = None
+    if settings.SETTINGS["miscellaneous"]["lazy_rule_loading"]:
+        from castervoice.lib.ctrl.mgr.loading.load.rule_metadata_extractor import RuleMetadataExtractor
+        _rule_metadata_extractor = RuleMetadataExtractor()
+    _crg = ContentRequestGenerator(_scan_manifest, _rule_metadata_extractor)
     _content_loader = ContentLoader(_crg)
-    control.init_nexus(_content_loader)
+    with _PROFILER.span("nexus", "startup"):
+        control.init_nexus(_content_loader)
 
 if settings.SETTINGS["sikuli"]["enabled"]:
     from castervoice.asynch.sikuli import sikuli_controller
     sikuli_controller.get_instance().bootstrap_start_server_proxy()
+_PROFILER.add_span("caster", "startup", _STARTUP_START, _PROFILER.now())
+_PROFILER.report("startup")
 print("\n*- Starting " + settings.SOFTWARE_NAME + " -*")
 if settings.WSR:
     get_engine().recognize_forever()
@@ -37,3 +37,24 @@ COMPANION_STARTER = {
     "EclipseCCR": ["EclipseRule"],
     "VSCodeCcrRule": ["VSCodeNonCcrRule"]
 }
+
+CCR_PARTITIONS_STARTER = {
+    "Bash": ["*.sh", "*.bash"],
+    "CPP": ["*.cpp", "*.cc", "*.cxx", "*.c", "*.h", "*.hpp"],
+    "CSharp": ["*.cs"],
+    "Dart": ["*.dart"],
+    "Go": ["*.go"],
+    "HTML": ["*.html", "*.htm"],
+    "Haxe": ["*.hx"],
+    "Java": ["*.java"],
+    "Javascript": ["*.js", "*.jsx", "*.ts", "*.tsx"],
+    "LaTeX": ["*.tex"],
+    "Markdown": ["*.md"],
+    "Matlab": ["*.m"],
+    "Prolog": ["*.pl", "*.pro"],
+    "Python": ["*.py", "*.pyw"],
+    "Rlang": ["*.r", "*.rmd"],
+    "Rust": ["*.rs"],
+    "SQL": ["*.sql"],
+    "VHDL": ["*.vhd", "*.vhdl"]
+}
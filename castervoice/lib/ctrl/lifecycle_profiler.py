@@ -0,0 +1,186 @@
+import os
+import threading
+import timeit
+
+from castervoice.lib import printer
+
+
+class _Span(object):
+    def __init__(self, profiler, name, category, args):
+        self._profiler = profiler
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = None
+
+    def __enter__(self):
+        self._start = self._profiler.now()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._profiler.add_span(self._name, self._category, self._start, self._profiler.now(), self._args)
+        return False
+
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class LifecycleProfiler(object):
+    """
+    Records nested, timed spans of Caster's startup (settings, dependencies,
+    content scanning, module imports, rule registration, the initial merge,
+    grammar loads) and of each reload, and exports them as Chrome trace
+    events (chrome://tracing, Perfetto, speedscope) plus a table of the
+    slowest spans.
+
+    Spans nest by time: a span which starts and ends within another is its
+    child. Settings decide whether profiling is on, and settings have to be
+    loaded first, so spans may also be added after the fact (add_span) from
+    times taken with now() before the profiler was enabled.
+
+    While disabled, span() returns a shared no-op context manager.
+    """
+
+    def __init__(self, clock=timeit.default_timer):
+        self._clock = clock
+        self._origin = clock()
+        self._enabled = False
+        self._events = []
+        self._reported_event_count = 0
+
+    def enable(self):
+        self._enabled = True
+
+    def is_enabled(self):
+        return self._enabled
+
+    def now(self):
+        return self._clock()
+
+    def span(self, name, category, args=None):
+        """
+        Times a block:  with profiler.span("name", "category"): ...
+
+        :param name: str, what is being done, e.g. a module or rule name
+        :param category: str, the kind of step, e.g. "import"
+        :param args: dict of extra information to show with the span, or None
+        :return: context manager
+        """
+        if not self._enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def add_span(self, name, category, start, end, args=None):
+        """
+        Records a span which has already ended.
+
+        :param start: float, from now()
+        :param end: float, from now()
+        """
+        if not self._enabled:
+            return
+        # rounding both ends the same way keeps children within their parents
+        start_us = int(round((start - self._origin) * 1000000))
+        end_us = int(round((end - self._origin) * 1000000))
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start_us,
+            "dur": end_us - start_us,
+            "pid": os.getpid(),
+            "tid": threading.current_thread().ident
+        }
+        if args:
+            event["args"] = args
+        self._events.append(event)
+
+    def get_trace_events(self):
+        """
+        :return: list of Chrome "complete" (ph X) trace events, times in microseconds
+        """
+        return list(self._events)
+
+    def get_slowest_spans(self, count, events=None):
+        """
+        :param count: max number of spans to return
+        :param events: trace events to rank, or None for all of them
+        :return: list of (self microseconds, total microseconds, event), slowest self time first;
+                 self time is the span's time not spent in its child spans
+        """
+        events = self._events if events is None else events
+        self_times = LifecycleProfiler._get_self_times(events)
+        ranked = [(self_times[i], event["dur"], event) for i, event in enumerate(events)]
+        ranked.sort(key=lambda r: (-r[0], -r[1]))
+        return ranked[:count]
+
+    def get_summary(self, count=15, events=None):
+        """
+        :return: str, a table of the slowest spans
+        """
+        lines = ["{:>10}{:>10}  {:<14}{}".format("self ms", "total ms", "category", "name")]
+        for self_us, total_us, event in self.get_slowest_spans(count, events):
+            lines.append("{:>10.1f}{:>10.1f}  {:<14}{}".format(
+                self_us / 1000.0, total_us / 1000.0, event["cat"], event["name"]))
+        return "\n".join(lines)
+
+    def report(self, label):
+        """
+        If enabled, writes all spans so far to the trace file and prints the
+        slowest of the spans recorded since the last report.
+
+        :param label: str, what is being reported, e.g. "startup"
+        """
+        if not self._enabled:
+            return
+        # imported here so that importing the profiler doesn't add to what it times
+        from castervoice.lib import settings, utilities
+        path = settings.settings(["paths", "LIFECYCLE_TRACE_PATH"])
+        utilities.save_json_file({"traceEvents": self._events, "displayTimeUnit": "ms"}, path)
+        new_events = self._events[self._reported_event_count:]
+        self._reported_event_count = len(self._events)
+        printer.out("Lifecycle profile of {} (trace: {}):\n{}".format(
+            label, path, self.get_summary(events=new_events)))
+
+    @staticmethod
+    def _get_self_times(events):
+        """
+        :return: list of the self time of each event, in microseconds
+        """
+        self_times = [event["dur"] for event in events]
+        # parents start first, or at the same time and last longer
+        order = sorted(range(len(events)),
+                       key=lambda i: (events[i]["tid"], events[i]["ts"], -events[i]["dur"]))
+        open_spans = []  # indices of the spans enclosing the current one
+        for i in order:
+            event = events[i]
+            while open_spans and not LifecycleProfiler._encloses(events[open_spans[-1]], event):
+                open_spans.pop()
+            if open_spans:
+                self_times[open_spans[-1]] -= event["dur"]
+            open_spans.append(i)
+        return [max(t, 0) for t in self_times]
+
+    @staticmethod
+    def _encloses(parent, child):
+        return parent["tid"] == child["tid"] and \
+               parent["ts"] <= child["ts"] and \
+               child["ts"] + child["dur"] <= parent["ts"] + parent["dur"]
+
+
+_INSTANCE = None
+
+
+def get_instance():
+    global _INSTANCE
+    if _INSTANCE is None:
+        _INSTANCE = LifecycleProfiler()
+    return _INSTANCE
@@ -1,4 +1,4 @@
-from dragonfly import MappingRule, Function
+from dragonfly import Choice, Compound, Function, MappingRule, Repetition
 
 from castervoice.lib.ctrl.mgr.errors.no_pronunciation_error import NoPronunciationError
 from castervoice.lib.ctrl.mgr.rule_details import RuleDetails
@@ -10,10 +10,13 @@ class GrammarActivator(object):
     and deactivating rules. It is stateful.
     """
 
+    _MAX_BATCH_SIZE = 8
+
     def __init__(self, merge_rule_checker_fn):
         self._class_name_to_trigger = {}
         self._activation_rule_class = None
         self._activation_fn = None
+        self._batch_activation_fn = None
         self._merge_rule_checker_fn = merge_rule_checker_fn
 
     def set_activation_fn(self, activation_fn):
@@ -25,20 +28,33 @@ class GrammarActivator(object):
         """
         self._activation_fn = activation_fn
 
+    def set_batch_activation_fn(self, batch_activation_fn):
+        """
+        Like the de/activator function, but for "enable X and Y and Z". It takes:
+        rcns_and_active: list of (rule class name, boolean)
+        """
+        self._batch_activation_fn = batch_activation_fn
+
     def register_rule(self, managed_rule):
         """
         register or re-register a rule;
         the "trigger" is what the rule is called when you say "enabled X" or "disable X"
         """
         trigger = self._get_trigger(managed_rule)
-        self._class_name_to_trigger[managed_rule.get_rule_class_name()] = trigger
+        self.register_trigger(managed_rule.get_rule_class_name(), trigger)
+
+    def register_trigger(self, rule_class_name, trigger):
+        """
+        register or re-register a rule by its trigger alone, e.g. for a rule which hasn't been imported yet
+        """
+        self._class_name_to_trigger[rule_class_name] = trigger
 
     def _get_trigger(self, managed_rule):
         """
         Ideally we're dealing with a MergeRule and the trigger is its pronunciation. But since
         GrammarManager also manages pure Dragonfly rules, we might need to derive the name otherwise.
         """
-        rule_instance = managed_rule.get_rule_instance()
+        rule_instance = managed_rule.peek_rule_instance()
         if self._merge_rule_checker_fn(rule_instance):
             return rule_instance.get_pronunciation()
         if managed_rule.get_details().name is not None:
@@ -61,8 +77,21 @@ class GrammarActivator(object):
             _mapping[enable_spec] = Function(lambda rcn: self._activation_fn(rcn, True), rcn=class_name)
             _mapping[disable_spec] = Function(lambda rcn: self._activation_fn(rcn, False), rcn=class_name)
 
+        _extras = []
+        if self._batch_activation_fn is not None and len(self._class_name_to_trigger) > 1:
+            triggers = {trigger: class_name for class_name, trigger in self._class_name_to_trigger.items()}
+            more_rules = Compound(spec="and <next_rule>", extras=[Choice("next_rule", triggers)],
+                                  value_func=lambda node, extras: extras["next_rule"])
+            _extras = [Choice("rule", triggers),
+                       Repetition(more_rules, min=1, max=GrammarActivator._MAX_BATCH_SIZE, name="more_rules")]
+            _mapping["enable <rule> <more_rules>"] = Function(
+                lambda rule, more_rules: self._batch_activation_fn([(rcn, True) for rcn in [rule] + more_rules]))
+            _mapping["disable <rule> <more_rules>"] = Function(
+                lambda rule, more_rules: self._batch_activation_fn([(rcn, False) for rcn in [rule] + more_rules]))
+
         class GrammarActivatorRule(MappingRule):
             mapping = _mapping
+            extras = _extras
         self._activation_rule_class = GrammarActivatorRule
 
         # name that should be pretty difficult to say by mistake:
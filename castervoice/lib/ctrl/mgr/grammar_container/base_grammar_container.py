@@ -6,8 +6,27 @@ class BaseGrammarContainer(object):
     def set_non_ccr(self, rcn, grammar):
         raise DontUseBaseClassError(self)
 
-    def set_ccr(self, ccr_grammars):
+    def set_ccr(self, ccr_grammars, fingerprints=None):
+        """
+        :param ccr_grammars: list of Grammar
+        :param fingerprints: optional list of content fingerprints, one per grammar
+        :return: list of the grammars which need to be loaded
+        """
         raise DontUseBaseClassError(self)
 
     def wipe_ccr(self):
         raise DontUseBaseClassError(self)
+
+    def has_ccr(self):
+        """
+        :return: whether there are any ccr grammars (enabled or not)
+        """
+        raise DontUseBaseClassError(self)
+
+    def set_ccr_enabled(self, enabled):
+        """
+        Enables/disables the ccr grammars, leaving them loaded.
+
+        :param enabled: boolean
+        """
+        raise DontUseBaseClassError(self)
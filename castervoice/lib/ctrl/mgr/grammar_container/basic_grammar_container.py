@@ -13,6 +13,7 @@ class BasicGrammarContainer(BaseGrammarContainer):
         non-ccr grammars get turned on/off one at a time = dict
         """
         self._ccr_grammars = []
+        self._ccr_fingerprints = []
         self._non_ccr_grammars = {}
 
     def set_non_ccr(self, rcn, grammar):
@@ -24,15 +25,53 @@ class BasicGrammarContainer(BaseGrammarContainer):
         if grammar is not None:
             self._non_ccr_grammars[rcn] = grammar
 
-    def set_ccr(self, ccr_grammars):
-        # first, wipe out old ccr rules
+    def set_ccr(self, ccr_grammars, fingerprints=None):
+        """
+        Replaces the ccr grammars. If fingerprints are given, old grammars
+        whose fingerprints match new grammars' fingerprints stay loaded and
+        take the new grammars' places, so only changed grammars get reloaded.
+
+        :param ccr_grammars: list of Grammar
+        :param fingerprints: optional list of content fingerprints, one per grammar
+        :return: list of the grammars which need to be loaded
+        """
+        if fingerprints is None:
+            fingerprints = [None] * len(ccr_grammars)
+        old_grammars = {}
+        for old_grammar, old_fingerprint in zip(self._ccr_grammars, self._ccr_fingerprints):
+            if old_fingerprint is not None:
+                old_grammars[old_fingerprint] = old_grammar
+
+        grammars = []
+        grammars_to_load = []
+        for grammar, fingerprint in zip(ccr_grammars, fingerprints):
+            if fingerprint in old_grammars:
+                grammars.append(old_grammars.pop(fingerprint))
+            else:
+                grammars.append(grammar)
+                grammars_to_load.append(grammar)
+
+        # wipe out old ccr grammars which weren't kept
         for ccr_grammar in self._ccr_grammars:
-            BasicGrammarContainer._empty_grammar(ccr_grammar)
-        self._ccr_grammars = ccr_grammars
+            if ccr_grammar not in grammars:
+                BasicGrammarContainer._empty_grammar(ccr_grammar)
+        self._ccr_grammars = grammars
+        self._ccr_fingerprints = fingerprints
+        return grammars_to_load
 
     def wipe_ccr(self):
         self.set_ccr([])
 
+    def has_ccr(self):
+        return len(self._ccr_grammars) > 0
+
+    def set_ccr_enabled(self, enabled):
+        for ccr_grammar in self._ccr_grammars:
+            if enabled:
+                ccr_grammar.enable()
+            else:
+                ccr_grammar.disable()
+
     @staticmethod
     def _empty_grammar(grammar):
         # disable all of the grammar's rules
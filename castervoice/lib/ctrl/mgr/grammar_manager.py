@@ -1,15 +1,18 @@
-import os, traceback
+import os, timeit, traceback
 
 from dragonfly import Grammar
 
 from castervoice.lib import printer
+from castervoice.lib.ctrl import lifecycle_profiler
 from castervoice.lib.ctrl.mgr.errors.invalid_companion_configuration_error import InvalidCompanionConfigurationError
 from castervoice.lib.ctrl.mgr.errors.not_a_module import NotAModuleError
 from castervoice.lib.ctrl.mgr.loading.load.content_type import ContentType
 from castervoice.lib.ctrl.mgr.managed_rule import ManagedRule
 from castervoice.lib.ctrl.mgr.rule_formatter import _set_rdescripts
 from castervoice.lib.ctrl.mgr.rules_enabled_diff import RulesEnabledDiff
+from castervoice.lib.merge import spec_cache
 from castervoice.lib.merge.ccrmerging2.hooks.events.activation_event import RuleActivationEvent
+from castervoice.lib.merge.ccrmerging2.hooks.events.merge_timing_event import MergeTimingEvent
 from castervoice.lib.merge.ccrmerging2.sorting.config_ruleset_sorter import ConfigBasedRuleSetSorter
 from castervoice.lib.util.ordered_set import OrderedSet
 
@@ -69,14 +72,19 @@ class GrammarManager(object):
 
         # rules: (class name : ManagedRule}
         self._managed_rules = {}
+        # rules which haven't been imported yet: {class name: LazyRule}
+        self._lazy_rules = {}
         #
         self._reload_observable.register_listener(self)
         '''The passed method references below would be a good place to start splitting the GM apart.'''
         #
         self._activator.set_activation_fn(lambda rcn, active: self._change_rule_enabled(rcn, active))
+        self._activator.set_batch_activation_fn(lambda rcns_and_active: self.change_rules_enabled(rcns_and_active))
         #
         smrc.set_reload_fn(lambda rcn: self._delegate_enable_rule(rcn, True))
         #
+        self._merger.set_remerge_fn(lambda: self._remerge_all_ccr_rules())
+        #
         self._initial_activations_complete = False
 
     def initialize(self):
@@ -96,6 +104,10 @@ class GrammarManager(object):
         if self._ccr_toggle.is_active():
             self._remerge_ccr_rules(enabled_ordered_rcns)
 
+        # the instances made for validating rules which weren't loaded would go stale
+        for managed_rule in self._managed_rules.values():
+            managed_rule.discard_spare_instance()
+
         is_timer_based_reload_observable = hasattr(self._reload_observable, "start")
         if is_timer_based_reload_observable:
             self._reload_observable.start()
@@ -112,10 +124,15 @@ class GrammarManager(object):
         :param details:
         :return:
         """
+        with lifecycle_profiler.get_instance().span(rule_class.__name__, "register"):
+            self._register_rule(rule_class, details)
+
+    def _register_rule(self, rule_class, details):
         class_name = rule_class.__name__
+        managed_rule = ManagedRule(rule_class, details)
 
         # do not load or watch invalid rules
-        invalidation = self._get_invalidation(rule_class, details)
+        invalidation = self._get_invalidation(managed_rule)
         if invalidation is not None:
             printer.out(invalidation)
             return
@@ -125,7 +142,6 @@ class GrammarManager(object):
         rule should be safe for loading at this point: register it
         but do not load here -- this method only registers
         '''
-        managed_rule = ManagedRule(rule_class, details)
         self._managed_rules[class_name] = managed_rule
         # set up de/activation command
         self._activator.register_rule(managed_rule)
@@ -133,6 +149,34 @@ class GrammarManager(object):
         if not details.watch_exclusion:
             self._reload_observable.register_watched_file(details.get_filepath())
 
+    def register_lazy_rule(self, lazy_rule):
+        """
+        Takes a rule which is only known statically, and offers "enable X" for it.
+        The rule is imported, validated and registered the first time it's enabled.
+
+        :param lazy_rule: LazyRule
+        """
+        rcn = lazy_rule.rule_class_name
+        if rcn in self._managed_rules:
+            return
+        self._lazy_rules[rcn] = lazy_rule
+        self._activator.register_trigger(rcn, lazy_rule.trigger)
+
+    def _get_managed_rule(self, class_name):
+        """
+        :param class_name: str
+        :return: the ManagedRule, importing and registering it first if it's lazy,
+                 or None if it couldn't be loaded
+        """
+        lazy_rule = self._lazy_rules.pop(class_name, None)
+        if lazy_rule is not None:
+            rule_and_details = self._content_loader.load_lazy_rule(lazy_rule)
+            if rule_and_details is not None:
+                self.register_rule(*rule_and_details)
+            if class_name not in self._managed_rules:
+                printer.out("Could not load rule {}.".format(class_name))
+        return self._managed_rules.get(class_name)
+
     def _change_rule_enabled(self, class_name, enabled, tail=True):
         """
         This is called by the GrammarActivator. The necessity of this function
@@ -143,15 +187,7 @@ class GrammarManager(object):
         :param tail: (boolean) whether this is the tail call, since this fn is recursive
         :return:
         """
-
-        # load it
-        enabled_diff = self._delegate_enable_rule(class_name, enabled)
-        # run activation hooks
-        self._hooks_runner.execute(RuleActivationEvent(class_name, enabled))
-
-        if tail:
-            enabled_diff = self._handle_companion_rules(enabled_diff)
-            self._rewrite_config_file(enabled_diff)
+        self._change_rules_enabled([(class_name, enabled)], tail)
 
         '''
         Roadmap:
@@ -160,6 +196,53 @@ class GrammarManager(object):
             `_change_rule_enabled` the center of the GM, rather than having two centers.
         '''
 
+    def change_rules_enabled(self, rcns_and_enabled):
+        """
+        Enables/disables several rules at once: all the ccr rules are remerged
+        and their grammars swapped once, and rules.toml is written once,
+        no matter how many rules (and companion rules) change.
+
+        :param rcns_and_enabled: list of (rule class name, boolean), in the order they were asked for
+        """
+        self._change_rules_enabled(rcns_and_enabled, True)
+
+    def _change_rules_enabled(self, rcns_and_enabled, tail):
+        """
+        :param rcns_and_enabled: list of (rule class name, boolean)
+        :param tail: (boolean) whether this is the tail call, since companion rules recurse
+        """
+        # lazy rules have never been enabled, so there's nothing to disable
+        rcns_and_enabled = [(rcn, enabled) for rcn, enabled in rcns_and_enabled
+                            if enabled or rcn not in self._lazy_rules]
+        rcns_and_enabled = [(rcn, enabled) for rcn, enabled in rcns_and_enabled
+                            if self._get_managed_rule(rcn) is not None]
+
+        ccr_changes = []
+        newly_enabled = []
+        newly_disabled = set()
+        for class_name, enabled in rcns_and_enabled:
+            managed_rule = self._managed_rules[class_name]
+            if managed_rule.get_details().declared_ccrtype is None:
+                enabled_diff = self._enable_non_ccr_rule(managed_rule, enabled)
+                newly_enabled.extend(enabled_diff.newly_enabled)
+                newly_disabled.update(enabled_diff.newly_disabled)
+            else:
+                ccr_changes.append((class_name, enabled))
+
+        # load all the ccr changes with one merge
+        if len(ccr_changes) > 0:
+            enabled_diff = self._delegate_enable_ccr_rules(ccr_changes)
+            newly_enabled.extend(enabled_diff.newly_enabled)
+            newly_disabled.update(enabled_diff.newly_disabled)
+
+        # run activation hooks
+        for class_name, enabled in rcns_and_enabled:
+            self._hooks_runner.execute(RuleActivationEvent(class_name, enabled))
+
+        if tail:
+            enabled_diff = self._handle_companion_rules(RulesEnabledDiff(newly_enabled, newly_disabled))
+            self._rewrite_config_file(enabled_diff)
+
     def _rewrite_config_file(self, enabled_diff):
         """
         :param enabled_diff:
@@ -181,8 +264,10 @@ class GrammarManager(object):
             rcn = difference[0]
             enabled = difference[1]
             for companion_rcn in self._companion_config.get_companions(rcn):
-                if companion_rcn in self._managed_rules:
-                    mr = self._managed_rules[companion_rcn]
+                if not enabled and companion_rcn in self._lazy_rules:
+                    continue
+                mr = self._get_managed_rule(companion_rcn)
+                if mr is not None:
                     is_ccr = mr.get_details().declared_ccrtype is not None
                     if is_ccr:
                         raise InvalidCompanionConfigurationError(companion_rcn)
@@ -218,20 +303,38 @@ class GrammarManager(object):
         if managed_rule.get_details().declared_ccrtype is None:
             return self._enable_non_ccr_rule(managed_rule, enabled)
         else:
-            rcn = managed_rule.get_rule_class_name()
-            enabled_rules = OrderedSet(self._config.get_enabled_rcns_ordered())
-            enabled_rules.update(rcn, enabled)
-            enabled_diff = self._remerge_ccr_rules(enabled_rules.to_list())
-            place = enabled_diff.newly_enabled.append if enabled else enabled_diff.newly_disabled.add
-            place(rcn)
-            return enabled_diff
+            return self._delegate_enable_ccr_rules([(class_name, enabled)])
 
-    def _remerge_ccr_rules(self, enabled_rcns):
+    def _delegate_enable_ccr_rules(self, rcns_and_enabled):
         """
+        Applies all the ccr enables/disables to the enabled rules, then remerges once.
+
+        :param rcns_and_enabled: list of (ccr rule class name, boolean); later ones are merged later
+        :return: RulesEnabledDiff
+        """
+        enabled_rules = OrderedSet(self._config.get_enabled_rcns_ordered())
+        for rcn, enabled in rcns_and_enabled:
+            enabled_rules.update(rcn, enabled)
+        changed_rcns = [rcn for rcn, _ in rcns_and_enabled]
+        enabled_diff = self._remerge_ccr_rules(enabled_rules.to_list(), changed_rcns)
+        for rcn, enabled in rcns_and_enabled:
+            if not enabled:
+                enabled_diff.newly_disabled.add(rcn)
+            # a rule enabled earlier in the batch may have been knocked out by a later incompatible one
+            elif rcn not in enabled_diff.newly_disabled and rcn not in enabled_diff.newly_enabled:
+                enabled_diff.newly_enabled.append(rcn)
+        return enabled_diff
+
+    def _remerge_ccr_rules(self, enabled_rcns, changed_rcns=()):
+        """
+        :param enabled_rcns: ordered list of enabled rule class names
+        :param changed_rcns: rule class names which the merger should not reuse cached work for
         :return: RulesEnabledDiff
         """
         # if the global ccr toggle was off, activating a ccr rule turns it back on
-        self._ccr_toggle.set_active(True)
+        if not self._ccr_toggle.is_active():
+            self._ccr_toggle.set_active(True)
+            self._grammars_container.set_ccr_enabled(True)
 
         # handle CCR: get all active ccr rules after de/activating one
         loaded_enabled_rcns = set(self._managed_rules.keys())
@@ -246,21 +349,67 @@ class GrammarManager(object):
         the merger has to make the global one, plus an app rule with the app stuff plus all the
         global stuff.
         '''
+        profiler = lifecycle_profiler.get_instance()
         sorter = ConfigBasedRuleSetSorter(enabled_rcns)
-        merge_result = self._merger.merge_rules(active_ccr_mrs, sorter)
+        with profiler.span("ccr merge", "merge", {"rules": len(active_ccr_mrs)}):
+            merge_result = self._merger.merge_rules(active_ccr_mrs, sorter, changed_rcns)
         grammars = []
-        for rule_and_context in merge_result.ccr_rules_and_contexts:
-            rule = rule_and_context[0]
-            context = rule_and_context[1]
-            grammar = Grammar(name="ccr-" + GrammarManager._get_next_id(), context=context)
-            grammar.add_rule(rule)
+        fingerprints = merge_result.fingerprints
+        grammar_names = merge_result.grammar_names
+        if merge_result.single_grammar:
+            # the rules share sub-rules and carry their own contexts
+            grammar = Grammar(name=GrammarManager._get_ccr_grammar_name(grammar_names, 0))
+            for rule_and_context in merge_result.ccr_rules_and_contexts:
+                grammar.add_rule(rule_and_context[0])
             grammars.append(grammar)
-        self._grammars_container.set_ccr(grammars)
-        for grammar in grammars:
-            grammar.load()
+            if fingerprints is not None:
+                fingerprints = [tuple(fingerprints)]
+        else:
+            for i, rule_and_context in enumerate(merge_result.ccr_rules_and_contexts):
+                rule = rule_and_context[0]
+                context = rule_and_context[1]
+                grammar = Grammar(name=GrammarManager._get_ccr_grammar_name(grammar_names, i), context=context)
+                grammar.add_rule(rule)
+                grammars.append(grammar)
+        # non-ccr rules of demoted specs get their own grammars, after the ccr grammars
+        ccr_grammar_count = len(grammars)
+        for rule, context in merge_result.fallback_rules_and_contexts:
+            grammars.append(Grammar(name=rule.name, context=context))
+            grammars[-1].add_rule(rule)
+        if fingerprints is not None:
+            fingerprints = fingerprints + [None] * (len(grammars) - ccr_grammar_count)
+        timings = merge_result.timings
+        if timings is not None:
+            timings.lap("grammar construction")
+        # unchanged grammars stay loaded: only load the ones the container says are new
+        grammars_to_load = self._grammars_container.set_ccr(grammars, fingerprints)
+        if timings is not None:
+            timings.lap("set ccr")
+        for grammar in grammars_to_load:
+            start = timeit.default_timer()
+            with profiler.span(grammar.name, "grammar load"):
+                grammar.load()
+            grammar_index = grammars.index(grammar)
+            if merge_result.repetition_keys is not None and grammar_index < ccr_grammar_count:
+                repetition_key = merge_result.repetition_keys[grammar_index]
+                self._merger.record_load_time(repetition_key, timeit.default_timer() - start)
+        if timings is not None:
+            timings.lap("grammar load")
+            timings.count("grammars", len(grammars))
+            timings.count("grammars loaded", len(grammars_to_load))
+            printer.out("{}. {}".format(timings.get_description(), spec_cache.get_instance().get_stats_report()))
+            self._hooks_runner.execute(MergeTimingEvent(timings))
 
         return merge_result.rules_enabled_diff
 
+    def _remerge_all_ccr_rules(self):
+        """
+        Remerges the enabled ccr rules without reusing any cached work, for when
+        the merging strategy's decisions may have changed.
+        """
+        enabled_rcns = self._config.get_enabled_rcns_ordered()
+        self._remerge_ccr_rules(enabled_rcns, enabled_rcns)
+
     def _enable_non_ccr_rule(self, managed_rule, enabled):
         """
         :param managed_rule:
@@ -269,9 +418,10 @@ class GrammarManager(object):
         """
         rcn = managed_rule.get_rule_class_name()
         if enabled:
-            grammar = self._mapping_rule_maker.create_non_ccr_grammar(managed_rule)
-            self._grammars_container.set_non_ccr(rcn, grammar)
-            grammar.load()
+            with lifecycle_profiler.get_instance().span(rcn, "grammar load"):
+                grammar = self._mapping_rule_maker.create_non_ccr_grammar(managed_rule)
+                self._grammars_container.set_non_ccr(rcn, grammar)
+                grammar.load()
             return RulesEnabledDiff([rcn], frozenset())
         else:
             self._grammars_container.set_non_ccr(rcn, None)
@@ -288,23 +438,30 @@ class GrammarManager(object):
         :return:
         """
         module_name = GrammarManager._get_module_name_from_file_path(file_path_changed)
-        rule_class, details = self._content_loader.idem_import_module(module_name, ContentType.GET_RULE)
-        # re-register:
-        self.register_rule(rule_class, details)
-
-        class_name = rule_class.__name__
-        if class_name in self._config.get_enabled_rcns_ordered():
-            self._delegate_enable_rule(class_name, True)
-
-    def _get_invalidation(self, rule_class, details):
+        profiler = lifecycle_profiler.get_instance()
+        with profiler.span(module_name, "reload"):
+            rule_class, details = self._content_loader.idem_import_module(module_name, ContentType.GET_RULE)
+            # re-register:
+            self.register_rule(rule_class, details)
+
+            class_name = rule_class.__name__
+            if class_name in self._config.get_enabled_rcns_ordered():
+                self._delegate_enable_rule(class_name, True)
+            if class_name in self._managed_rules:
+                self._managed_rules[class_name].discard_spare_instance()
+        profiler.report("reload of " + module_name)
+
+    def _get_invalidation(self, managed_rule):
         """
         Attempts to find a reason to invalidate the rule. Return reason if can find one.
-        :param rule_class:
-        :param details: RuleDetails
+        The instance made for validating is kept by the ManagedRule, to be used if it's loaded
+        right away (during initialize, or the reload or enabling which registered it).
+        :param managed_rule: ManagedRule
         :return:
         """
 
-        class_name = rule_class.__name__
+        class_name = managed_rule.get_rule_class_name()
+        details = managed_rule.get_details()
 
         '''validate details configuration before anything else'''
         details_invalidation = self._details_validator.validate_details(details)
@@ -314,7 +471,7 @@ class GrammarManager(object):
         '''attempt to instantiate the rule'''
         test_instance = None
         try:
-            test_instance = rule_class()
+            test_instance = managed_rule.peek_rule_instance()
         except:  # ignore warnings on this line-- it's supposed to be broad
             traceback.print_exc()
             return "{} rejected due to instantiation errors".format(class_name)
@@ -340,8 +497,10 @@ class GrammarManager(object):
         """
         rules = [self._activator.construct_activation_rule(),
                  self._hooks_runner.construct_activation_rule(),
-                 self._transformers_runner.construct_activation_rule()]
-        rules = [rule for rule in rules if len(rule[0].mapping) > 0]  # there might not be *any* transformers/hooks
+                 self._transformers_runner.construct_activation_rule(),
+                 self._merger.construct_activation_rule()]
+        # there might not be *any* transformers/hooks, and the merger only has commands if it tracks spec usage
+        rules = [rule for rule in rules if rule is not None and len(rule[0].mapping) > 0]
         if hasattr(self._reload_observable, "get_loadable"):
             rules.append(self._reload_observable.get_loadable())
 
@@ -350,11 +509,18 @@ class GrammarManager(object):
             self._change_rule_enabled(rc.__name__, True)
 
     def set_ccr_active(self, active):
+        """
+        Turns ccr off/on. The ccr grammars stay loaded while ccr is off,
+        so turning it back on doesn't need a merge, unless ccr was off
+        from the start and nothing has been merged yet.
+
+        :param active: boolean
+        """
         self._ccr_toggle.set_active(active)
-        if not self._ccr_toggle.is_active():
-            self._grammars_container.wipe_ccr()
-        else:
-            self._change_rule_enabled("Numbers", True)
+        if self._grammars_container.has_ccr():
+            self._grammars_container.set_ccr_enabled(active)
+        elif active:
+            self._remerge_ccr_rules(self._config.get_enabled_rcns_ordered())
 
     @staticmethod
     def _get_module_name_from_file_path(file_path):
@@ -367,6 +533,17 @@ class GrammarManager(object):
             raise NotAModuleError(file_path)
         return os.path.basename(file_path).replace(".py", "")
 
+    @staticmethod
+    def _get_ccr_grammar_name(grammar_names, index):
+        """
+        :param grammar_names: content-derived grammar names from the merger, or None
+        :param index: index of the grammar
+        :return: str
+        """
+        if grammar_names is not None:
+            return grammar_names[index]
+        return "ccr-" + GrammarManager._get_next_id()
+
     @staticmethod
     def _get_next_id():
         """
@@ -1,3 +1,4 @@
+import hashlib
 import importlib
 import os
 import traceback
@@ -5,8 +6,10 @@ from sys import modules as _MODULES
 from sys import path
 
 from castervoice.lib import settings, printer
+from castervoice.lib.ctrl import lifecycle_profiler
 from castervoice.lib.ctrl.mgr.loading.load.content_type import ContentType
 from castervoice.lib.ctrl.mgr.loading.load.initial_content import FullContentSet
+from castervoice.lib.ctrl.mgr.loading.load.lazy_rule import LazyRule
 
 
 class ContentLoader(object):
@@ -20,6 +23,10 @@ class ContentLoader(object):
 
     def __init__(self, content_request_generator):
         self._content_request_generator = content_request_generator
+        # {module name: (importable module name, file path or None if importable from sys.path)}
+        self._module_locations = {}
+        # {importable module name: file path} of modules loaded from their files
+        self._file_module_paths = {}
 
     def load_everything(self, rules_config):
         # Generate all requests for both starter and user locations
@@ -27,26 +34,47 @@ class ContentLoader(object):
         user_dir = settings.SETTINGS["paths"]["USER_DIR"]
         user_rules_dir = user_dir + os.sep + "rules"
 
-        starter_content_requests = self._content_request_generator.get_all_content_modules(base_path)
-        user_content_requests = self._content_request_generator.get_all_content_modules(user_dir)
+        profiler = lifecycle_profiler.get_instance()
+        with profiler.span("scan starter content", "scan"):
+            starter_content_requests = self._content_request_generator.get_all_content_modules(base_path)
+        with profiler.span("scan user content", "scan"):
+            user_content_requests = self._content_request_generator.get_all_content_modules(user_dir)
 
         # user content should trump starter content
-        path.append(user_rules_dir)
+        if user_rules_dir not in path:
+            path.append(user_rules_dir)
         requests = {}
         for item in starter_content_requests:
+            # a few starter examples (outside of packages) are named like real content, which wins
+            existing_item = requests.get(item.module_name)
+            if existing_item is not None and \
+                    ContentLoader._get_package_module_name(existing_item.directory, existing_item.module_name):
+                continue
             requests[item.module_name] = item
         for item in user_content_requests:
             requests[item.module_name] = item
+        for request in requests.values():
+            self._register_module_location(request.directory, request.module_name)
 
         # categorize requests
+        enabled_rcns = set(rules_config.get_enabled_rcns_ordered())
         rule_requests = []
+        lazy_rules = []
         transformer_requests = []
         hook_requests = []
         for module_name in requests:
             request = requests[module_name]
             if request.content_type == ContentType.GET_RULE and \
                     rules_config.load_is_allowed(request.content_class_name):
-                rule_requests.append(request)
+                # disabled rules whose metadata was found statically don't need importing yet
+                if request.rule_metadata and request.content_class_name not in enabled_rcns:
+                    lazy_rules.append(LazyRule(request.content_class_name,
+                                               request.rule_metadata["trigger"],
+                                               request.rule_metadata["ccrtype"],
+                                               request.directory,
+                                               request.module_name))
+                else:
+                    rule_requests.append(request)
             elif request.content_type == ContentType.GET_TRANSFORMER and \
                     request.module_name == "text_replacer":
                 transformer_requests.append(request)
@@ -58,15 +86,29 @@ class ContentLoader(object):
         transformers = self._process_requests(transformer_requests)
         hooks = self._process_requests(hook_requests)
 
-        return FullContentSet(rules, transformers, hooks)
+        return FullContentSet(rules, transformers, hooks, lazy_rules)
+
+    def load_lazy_rule(self, lazy_rule):
+        """
+        Imports a rule which was only known statically.
+
+        :param lazy_rule: LazyRule
+        :return: (rule class, RuleDetails), or None if the module couldn't be imported
+        """
+        return self.idem_import_module(lazy_rule.module_name, ContentType.GET_RULE)
 
     def idem_import_module(self, module_name, fn_name):
         """
         Returns the content requested from the specified module.
         """
+        with lifecycle_profiler.get_instance().span(module_name, "import", {"content": fn_name}):
+            return self._idem_import_module(module_name, fn_name)
+
+    def _idem_import_module(self, module_name, fn_name):
         module = None
-        if module_name in _MODULES:
-            module = _MODULES[module_name]
+        importable_name = self._module_locations.get(module_name, (module_name, None))[0]
+        if importable_name in _MODULES:
+            module = _MODULES[importable_name]
             module = self._reimport_module(module)
         else:
             module = self._import_module(module_name)
@@ -101,8 +143,6 @@ class ContentLoader(object):
         result = []
 
         for request in requests:
-            if request.directory not in path:
-                path.append(request.directory)
             content_item = self.idem_import_module(request.module_name, request.content_type)
             if content_item is not None:
                 result.append(content_item)
@@ -136,15 +176,94 @@ class ContentLoader(object):
             printer.out(msg.format(str(module), traceback.format_exc()))
             return None
 
+    def _register_module_location(self, directory, module_name):
+        """
+        Content directories aren't added to sys.path (which would slow down every
+        later import), so each content module gets a name it can be imported by:
+        its full package name if its directory is in an importable package
+        (e.g. all starter content), otherwise a unique name derived from its
+        path, under which it's loaded from its file.
+        """
+        package_module_name = ContentLoader._get_package_module_name(directory, module_name)
+        if package_module_name is not None:
+            self._module_locations[module_name] = (package_module_name, None)
+        else:
+            file_path = os.path.abspath(os.path.join(directory, module_name + ".py"))
+            path_hash = hashlib.sha1(os.path.normcase(file_path).encode("utf-8")).hexdigest()[:10]
+            self._module_locations[module_name] = ("caster_content_{}_{}".format(module_name, path_hash), file_path)
+
+    @staticmethod
+    def _get_package_module_name(directory, module_name):
+        """
+        :return: the dotted name the module can be imported by without changing sys.path, or None
+        """
+        package_dirs = []
+        package_dir = os.path.abspath(directory)
+        while os.path.isfile(os.path.join(package_dir, "__init__.py")):
+            package_dirs.insert(0, package_dir)
+            parent_dir = os.path.dirname(package_dir)
+            if parent_dir == package_dir:
+                break
+            package_dir = parent_dir
+        names = [os.path.basename(package_dir) for package_dir in package_dirs] + [module_name]
+        for i, package_dir in enumerate(package_dirs):
+            if ContentLoader._is_importable_from(names[i], package_dir):
+                return ".".join(names[i:])
+        return None
+
+    @staticmethod
+    def _is_importable_from(package_name, package_dir):
+        try:
+            package = importlib.import_module(package_name)
+        except Exception:
+            return False
+        package_file = getattr(package, "__file__", None)
+        if package_file is None:
+            return False
+        return os.path.normcase(os.path.dirname(os.path.abspath(package_file))) == os.path.normcase(package_dir)
+
+    def _load_module(self, module_name):
+        importable_name, file_path = self._module_locations.get(module_name, (module_name, None))
+        if file_path is None:
+            return importlib.import_module(importable_name)
+        self._file_module_paths[importable_name] = file_path
+        return ContentLoader._load_module_from_file(importable_name, file_path)
+
+    def _reload_module(self, module):
+        file_path = self._file_module_paths.get(module.__name__)
+        if file_path is not None:
+            return ContentLoader._load_module_from_file(module.__name__, file_path)
+        try:
+            reload_fn = reload
+        except NameError:
+            # Python 3
+            from imp import reload as reload_fn
+        return reload_fn(module)
+
+    @staticmethod
+    def _load_module_from_file(importable_name, file_path):
+        # the module's directory is only on sys.path while it's executed, for imports of its siblings
+        directory = os.path.dirname(file_path)
+        path.insert(0, directory)
+        try:
+            try:
+                import importlib.util
+            except ImportError:
+                # Python 2
+                import imp
+                return imp.load_source(importable_name, file_path)
+            spec = importlib.util.spec_from_file_location(importable_name, file_path)
+            module = importlib.util.module_from_spec(spec)
+            _MODULES[importable_name] = module
+            spec.loader.exec_module(module)
+            return module
+        finally:
+            path.remove(directory)
+
     def _get_load_fn(self):
         """Importing broken out for testability"""
-        return importlib.import_module
+        return self._load_module
 
     def _get_reload_fn(self):
         """Importing broken out for testability"""
-        try:
-            reload
-        except NameError:
-            # Python 3
-            from imp import reload
-        return reload
+        return self._reload_module
@@ -1,6 +1,8 @@
 class ContentRequest(object):
-    def __init__(self, content_type, directory, module_name, content_class_name):
+    def __init__(self, content_type, directory, module_name, content_class_name, rule_metadata=None):
         self.content_type = content_type
         self.directory = directory
         self.module_name = module_name
         self.content_class_name = content_class_name
+        # {"trigger": str, "ccrtype": str or None} if the rule can be loaded lazily, see RuleMetadataExtractor
+        self.rule_metadata = rule_metadata
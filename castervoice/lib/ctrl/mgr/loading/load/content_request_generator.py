@@ -10,25 +10,62 @@ class ContentRequestGenerator(object):
     Generates a set of requests from a path.
     """
 
+    def __init__(self, scan_manifest=None, rule_metadata_extractor=None):
+        """
+        :param scan_manifest: optional ContentScanManifest; if present, only files
+               which are new or changed since they were last scanned are read
+        :param rule_metadata_extractor: optional RuleMetadataExtractor; if present, rule
+               requests carry what's needed to offer "enable X" without importing the rule
+        """
+        self._scan_manifest = scan_manifest
+        self._rule_metadata_extractor = rule_metadata_extractor
+
     def get_all_content_modules(self, directory):
         relevant_modules = []
+        scanned_file_paths = set()
         for dirpath, dirnames, filenames in self._walk(directory):
             for filename in filenames:
                 file_path = dirpath + os.sep + filename
-                content_type, content_class_name = self._scan_file(file_path)
+                if not ContentRequestGenerator._is_scannable(file_path):
+                    continue
+                scanned_file_paths.add(file_path)
+                content_type, content_class_name, rule_metadata = self._scan_file_with_manifest(file_path)
                 if content_type is not None:
                     module_name = filename[:-3]
                     request = ContentRequest(content_type,
                                              dirpath,
                                              module_name,
-                                             content_class_name)
+                                             content_class_name,
+                                             rule_metadata)
                     relevant_modules.append(request)
+        if self._scan_manifest is not None:
+            self._scan_manifest.retain(directory, scanned_file_paths)
+            self._scan_manifest.save()
         return relevant_modules
 
+    def _scan_file_with_manifest(self, file_path):
+        if self._scan_manifest is None:
+            return self._scan_file(file_path)
+        mtime, size = self._get_file_stat(file_path)
+        is_unchanged, scan_result = self._scan_manifest.get(file_path, mtime, size)
+        # rules scanned before metadata extraction was turned on need to be scanned again
+        is_missing_metadata = is_unchanged and self._rule_metadata_extractor is not None and \
+            scan_result[0] == ContentType.GET_RULE and scan_result[2] is None
+        if is_unchanged and not is_missing_metadata:
+            return scan_result
+        scan_result = self._scan_file(file_path)
+        self._scan_manifest.put(file_path, mtime, size, *scan_result)
+        return scan_result
+
     def _walk(self, directory):
         """File i/o broken out for testability"""
         return os.walk(directory)
 
+    def _get_file_stat(self, file_path):
+        """File i/o broken out for testability"""
+        stat = os.stat(file_path)
+        return stat.st_mtime, stat.st_size
+
     def _get_file_lines(self, file_path):
         """File i/o broken out for testability"""
         content = None
@@ -39,14 +76,13 @@ class ContentRequestGenerator(object):
     def _scan_file(self, file_path):
         """
         Reads the whole file, classifies it as rule, transformer, hook, or none.
-        Also finds a list of potential names for the loadable content class.
+        Also finds a list of potential names for the loadable content class, and
+        for rules, the rule metadata (if there's an extractor).
         :param file_path: str
-        :return: str
+        :return: (content type, content class name, rule metadata)
         """
-        if not file_path.endswith(".py"):
-            return None, None
-        if file_path.endswith("__init__.py"):
-            return None, None
+        if not ContentRequestGenerator._is_scannable(file_path):
+            return None, None, None
 
         content = self._get_file_lines(file_path)
 
@@ -75,7 +111,15 @@ class ContentRequestGenerator(object):
                 ccn = ContentRequestGenerator._extract_class_name(line)
                 if ccn is not None:
                     content_class_name = ccn
-        return content_type, content_class_name
+
+        rule_metadata = None
+        if content_type == ContentType.GET_RULE and self._rule_metadata_extractor is not None:
+            rule_metadata = self._rule_metadata_extractor.extract("".join(content), content_class_name)
+        return content_type, content_class_name, rule_metadata
+
+    @staticmethod
+    def _is_scannable(file_path):
+        return file_path.endswith(".py") and not file_path.endswith("__init__.py")
 
     @staticmethod
     def _extract_class_name(line):
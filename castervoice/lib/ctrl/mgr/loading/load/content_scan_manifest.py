@@ -0,0 +1,63 @@
+import os
+
+from castervoice.lib import utilities
+
+
+class ContentScanManifest(object):
+    """
+    Persists the results of scanning content files, so that at startup only
+    files which are new or have changed (by modification time or size) need
+    to be read.
+
+    Entries: {file path: [mtime, size, content type, content class name, rule metadata]}
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._entries = None
+        self._unsaved_changes = False
+
+    def get(self, file_path, mtime, size):
+        """
+        :param file_path: str
+        :param mtime: the file's current modification time
+        :param size: the file's current size
+        :return: (True, (content type, content class name, rule metadata)) if the file hasn't
+                 changed since it was scanned, else (False, None)
+        """
+        entry = self._get_entries().get(file_path)
+        if entry is None or len(entry) != 5 or entry[0] != mtime or entry[1] != size:
+            return False, None
+        return True, (entry[2], entry[3], entry[4])
+
+    def put(self, file_path, mtime, size, content_type, content_class_name, rule_metadata):
+        self._get_entries()[file_path] = [mtime, size, content_type, content_class_name, rule_metadata]
+        self._unsaved_changes = True
+
+    def retain(self, directory, file_paths):
+        """
+        Forgets files in the directory which weren't seen in the latest scan of it.
+
+        :param directory: str, the directory which was scanned
+        :param file_paths: collection of the scanned file paths
+        """
+        # with the separator, so that e.g. "rules_old" isn't treated as part of "rules"
+        directory_prefix = directory.rstrip(os.sep) + os.sep
+        entries = self._get_entries()
+        for file_path in list(entries.keys()):
+            if file_path.startswith(directory_prefix) and file_path not in file_paths:
+                del entries[file_path]
+                self._unsaved_changes = True
+
+    def save(self):
+        """
+        Saves if anything has changed since the last save.
+        """
+        if self._unsaved_changes:
+            utilities.save_json_file(self._entries, self._path)
+            self._unsaved_changes = False
+
+    def _get_entries(self):
+        if self._entries is None:
+            self._entries = utilities.load_json_file(self._path)
+        return self._entries
@@ -2,7 +2,8 @@ class FullContentSet(object):
     """
     Initial content, loaded once when Caster starts.
     """
-    def __init__(self, rules, transformers, hooks):
+    def __init__(self, rules, transformers, hooks, lazy_rules=()):
         self.rules = rules
         self.transformers = transformers
         self.hooks = hooks
+        self.lazy_rules = lazy_rules
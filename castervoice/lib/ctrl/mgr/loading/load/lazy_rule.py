@@ -0,0 +1,19 @@
+class LazyRule(object):
+    """
+    A disabled rule which is known from its module's source, but which
+    hasn't been imported. It's imported the first time it's enabled.
+    """
+
+    def __init__(self, rule_class_name, trigger, declared_ccrtype, directory, module_name):
+        """
+        :param rule_class_name: str
+        :param trigger: str, what to call the rule in "enable X"/"disable X"
+        :param declared_ccrtype: the ccrtype its RuleDetails will have
+        :param directory: str, the directory of the rule's module
+        :param module_name: str
+        """
+        self.rule_class_name = rule_class_name
+        self.trigger = trigger
+        self.declared_ccrtype = declared_ccrtype
+        self.directory = directory
+        self.module_name = module_name
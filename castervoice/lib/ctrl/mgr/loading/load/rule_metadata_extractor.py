@@ -0,0 +1,143 @@
+import ast
+
+from castervoice.lib.const import CCRType
+from castervoice.lib.ctrl.mgr.loading.load.content_type import ContentType
+
+
+class RuleMetadataExtractor(object):
+    """
+    Finds what is needed to offer "enable X" for a rule (its trigger and its
+    ccrtype) by parsing its module's source rather than importing it.
+
+    Only simple, common rule modules can be read this way: a MergeRule with
+    a literal `pronunciation` (or none), or a MappingRule with a literal
+    RuleDetails name, and a `get_rule` which returns the rule class and a
+    RuleDetails whose `name` and `ccrtype` are literals. Anything else has
+    to be imported to be known.
+    """
+
+    _DETAILS_ARG_NAMES = ["name", "executable", "title", "grammar_name", "ccrtype"]
+    _LAZY_CCRTYPES = [None, CCRType.GLOBAL, CCRType.APP]
+
+    def extract(self, source, class_name):
+        """
+        :param source: str, the rule module's source
+        :param class_name: str, the rule class name found by the scan
+        :return: {"trigger": str, "ccrtype": str or None}, or {} if the module can't be read statically
+        """
+        try:
+            module = ast.parse(source)
+        except SyntaxError:
+            return {}
+        rule_class = RuleMetadataExtractor._find(module.body, ast.ClassDef, class_name)
+        get_rule = RuleMetadataExtractor._find(module.body, ast.FunctionDef, ContentType.GET_RULE)
+        if rule_class is None or get_rule is None:
+            return {}
+
+        details_args = RuleMetadataExtractor._get_details_args(get_rule, class_name)
+        if details_args is None:
+            return {}
+        name = details_args.get("name")
+        ccrtype = details_args.get("ccrtype")
+        if ccrtype not in RuleMetadataExtractor._LAZY_CCRTYPES:
+            return {}
+
+        trigger = RuleMetadataExtractor._get_trigger(rule_class, name, ccrtype)
+        if trigger is None:
+            return {}
+        return {"trigger": trigger, "ccrtype": ccrtype}
+
+    @staticmethod
+    def _get_trigger(rule_class, details_name, ccrtype):
+        """
+        Mirrors GrammarActivator._get_trigger. A MergeRule's pronunciation
+        defaults to its name, which for non-ccr rules is the RuleDetails name
+        (see ManagedRule), else the class name.
+        """
+        base_names = [RuleMetadataExtractor._get_name(base) for base in rule_class.bases]
+        # an __init__ could change the rule's name
+        if RuleMetadataExtractor._find(rule_class.body, ast.FunctionDef, "__init__") is not None:
+            return None
+        if base_names == ["MergeRule"]:
+            pronunciation = None
+            for statement in rule_class.body:
+                if isinstance(statement, ast.Assign) and \
+                        [RuleMetadataExtractor._get_name(t) for t in statement.targets] == ["pronunciation"]:
+                    pronunciation = RuleMetadataExtractor._get_literal(statement.value)
+                    if not isinstance(pronunciation, str):
+                        return None
+            if pronunciation is not None:
+                return pronunciation
+            if ccrtype is None and details_name is not None:
+                return details_name if isinstance(details_name, str) else None
+            return rule_class.name
+        if base_names == ["MappingRule"] and ccrtype is None and isinstance(details_name, str):
+            return details_name
+        return None
+
+    @staticmethod
+    def _get_details_args(get_rule, class_name):
+        """
+        :return: {arg name: literal value} of the RuleDetails returned with the class, or None
+        """
+        returns = [node for node in ast.walk(get_rule) if isinstance(node, ast.Return)]
+        if len(returns) != 1 or not isinstance(returns[0].value, (ast.Tuple, ast.List)):
+            return None
+        returned = returns[0].value.elts
+        if len(returned) != 2 or RuleMetadataExtractor._get_name(returned[0]) != class_name:
+            return None
+
+        details_call = returned[1]
+        if isinstance(details_call, ast.Name):
+            assigned_values = [statement.value for statement in get_rule.body
+                               if isinstance(statement, ast.Assign) and
+                               [RuleMetadataExtractor._get_name(t) for t in statement.targets] == [details_call.id]]
+            if len(assigned_values) != 1:
+                return None
+            details_call = assigned_values[0]
+        if not isinstance(details_call, ast.Call) or \
+                RuleMetadataExtractor._get_name(details_call.func) != "RuleDetails":
+            return None
+        # *args/**kwargs (Python 2 keeps them separately)
+        if getattr(details_call, "starargs", None) is not None or getattr(details_call, "kwargs", None) is not None \
+                or any([type(arg).__name__ == "Starred" for arg in details_call.args]):
+            return None
+
+        args = {}
+        arg_names_and_values = list(zip(RuleMetadataExtractor._DETAILS_ARG_NAMES, details_call.args)) + \
+            [(keyword.arg, keyword.value) for keyword in details_call.keywords]
+        for arg_name, value in arg_names_and_values:
+            if arg_name is None:
+                # **kwargs (Python 3)
+                return None
+            if arg_name == "ccrtype" and isinstance(value, ast.Attribute) and \
+                    RuleMetadataExtractor._get_name(value.value) == "CCRType":
+                args[arg_name] = getattr(CCRType, value.attr, value.attr)
+            elif arg_name in ["name", "ccrtype"]:
+                args[arg_name] = RuleMetadataExtractor._get_literal(value)
+                if args[arg_name] is not None and not isinstance(args[arg_name], str):
+                    return None
+        return args
+
+    @staticmethod
+    def _find(statements, node_type, name):
+        for statement in statements:
+            if isinstance(statement, node_type) and statement.name == name:
+                return statement
+        return None
+
+    @staticmethod
+    def _get_name(node):
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            return node.attr
+        return None
+
+    @staticmethod
+    def _get_literal(node):
+        try:
+            return ast.literal_eval(node)
+        except ValueError:
+            # not a literal
+            return False
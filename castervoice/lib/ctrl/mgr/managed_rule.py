@@ -3,15 +3,52 @@ class ManagedRule(object):
     def __init__(self, rule_class, details):
         self._rule_class = rule_class
         self._details = details
+        # an instance which hasn't been handed out yet, so the class needn't be instantiated again
+        self._spare_instance = None
 
     def get_rule_class_name(self):
         return self._rule_class.__name__
 
     def get_rule_instance(self):
-        return self._rule_class()
+        """
+        Hands out an instance for the caller to configure/transform/load. The
+        instance made for validation (see peek_rule_instance) is handed out first;
+        after that, every call instantiates the class again.
+        """
+        rule_instance = self._spare_instance
+        self._spare_instance = None
+        if rule_instance is None:
+            rule_instance = self._instantiate()
+        return rule_instance
+
+    def peek_rule_instance(self):
+        """
+        Returns an instance for inspection (validation, pronunciation, etc.), which must
+        not be modified. It's kept and handed out by the next get_rule_instance call.
+
+        The kept instance reflects the state (e.g. a selfmod rule's TOML file) at the time
+        it was made, so it goes stale: it's only meant to be handed out during the load
+        it was made for. See discard_spare_instance.
+        """
+        if self._spare_instance is None:
+            self._spare_instance = self._instantiate()
+        return self._spare_instance
+
+    def discard_spare_instance(self):
+        """
+        Drops the instance kept by peek_rule_instance, if it wasn't handed out, so that
+        rules which aren't enabled don't keep an instance (which would go stale) around.
+        """
+        self._spare_instance = None
 
     def get_rule_class(self):
         return self._rule_class
 
     def get_details(self):
         return self._details
+
+    def _instantiate(self):
+        # non-ccr rules get their Dragonfly rule name from their details
+        if self._details.declared_ccrtype is None:
+            return self._rule_class(name=self._details.name)
+        return self._rule_class()
@@ -1,6 +1,7 @@
 from dragonfly import Grammar
 from castervoice.lib.context import AppContext
 from castervoice.lib.ctrl.mgr.rule_maker.base_rule_maker import BaseRuleMaker
+from castervoice.lib.merge.ccrmerging2 import rule_fingerprint
 
 
 class MappingRuleMaker(BaseRuleMaker):
@@ -9,14 +10,15 @@ class MappingRuleMaker(BaseRuleMaker):
     object, then runs all transformers over it.
     """
 
-    def __init__(self, t_runner, smr_configurer):
+    def __init__(self, t_runner, smr_configurer, content_derived_names=False):
         self._transformers_runner = t_runner
         self._smr_configurer = smr_configurer
         self._name_uniquefier = 0
+        self._content_derived_names = content_derived_names
 
     def create_non_ccr_grammar(self, managed_rule):
         details = managed_rule.get_details()
-        rule_instance = managed_rule.get_rule_class()(name=details.name)
+        rule_instance = managed_rule.get_rule_instance()
 
         if not details.transformer_exclusion:
             rule_instance = self._transformers_runner.transform_rule(rule_instance)
@@ -26,9 +28,14 @@ class MappingRuleMaker(BaseRuleMaker):
         context = None
         if details.executable is not None or details.title is not None:
             context = AppContext(executable=details.executable, title=details.title)
-        self._name_uniquefier += 1
-        counter = "g" + str(self._name_uniquefier)
-        grammar_name = counter if details.grammar_name is None else details.grammar_name + counter
+        if self._content_derived_names:
+            # stable across sessions, so engines can reuse compiled grammars
+            fingerprint = rule_fingerprint.structure_fingerprint([rule_instance], context)
+            suffix = "g" + fingerprint[:12]
+        else:
+            self._name_uniquefier += 1
+            suffix = "g" + str(self._name_uniquefier)
+        grammar_name = suffix if details.grammar_name is None else details.grammar_name + suffix
         grammar = Grammar(name=grammar_name, context=context)
         grammar.add_rule(rule_instance)
         return grammar
@@ -1,3 +1,4 @@
+from castervoice.lib.ctrl import lifecycle_profiler
 from castervoice.lib.ctrl.mgr.grammar_container.basic_grammar_container import BasicGrammarContainer
 from castervoice.lib.ctrl.mgr.ccr_toggle import CCRToggle
 from castervoice.lib.ctrl.mgr.companion.companion_config import CompanionConfig
@@ -11,10 +12,16 @@ from castervoice.lib.ctrl.mgr.validation.combo.non_empty_validator import RuleNo
 from castervoice.lib.ctrl.mgr.validation.combo.rule_family_validator import RuleFamilyValidator
 from castervoice.lib.ctrl.mgr.validation.combo.treerule_validator import TreeRuleValidator
 from castervoice.lib.merge.ccrmerging2.compatibility.simple_compat_checker import SimpleCompatibilityChecker
+from castervoice.lib.merge.ccrmerging2.compatibility.trie_compat_checker import TrieCompatibilityChecker
+from castervoice.lib.merge.ccrmerging2.adaptive_repetitions import AdaptiveRepetitions, RepetitionsConfig
+from castervoice.lib.merge.ccrmerging2.complexity_analyzer import ComplexityBudget
 from castervoice.lib.merge.ccrmerging2.hooks.hooks_config import HooksConfig
+from castervoice.lib.merge.ccrmerging2.merge_cache import MergeCache
+from castervoice.lib.merge.ccrmerging2.merge_plan_cache import MergePlanCache
 from castervoice.lib.merge.ccrmerging2.hooks.hooks_runner import HooksRunner
 from castervoice.lib.merge.ccrmerging2.sorting.config_ruleset_sorter import ConfigBasedRuleSetSorter
 from castervoice.lib.merge.ccrmerging2.transformers.transformers_config import TransformersConfig
+from castervoice.lib.merge.ccrmerging2.transformers.transformed_rule_cache import TransformedRuleCache
 from castervoice.lib.merge.ccrmerging2.transformers.transformers_runner import TransformersRunner
 from castervoice.lib.merge.mergerule import MergeRule
 from castervoice.lib import settings
@@ -32,6 +39,9 @@ from castervoice.lib.ctrl.mgr.grammar_manager import GrammarManager
 from castervoice.lib.ctrl.mgr.validation.rules.rule_validation_delegator import CCRRuleValidationDelegator
 from castervoice.lib.merge.ccrmerging2.ccrmerger2 import CCRMerger2
 from castervoice.lib.merge.ccrmerging2.merging.classic_merging_strategy import ClassicMergingStrategy
+from castervoice.lib.merge.ccrmerging2.merging.usage_pruning_merging_strategy import UsagePruningMergingStrategy
+from castervoice.lib.merge.ccrmerging2.partitioning.ccr_partitions_config import CCRPartitionsConfig
+from castervoice.lib.merge.ccrmerging2.spec_usage import SpecUsageConfig, SpecUsageTracker
 
 
 class Nexus:
@@ -42,6 +52,9 @@ class Nexus:
         things which need them. This access should be limited.
         """
 
+        profiler = lifecycle_profiler.get_instance()
+        setup_start = profiler.now()
+
         '''CasterState is used for impl of the asynchronous actions'''
 
         self.state = CasterState()
@@ -62,7 +75,10 @@ class Nexus:
 
         '''does transformations on rules when rules are activated'''
         transformers_config = TransformersConfig()
-        transformers_runner = TransformersRunner(transformers_config)
+        transformed_rule_cache = None
+        if settings.settings(["ccr_merging", "transformed_rule_cache"]):
+            transformed_rule_cache = TransformedRuleCache()
+        transformers_runner = TransformersRunner(transformers_config, transformed_rule_cache)
 
         '''the ccrmerger -- only merges MergeRules'''
         self._merger = Nexus._create_merger(smrc, transformers_runner)
@@ -72,16 +88,20 @@ class Nexus:
         self._content_loader = content_loader
 
         '''mapping rule maker: like the ccrmerger, but doesn't merge and isn't ccr'''
-        mapping_rule_maker = MappingRuleMaker(transformers_runner, smrc)
+        content_derived_names = bool(settings.settings(["ccr_merging", "content_derived_names"]))
+        mapping_rule_maker = MappingRuleMaker(transformers_runner, smrc, content_derived_names)
 
         '''the grammar manager -- probably needs to get broken apart more'''
         self._grammar_manager = Nexus._create_grammar_manager(self._merger,
             self._content_loader, hooks_runner, rules_config, smrc, mapping_rule_maker,
             transformers_runner)
 
+        profiler.add_span("setup", "nexus", setup_start, profiler.now())
+
         '''ACTION TIME:'''
         self._load_and_register_all_content(rules_config, hooks_runner, transformers_runner)
-        self._grammar_manager.initialize()
+        with profiler.span("initialize", "grammar manager"):
+            self._grammar_manager.initialize()
 
     def _load_and_register_all_content(self, rules_config, hooks_runner, transformers_runner):
         """
@@ -89,11 +109,16 @@ class Nexus:
         all transformers go to transformers runner
         all hooks go to hooks runner
         """
-        content = self._content_loader.load_everything(rules_config)
-        [self._grammar_manager.register_rule(rc, d) for rc, d in content.rules]
-        [transformers_runner.add_transformer(t) for t in content.transformers]
-        [hooks_runner.add_hook(h) for h in content.hooks]
-        self._grammar_manager.load_activation_grammars()
+        profiler = lifecycle_profiler.get_instance()
+        with profiler.span("load content", "nexus"):
+            content = self._content_loader.load_everything(rules_config)
+        with profiler.span("register content", "nexus"):
+            [self._grammar_manager.register_rule(rc, d) for rc, d in content.rules]
+            [self._grammar_manager.register_lazy_rule(lr) for lr in content.lazy_rules]
+            [transformers_runner.add_transformer(t) for t in content.transformers]
+            [hooks_runner.add_hook(h) for h in content.hooks]
+        with profiler.span("load activation grammars", "nexus"):
+            self._grammar_manager.load_activation_grammars()
 
     @staticmethod
     def _create_ccr_rule_validator():
@@ -173,10 +198,46 @@ class Nexus:
     @staticmethod
     def _create_merger(smrc, transformers_runner):
         compat_checker = SimpleCompatibilityChecker()
+        if settings.settings(["ccr_merging", "trie_compatibility_checker"]):
+            compat_checker = TrieCompatibilityChecker()
         merge_strategy = ClassicMergingStrategy()
+        spec_usage_tracker = None
+        if settings.settings(["ccr_merging", "usage_pruning"]):
+            spec_usage_tracker = SpecUsageTracker(SpecUsageConfig())
+            merge_strategy = UsagePruningMergingStrategy(
+                spec_usage_tracker, float(settings.settings(["ccr_merging", "usage_pruning_idle_days"])))
         max_repetitions = settings.settings(["miscellaneous", "max_ccr_repetitions"])
-
-        return CCRMerger2(transformers_runner, compat_checker, merge_strategy, max_repetitions, smrc)
+        merge_cache = None
+        if settings.settings(["ccr_merging", "incremental_merging"]):
+            merge_cache = MergeCache()
+
+        shared_global_rule = settings.settings(["ccr_merging", "shared_global_rule"])
+        content_derived_names = settings.settings(["ccr_merging", "content_derived_names"])
+        merge_plan_cache = None
+        if settings.settings(["ccr_merging", "merge_plan_cache"]):
+            merge_plan_cache = MergePlanCache(settings.settings(["paths", "MERGE_PLAN_PATH"]))
+
+        complexity_budget = ComplexityBudget(
+            int(settings.settings(["ccr_merging", "complexity_max_elements"])),
+            float(settings.settings(["ccr_merging", "complexity_max_log10_paths"])),
+            settings.settings(["ccr_merging", "complexity_over_budget"]))
+
+        adaptive_repetitions = None
+        if settings.settings(["ccr_merging", "adaptive_repetitions"]):
+            adaptive_repetitions = AdaptiveRepetitions(
+                RepetitionsConfig(),
+                int(max_repetitions),
+                int(settings.settings(["ccr_merging", "adaptive_repetitions_min"])),
+                int(settings.settings(["ccr_merging", "adaptive_repetitions_max"])),
+                float(settings.settings(["ccr_merging", "adaptive_repetitions_target_load_seconds"])))
+
+        ccr_partitions = None
+        if settings.settings(["ccr_merging", "partitioned_ccr"]):
+            ccr_partitions = CCRPartitionsConfig()
+
+        return CCRMerger2(transformers_runner, compat_checker, merge_strategy, max_repetitions, smrc,
+                          merge_cache, bool(shared_global_rule), bool(content_derived_names), merge_plan_cache,
+                          complexity_budget, adaptive_repetitions, spec_usage_tracker, ccr_partitions)
 
     def set_ccr_active(self, active):
         self._grammar_manager.set_ccr_active(active)
@@ -0,0 +1,88 @@
+import time
+
+from castervoice.lib import settings
+from castervoice.lib.config.config_toml import TomlConfig
+
+
+class RepetitionsConfig(TomlConfig):
+    """
+    Persists learned max repetitions: {rule set key: [max repetitions, last used time]}.
+    """
+
+    def __init__(self):
+        super(RepetitionsConfig, self).__init__(settings.settings(["paths", "REPETITIONS_CONFIG_PATH"]))
+        self.load()
+
+    def get_all_keys(self):
+        return list(self._config.keys())
+
+    def remove(self, key):
+        self._config.pop(key, None)
+
+
+class AdaptiveRepetitions(object):
+    """
+    Learns a max repetitions ("max_ccr_repetitions") value for each CCR rule
+    set from how long its grammar took to load. Engines compile a Repetition
+    into one copy of its child per allowed repetition, so load time (and the
+    size of the grammar the engine has to search when recognizing) grows with
+    max repetitions:
+
+    - if a load took longer than the target, the rule set's max repetitions
+      is scaled down proportionally
+    - if a load took less than half the target, it is raised by a quarter
+
+    The new value is used the next time the rule set is merged.
+    """
+
+    _MAX_ENTRIES = 200
+
+    def __init__(self, config, default_repetitions, min_repetitions, max_repetitions, target_load_seconds):
+        """
+        :param config: RepetitionsConfig (or any BaseConfig with save/get_all_keys/remove)
+        :param default_repetitions: the max repetitions of a rule set which hasn't been measured
+        :param min_repetitions: the lowest max repetitions which will be learned
+        :param max_repetitions: the highest max repetitions which will be learned
+        :param target_load_seconds: float
+        """
+        self._config = config
+        self._default_repetitions = default_repetitions
+        self._min_repetitions = min_repetitions
+        self._max_repetitions = max_repetitions
+        self._target_load_seconds = target_load_seconds
+
+    def get_max_repetitions(self, key):
+        """
+        :param key: str, identifies a rule set (see rule_fingerprint)
+        :return: int
+        """
+        entry = self._config.get(key)
+        return self._default_repetitions if entry is None else int(entry[0])
+
+    def record_load_time(self, key, load_seconds):
+        """
+        :param key: str, identifies the rule set whose grammar was loaded
+        :param load_seconds: float, how long grammar.load() took
+        """
+        repetitions = self.get_max_repetitions(key)
+        new_repetitions = repetitions
+        if load_seconds > self._target_load_seconds:
+            new_repetitions = int(repetitions * self._target_load_seconds / load_seconds)
+        elif load_seconds < self._target_load_seconds / 2:
+            new_repetitions = repetitions + max(1, repetitions // 4)
+        new_repetitions = max(self._min_repetitions, min(self._max_repetitions, new_repetitions))
+
+        self._config.put(key, [new_repetitions, int(time.time())])
+        self._prune()
+        self._config.save()
+
+    def _prune(self):
+        """
+        Forgets the least recently used rule sets beyond the max number of entries.
+        """
+        keys = self._config.get_all_keys()
+        if len(keys) <= AdaptiveRepetitions._MAX_ENTRIES:
+            return
+        keys.sort(key=lambda k: self._config.get(k)[1])
+        for key in keys[:len(keys) - AdaptiveRepetitions._MAX_ENTRIES]:
+            self._config.remove(key)
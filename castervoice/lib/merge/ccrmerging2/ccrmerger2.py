@@ -1,17 +1,31 @@
+from dragonfly import Function, MappingRule
 from dragonfly.grammar.elements import RuleRef, Alternative, Repetition
 from dragonfly.grammar.rule_compound import CompoundRule
+from castervoice.lib import printer
 from castervoice.lib.const import CCRType
 from castervoice.lib.context import AppContext
+from castervoice.lib.merge import commands_index
+from castervoice.lib.ctrl.mgr.rule_details import RuleDetails
 from castervoice.lib.ctrl.mgr.rules_enabled_diff import RulesEnabledDiff
+from castervoice.lib.merge.ccrmerging2 import rule_fingerprint
+from castervoice.lib.merge.ccrmerging2.compatibility.compat_result import CompatibilityResult
+from castervoice.lib.merge.ccrmerging2.complexity_analyzer import ComplexityAnalyzer, ComplexityBudget, \
+    ComplexityReport, CCRComplexity
 from castervoice.lib.merge.ccrmerging2.merge_result import MergeResult
+from castervoice.lib.merge.ccrmerging2.merge_timings import MergeTimings
+from castervoice.lib.merge.ccrmerging2.partitioning.title_pattern_context import TitlePatternContext
+from castervoice.lib.merge.mergerule import MergeRule
 
 
 class CCRMerger2(object):
     _ORIGINAL = "original"
     _SEQ = "caster_base_sequence"
     _TERMINAL = "terminal"
+    _NAME_HASH_LENGTH = 12
 
-    def __init__(self, transformers_runner, compatibility_checker, merging_strategy, max_repetitions, smr_configurer):
+    def __init__(self, transformers_runner, compatibility_checker, merging_strategy, max_repetitions, smr_configurer,
+                 merge_cache=None, shared_global_rule=False, content_derived_names=False, merge_plan_cache=None,
+                 complexity_budget=None, adaptive_repetitions=None, spec_usage_tracker=None, ccr_partitions=None):
         """
         5-Step Merge Process
         ====================
@@ -26,6 +40,23 @@ class CCRMerger2(object):
         :param merging_strategy: BaseMergingStrategy impl
         :param max_repetitions
         :param smr_configurer
+        :param merge_cache: optional MergeCache; if present, unchanged rules' work is reused between merges
+        :param shared_global_rule: if True, app rules reference the global merged rule rather than
+                each getting their own copy of it; see _create_shared_rule_sets
+        :param content_derived_names: if True, rules and grammars are named from a hash of their
+                content rather than a counter, so names are stable across merges and sessions
+        :param merge_plan_cache: optional MergePlanCache; if present, steps 2 and 3 are skipped when
+                their inputs haven't changed since the last (persisted) merge
+        :param complexity_budget: optional ComplexityBudget; if present, the complexity of each CCR
+                grammar is estimated after step 3, and a warning is printed or the lowest priority
+                rules are dropped if it is over budget
+        :param adaptive_repetitions: optional AdaptiveRepetitions; if present, each CCR grammar's
+                max repetitions is learned from its load times rather than being max_repetitions
+        :param spec_usage_tracker: optional SpecUsageTracker; if present, every spec spoken via
+                the merged rules is recorded (see UsagePruningMergingStrategy)
+        :param ccr_partitions: optional CCRPartitionsConfig; if present, the global rules it lists
+                (e.g. language rules) aren't merged with each other: each gets its own CCR grammar
+                (partition), with the other global rules, active when the window title matches it
         """
         self._transformers_runner = transformers_runner
         self._compatibility_checker = compatibility_checker
@@ -34,34 +65,359 @@ class CCRMerger2(object):
         self._sequence = 0
         self._max_repetitions = int(max_repetitions)
         self._smr_configurer = smr_configurer
+        self._merge_cache = merge_cache
+        self._shared_global_rule = shared_global_rule
+        self._content_derived_names = content_derived_names
+        self._merge_plan_cache = merge_plan_cache
+        self._complexity_budget = complexity_budget
+        self._complexity_analyzer = ComplexityAnalyzer()
+        self._complexity_reports = {}  # {id(rule): (rule, ComplexityReport)}, from the latest merge
+        self._adaptive_repetitions = adaptive_repetitions
+        self._spec_usage_tracker = spec_usage_tracker
+        self._ccr_partitions = ccr_partitions
+        self._fallback_rules_and_contexts = []  # from the latest merge
+        self._transformers_key = None  # of the current merge
+        self._reported_overlaps = []  # [(rcn, rcn)], overlapping rules reported by the latest check
+        self._remerge_fn = None
 
-    def merge_rules(self, managed_rules, rule_sorter):
+    def merge_rules(self, managed_rules, rule_sorter, changed_rcns=()):
         """
         :param managed_rules: list of ManagedRules
         :param rule_sorter: BaseRuleSetSorter impl
+        :param changed_rcns: rule class names whose cached work (if any) must be redone
         :return: MergeResult
         """
+        timings = MergeTimings()
+        self._transformers_key = self._transformers_runner.get_cache_key()
         pre_merge_rcns = [mr.get_rule_class_name() for mr in managed_rules]
         rcns_to_details = CCRMerger2._rule_details_dict(managed_rules)
-        instantiated_rules = self._instantiate_and_configure_rules(managed_rules)
-
-        # 1: run transformers over rules
-        transformed_rules = self._run_transformers(instantiated_rules, rcns_to_details)
-        # 2: sort rules into the order they'll be merged in
-        sorted_rules = rule_sorter.sort_rules(transformed_rules)
-        # 3: compute compatibility results for all rules vs all rules in O(n) for total specs
-        compat_results = self._compatibility_checker.compatibility_check(sorted_rules)
+
+        # selfmod rules' specs don't come from their source, so they're needed up front for the merge plan key
+        prepared_selfmod_rules = {}
+        plan_key = None
+        compat_results = None
+        if self._merge_plan_cache is not None:
+            prepared_selfmod_rules = self._prepare_selfmod_rules(managed_rules)
+            plan_key = self._create_plan_key(managed_rules, rule_sorter, prepared_selfmod_rules)
+            compat_results = self._get_planned_compat_results(plan_key, managed_rules, changed_rcns,
+                                                              prepared_selfmod_rules)
+            timings.lap("merge plan")
+
+        if compat_results is None:
+            # 1: instantiate rules and run transformers over them
+            transformed_rules = self._prepare_rules(managed_rules, changed_rcns, prepared_selfmod_rules)
+            timings.lap("transform")
+            # 2: sort rules into the order they'll be merged in
+            sorted_rules = rule_sorter.sort_rules(transformed_rules)
+            timings.lap("sort")
+            # 3: compute compatibility results for all rules vs all rules in O(n) for total specs
+            if self._merge_cache is None:
+                compat_results = self._compatibility_checker.compatibility_check(sorted_rules)
+            else:
+                graph = self._merge_cache.get_incompatibility_graph()
+                compat_results = self._compatibility_checker.compatibility_check_with_graph(sorted_rules, graph)
+            self._report_overlaps(compat_results)
+            if plan_key is not None:
+                self._merge_plan_cache.save_plan(plan_key, compat_results)
+            timings.lap("compatibility check")
+        if self._complexity_budget is not None and self._complexity_budget.is_limited():
+            compat_results = self._apply_complexity_budget(compat_results, rcns_to_details)
+            timings.lap("complexity budget")
         # 4: create one merged rule for each context, plus the no-contexts merged rule
         app_crs, non_app_crs = self._separate_app_rules(compat_results, rcns_to_details)
-        merged_rules = self._create_merged_rules(app_crs, non_app_crs)
+        non_app_crs, partition_crs = self._separate_partition_rules(non_app_crs)
+        specific_crs_and_contexts = CCRMerger2._create_specific_crs_and_contexts(
+            app_crs, partition_crs, rcns_to_details, self._shared_global_rule)
+        if self._shared_global_rule:
+            rule_sets_and_contexts = self._create_shared_rule_sets(specific_crs_and_contexts, non_app_crs)
+        else:
+            rule_sets_and_contexts = self._create_merged_rule_sets(specific_crs_and_contexts, non_app_crs)
+        timings.lap("merge")
         # 5: turn the merged rules into repeat rules
-        repeat_rules = [self._create_repeat_rule(merged_rule) for merged_rule in merged_rules]
-        contexts = CCRMerger2._create_contexts(app_crs, rcns_to_details)
+        repetition_keys, repetitions = self._get_max_repetitions(rule_sets_and_contexts)
+        structure_fingerprints = None
+        if self._content_derived_names:
+            structure_fingerprints = [rule_fingerprint.structure_fingerprint(merged_rules, context, max_repetitions)
+                                      for (merged_rules, context), max_repetitions
+                                      in zip(rule_sets_and_contexts, repetitions)]
+        rules_and_contexts = self._create_repeat_rules(rule_sets_and_contexts, repetitions, structure_fingerprints)
+        fallback_rules_and_contexts = self._create_fallback_rules(rule_sets_and_contexts)
+        self._fallback_rules_and_contexts = fallback_rules_and_contexts
+        timings.lap("repeat rules")
+        fingerprints = [rule_fingerprint.content_fingerprint(merged_rules, context, max_repetitions)
+                        for (merged_rules, context), max_repetitions in zip(rule_sets_and_contexts, repetitions)]
 
-        rules_and_contexts = zip(repeat_rules, contexts)
         enabled_ordered_rcns = [cr.rule_class_name() for cr in compat_results]
+        commands_index.get_instance().set_rules(
+            CCRMerger2._get_indexed_rules(compat_results, specific_crs_and_contexts))
         diff = CCRMerger2._calculate_post_merge_diff(pre_merge_rcns, enabled_ordered_rcns)
-        return MergeResult(rules_and_contexts, enabled_ordered_rcns, diff)
+        grammar_names = self._create_grammar_names(structure_fingerprints)
+        timings.lap("finish")
+        CCRMerger2._count_merged(timings, managed_rules, compat_results, rules_and_contexts,
+                                 fallback_rules_and_contexts)
+        return MergeResult(rules_and_contexts, enabled_ordered_rcns, diff, self._shared_global_rule, fingerprints,
+                           grammar_names, repetition_keys, fallback_rules_and_contexts, timings)
+
+    @staticmethod
+    def _count_merged(timings, managed_rules, compat_results, rules_and_contexts, fallback_rules_and_contexts):
+        timings.count("rules", len(managed_rules))
+        timings.count("merged rules", len(compat_results))
+        timings.count("specs", sum([len(cr.rule()._mapping) for cr in compat_results]))
+        timings.count("extras", sum([len(cr.rule()._extras) for cr in compat_results]))
+        timings.count("ccr rules", len(rules_and_contexts))
+        timings.count("fallback rules", len(fallback_rules_and_contexts))
+
+    def record_load_time(self, repetition_key, load_seconds):
+        """
+        Informs adaptive repetitions (if enabled) of how long a CCR grammar took to load.
+
+        :param repetition_key: str, from MergeResult.repetition_keys
+        :param load_seconds: float
+        """
+        if self._adaptive_repetitions is not None:
+            self._adaptive_repetitions.record_load_time(repetition_key, load_seconds)
+
+    def set_remerge_fn(self, remerge_fn):
+        """
+        :param remerge_fn: no-arg function which remerges the CCR rules without reusing cached work
+        """
+        self._remerge_fn = remerge_fn
+
+    def get_demoted_specs(self):
+        """
+        :return: sorted list of the specs which the latest merge demoted to non-CCR rules
+        """
+        specs = set()
+        for fallback_rule, _ in self._fallback_rules_and_contexts:
+            specs.update(fallback_rule.get_mapping().keys())
+        return sorted(specs)
+
+    def restore_demoted_specs(self):
+        """
+        Counts the demoted specs as just spoken, and remerges so they're CCR commands again.
+        """
+        self._spec_usage_tracker.restore(self.get_demoted_specs())
+        if self._remerge_fn is not None:
+            self._remerge_fn()
+
+    def construct_activation_rule(self):
+        """
+        :return: (rule class, RuleDetails) of the commands for inspecting/restoring
+                 demoted specs, or None if spec usage isn't tracked
+        """
+        if self._spec_usage_tracker is None:
+            return None
+
+        def list_demoted_specs():
+            specs = self.get_demoted_specs()
+            printer.out("Demoted commands ({}):\n{}".format(len(specs), "\n".join(specs)))
+
+        class DemotedSpecsRule(MappingRule):
+            mapping = {
+                "list demoted commands": Function(list_demoted_specs),
+                "restore demoted commands": Function(self.restore_demoted_specs)
+            }
+        details = RuleDetails(name="ccr merger demoted commands rule",
+                              watch_exclusion=True)
+
+        return DemotedSpecsRule, details
+
+    def _get_max_repetitions(self, rule_sets_and_contexts):
+        """
+        :param rule_sets_and_contexts: list of (list of MergeRule, context) tuples
+        :return: (list of keys identifying each grammar's rule set(s) for adaptive repetitions, or None,
+                  list of max repetitions, one per rule set)
+        """
+        if self._adaptive_repetitions is None:
+            return None, [self._max_repetitions] * len(rule_sets_and_contexts)
+        keys = [rule_fingerprint.structure_fingerprint(merged_rules, context)
+                for merged_rules, context in rule_sets_and_contexts]
+        if self._shared_global_rule:
+            # one grammar, so one load time for all of the rule sets
+            keys = [rule_fingerprint.combine(keys)] if len(keys) > 0 else []
+            repetitions = [self._adaptive_repetitions.get_max_repetitions(k) for k in keys]
+            return keys, repetitions * len(rule_sets_and_contexts)
+        return keys, [self._adaptive_repetitions.get_max_repetitions(k) for k in keys]
+
+    def _prepare_rules(self, managed_rules, changed_rcns, prepared_rules):
+        """
+        :param managed_rules: list of ManagedRule
+        :param changed_rcns: rule class names whose cached work (if any) must be redone
+        :param prepared_rules: {rcn: rule} of rules which were already prepared
+        :return: list of instantiated, configured, transformed rules
+        """
+        def prepare(managed_rule):
+            rcn = managed_rule.get_rule_class_name()
+            if rcn in prepared_rules:
+                return prepared_rules[rcn]
+            return self._prepare_rule(managed_rule)
+
+        if self._merge_cache is None:
+            return [prepare(mr) for mr in managed_rules]
+        return self._merge_cache.update(managed_rules, changed_rcns, prepare)
+
+    def _prepare_selfmod_rules(self, managed_rules):
+        prepared_rules = {}
+        for mr in managed_rules:
+            if mr.get_details().declared_ccrtype == CCRType.SELFMOD:
+                prepared_rules[mr.get_rule_class_name()] = self._prepare_rule(mr)
+        return prepared_rules
+
+    def _create_plan_key(self, managed_rules, rule_sorter, prepared_selfmod_rules):
+        """
+        :return: str, or None if the merge can't be planned (e.g. a transformer can't be cached)
+        """
+        if self._transformers_key is None:
+            return None
+        selfmod_specs = dict([(rcn, rule._mapping.keys()) for rcn, rule in prepared_selfmod_rules.items()])
+        other_inputs = [rule_sorter.get_cache_key(),
+                        self._transformers_key,
+                        self._compatibility_checker.__class__.__name__,
+                        self._merging_strategy.__class__.__name__]
+        return self._merge_plan_cache.create_key(managed_rules, selfmod_specs, other_inputs)
+
+    def _get_planned_compat_results(self, plan_key, managed_rules, changed_rcns, prepared_selfmod_rules):
+        """
+        If there's a valid merge plan, only the rules which survived it need to
+        be prepared, and the compat results can be recreated without sorting or checking.
+
+        :return: list of CompatibilityResult, or None if there's no valid plan
+        """
+        if plan_key is None:
+            return None
+        plan = self._merge_plan_cache.get_plan(plan_key)
+        if plan is None:
+            return None
+        rcns_to_managed_rules = dict([(mr.get_rule_class_name(), mr) for mr in managed_rules])
+        planned_managed_rules = [rcns_to_managed_rules[rcn] for rcn, _ in plan]
+        rules = self._prepare_rules(planned_managed_rules, changed_rcns, prepared_selfmod_rules)
+        return [CompatibilityResult(rule, frozenset(incompatible_rcns))
+                for rule, (_, incompatible_rcns) in zip(rules, plan)]
+
+    def _report_overlaps(self, compat_results):
+        """
+        Warns about rules which survived the compatibility check, but where
+        one rule's command can be spoken as the start of the other's (see
+        TrieCompatibilityChecker). The engine has to disambiguate those, so
+        the user may want to disable one. Only changes in the overlaps are reported.
+
+        :param compat_results: list of CompatibilityResult
+        """
+        overlaps = sorted(set([tuple(sorted([cr.rule_class_name(), overlapping_rcn]))
+                               for cr in compat_results
+                               for overlapping_rcn in cr.overlapping_rule_class_names()]))
+        if len(overlaps) > 0 and overlaps != self._reported_overlaps:
+            printer.out("CCR rules with overlapping commands: {}".format(
+                ", ".join(["{} and {}".format(a, b) for a, b in overlaps])))
+        self._reported_overlaps = overlaps
+
+    def _apply_complexity_budget(self, compat_results, rcns_to_details):
+        """
+        Estimates the complexity of each CCR grammar the compat results will
+        be merged into. If any is over budget, either warns, or drops the lowest
+        priority rules of the grammar which is over budget until none are. The
+        rules specific to that grammar (its app or partition rules) go first,
+        since the other grammars don't have them. Rules later in merge order
+        win conflicts, so the earliest rules have the lowest priority.
+
+        :param compat_results: list of CompatibilityResult, in merge order
+        :param rcns_to_details: map of {rule class name: rule details}
+        :return: list of CompatibilityResult
+        """
+        reports = {}
+        for cr in compat_results:
+            rule = cr.rule()
+            cached = self._complexity_reports.get(id(rule))
+            report = cached[1] if cached is not None and cached[0] is rule \
+                else self._complexity_analyzer.analyze_rule(rule)
+            reports[id(rule)] = (rule, report)
+        self._complexity_reports = reports
+
+        kept_crs = list(compat_results)
+        while len(kept_crs) > 0:
+            over_budget = [(c, specific_crs) for c, specific_crs
+                           in self._estimate_ccr_complexities(kept_crs, rcns_to_details)
+                           if self._complexity_budget.is_exceeded_by(c)]
+            if len(over_budget) == 0:
+                break
+            complexity, specific_crs = over_budget[0]
+            if self._complexity_budget.over_budget_action != ComplexityBudget.DROP:
+                printer.out("CCR grammar may be too complex: {}".format(complexity.get_description()))
+                break
+            dropped_cr = specific_crs[0] if len(specific_crs) > 0 else kept_crs[0]
+            kept_crs.remove(dropped_cr)
+            printer.out("CCR grammar over complexity budget ({}), dropped rule: {}".format(
+                complexity.get_description(), dropped_cr.rule_class_name()))
+        return kept_crs
+
+    def _estimate_ccr_complexities(self, compat_results, rcns_to_details):
+        """
+        :return: list of (CCRComplexity, list of the CompatibilityResults specific to the grammar
+                 (none for the core grammar), in merge order), one for each CCR grammar which would be created
+        """
+        grammar_repetitions = self._get_grammar_repetitions(compat_results, rcns_to_details)
+        non_app_report = ComplexityReport()
+        non_app_count = 0
+        app_crs = []
+        partition_crs = []
+        for cr in compat_results:
+            is_partition = self._ccr_partitions is not None and \
+                self._ccr_partitions.get_patterns(cr.rule_class_name()) is not None
+            if rcns_to_details[cr.rule_class_name()].declared_ccrtype == CCRType.APP:
+                app_crs.append(cr)
+            elif is_partition:
+                partition_crs.append(cr)
+            else:
+                non_app_report += self._complexity_reports[id(cr.rule())][1]
+                non_app_count += 1
+        specific_cr_sets = [[cr] for cr in app_crs + partition_crs]
+        if self._shared_global_rule:
+            # see _create_specific_crs_and_contexts
+            specific_cr_sets.extend([[app_cr, partition_cr] for app_cr in app_crs for partition_cr in partition_crs])
+
+        complexities = [(CCRComplexity(non_app_report, non_app_count,
+                                       grammar_repetitions.get(frozenset(), self._max_repetitions)), [])]
+        for specific_crs in specific_cr_sets:
+            report = non_app_report
+            for cr in specific_crs:
+                report += self._complexity_reports[id(cr.rule())][1]
+            specific_crs = sorted(specific_crs, key=compat_results.index)
+            max_repetitions = grammar_repetitions.get(frozenset([cr.rule_class_name() for cr in specific_crs]),
+                                                      self._max_repetitions)
+            complexities.append((CCRComplexity(report, non_app_count + len(specific_crs), max_repetitions),
+                                 specific_crs))
+        return complexities
+
+    def _get_grammar_repetitions(self, compat_results, rcns_to_details):
+        """
+        With adaptive repetitions, each CCR grammar is built with the max
+        repetitions learned for its merged rules, so finding out what they
+        would be means merging the compat results as merge_rules does.
+
+        :return: {frozenset of the rule class names specific to a grammar (empty for the
+                 core grammar): the max repetitions it would be built with}
+        """
+        if self._adaptive_repetitions is None:
+            return {}
+        app_crs, non_app_crs = self._separate_app_rules(compat_results, rcns_to_details)
+        non_app_crs, partition_crs = self._separate_partition_rules(non_app_crs)
+        specific_crs_and_contexts = CCRMerger2._create_specific_crs_and_contexts(
+            app_crs, partition_crs, rcns_to_details, self._shared_global_rule)
+        grammar_repetitions = {}
+        if self._shared_global_rule:
+            # one grammar, so one max repetitions for all of the rule sets
+            _, repetitions = self._get_max_repetitions(
+                self._create_shared_rule_sets(specific_crs_and_contexts, non_app_crs))
+            for specific_crs, _ in specific_crs_and_contexts:
+                if len(repetitions) > 0:
+                    grammar_repetitions[frozenset([cr.rule_class_name() for cr in specific_crs])] = repetitions[0]
+            return grammar_repetitions
+        for specific_crs, context in specific_crs_and_contexts:
+            _, repetitions = self._get_max_repetitions(
+                self._create_merged_rule_sets([(specific_crs, context)], non_app_crs))
+            if len(repetitions) > 0:
+                grammar_repetitions[frozenset([cr.rule_class_name() for cr in specific_crs])] = repetitions[0]
+        return grammar_repetitions
 
     @staticmethod
     def _calculate_post_merge_diff(pre_merge_rcns, post_merge_rcns):
@@ -87,23 +443,19 @@ class CCRMerger2(object):
 
         return RulesEnabledDiff(newly_enabled, newly_disabled)
 
-    def _instantiate_and_configure_rules(self, managed_rules):
-        instantiated_rules = []
-        for mr in managed_rules:
-            mergerule = mr.get_rule_instance()
-            # smr configurer only configures selfmodrules, but checks all
-            self._smr_configurer.configure(mergerule)
-            instantiated_rules.append(mergerule)
-        return instantiated_rules
-
-    def _run_transformers(self, instantiated_rules, rcns_to_details):
-        transformed_rules = []
-        for rule in instantiated_rules:
-            has_exclusion = rcns_to_details[rule.get_rule_class_name()].transformer_exclusion
-            if not has_exclusion:
-                rule = self._transformers_runner.transform_rule(rule)
-            transformed_rules.append(rule)
-        return transformed_rules
+    def _prepare_rule(self, managed_rule):
+        """
+        Instantiates, configures, and transforms a single rule.
+
+        :param managed_rule: ManagedRule
+        :return: MergeRule
+        """
+        rule = managed_rule.get_rule_instance()
+        # smr configurer only configures selfmodrules, but checks all
+        self._smr_configurer.configure(rule)
+        if not managed_rule.get_details().transformer_exclusion:
+            rule = self._transformers_runner.transform_rule(rule, self._transformers_key)
+        return rule
 
     def _separate_app_rules(self, compat_results, rcns_to_details):
         """
@@ -121,42 +473,300 @@ class CCRMerger2(object):
                 non_app_crs.append(cr)
         return app_crs, non_app_crs
 
-    def _create_merged_rules(self, app_crs, non_app_crs):
-        merged_rules = []
-        merged_non_app_crs_rule = self._merging_strategy.merge_into_single(non_app_crs)
-        if merged_non_app_crs_rule is not None:
-            merged_rules.append(merged_non_app_crs_rule)
-        for app_cr in app_crs:
-            with_one_app = list(non_app_crs)
-            with_one_app.append(app_cr)
-            merged_rules.append(self._merging_strategy.merge_into_single(with_one_app))
-        return merged_rules
+    def _separate_partition_rules(self, non_app_crs):
+        """
+        In partitioned mode, separates the non-app rules which get their own
+        partitions (e.g. language rules) from the "core" non-app rules.
+
+        :param non_app_crs: list of CompatibilityResult for non-app rules
+        :return: (list of CompatibilityResult for core rules, list of (CompatibilityResult, title patterns))
+        """
+        if self._ccr_partitions is None:
+            return non_app_crs, []
+        core_crs = []
+        partition_crs = []
+        for cr in non_app_crs:
+            patterns = self._ccr_partitions.get_patterns(cr.rule_class_name())
+            if patterns is None:
+                core_crs.append(cr)
+            else:
+                partition_crs.append((cr, patterns))
+        return core_crs, partition_crs
+
+    def _create_merged_rule_sets(self, specific_crs_and_contexts, non_app_crs):
+        """
+        :param specific_crs_and_contexts: from _create_specific_crs_and_contexts
+        :param non_app_crs: list of CompatibilityResult for non-app (core) rules
+        :return: list of ([MergeRule], context) tuples
+        """
+        rule_sets_and_contexts = []
+        for specific_crs, context in specific_crs_and_contexts:
+            merged_rule = self._merge_into_single(non_app_crs + specific_crs)
+            if merged_rule is not None:
+                rule_sets_and_contexts.append(([merged_rule], context))
+        return rule_sets_and_contexts
+
+    def _merge_into_single(self, compat_results):
+        if self._merge_cache is None:
+            return self._merging_strategy.merge_into_single(compat_results)
+        return self._merge_cache.get_merged_rule(compat_results, self._merging_strategy.merge_into_single,
+                                                 self._merging_strategy.get_cache_key(compat_results))
+
+    def _create_shared_rule_sets(self, specific_crs_and_contexts, non_app_crs):
+        """
+        Rather than N+1 copies of the global merged rule, creates the global
+        merged rule once. Each app's (or partition's) repeat rule will reference
+        it alongside a rule made from only that app's rule(s), so all of the
+        repeat rules have to go into the same grammar. Each repeat rule is given
+        its own context for that reason.
+
+        An app rule which is incompatible with any global rule gets a full copy
+        as before, since the merging strategy may drop different rules for it.
+
+        :param specific_crs_and_contexts: from _create_specific_crs_and_contexts
+        :param non_app_crs: list of CompatibilityResult for non-app (core) rules
+        :return: list of (list of MergeRule, context) tuples; global first if present
+        """
+        non_app_rcns = set([cr.rule_class_name() for cr in non_app_crs])
+        merged_global_rule = self._merge_into_single(non_app_crs)
+        global_rules = [] if merged_global_rule is None else [merged_global_rule]
+
+        rule_sets_and_contexts = []
+        for specific_crs, context in specific_crs_and_contexts:
+            if len(specific_crs) == 0:
+                if merged_global_rule is not None:
+                    rule_sets_and_contexts.append((global_rules, context))
+            elif any([len(cr.incompatible_rule_class_names() & non_app_rcns) > 0 for cr in specific_crs]):
+                rule_sets_and_contexts.append(([self._merge_into_single(non_app_crs + specific_crs)], context))
+            else:
+                rule_sets_and_contexts.append((global_rules + [self._merge_into_single(specific_crs)], context))
+        return rule_sets_and_contexts
+
+    def _create_repeat_rules(self, rule_sets_and_contexts, repetitions, structure_fingerprints=None):
+        """
+        Prepares the merged rules and creates a repeat rule for each set of them.
+        In shared global rule mode, a merged rule which is in more than one set
+        is only prepared once, and prepared rules get unique names. Only the
+        first prepared rule of each set (the global one, if the set has it) gets
+        the "list available commands" command, so no repeat rule has it twice.
+
+        :param rule_sets_and_contexts: list of (list of MergeRule, context) tuples
+        :param repetitions: list of int, the max repetitions of each set's repeat rule
+        :param structure_fingerprints: list of str, one per set, if names should be content-derived
+        :return: list of (RepeatRule, context) tuples
+        """
+        used_names = set()
+        shared_prepared_rules = {}
+        prepared_rule_sets = []
+        for merged_rules, _ in rule_sets_and_contexts:
+            prepared_rule_set = []
+            for i, merged_rule in enumerate(merged_rules):
+                if not self._shared_global_rule:
+                    prepared_rule_set.append(merged_rule.prepare_for_merger())
+                    continue
+                if id(merged_rule) not in shared_prepared_rules:
+                    fingerprint = None
+                    if structure_fingerprints is not None:
+                        fingerprint = rule_fingerprint.structure_fingerprint([merged_rule], None)
+                    name = self._get_new_rule_name("Prepared", fingerprint, used_names)
+                    shared_prepared_rules[id(merged_rule)] = merged_rule.prepare_for_merger(name, i == 0)
+                prepared_rule_set.append(shared_prepared_rules[id(merged_rule)])
+            prepared_rule_sets.append(prepared_rule_set)
+
+        rules_and_contexts = []
+        for i, (prepared_rule_set, (_, context)) in enumerate(zip(prepared_rule_sets, rule_sets_and_contexts)):
+            fingerprint = None if structure_fingerprints is None else structure_fingerprints[i]
+            name = self._get_new_rule_name("Repeater", fingerprint, used_names)
+            # rules share a grammar in shared global rule mode, so they need their own contexts
+            rule_context = context if self._shared_global_rule else None
+            repeat_rule = self._create_repeat_rule(prepared_rule_set, name, rule_context, repetitions[i])
+            rules_and_contexts.append((repeat_rule, context))
+        return rules_and_contexts
+
+    def _create_fallback_rules(self, rule_sets_and_contexts):
+        """
+        Creates a non-CCR rule for the specs the merging strategy left out of
+        each merged rule, active wherever the merged rule is. In shared global
+        rule mode, the global merged rule is in every rule set, but still only
+        gets one fallback rule.
+
+        :param rule_sets_and_contexts: list of (list of MergeRule, context) tuples
+        :return: list of (MergeRule, context) tuples
+        """
+        merged_rules_in_order = []
+        contexts = {}  # {id(merged rule): list of contexts of the rule sets it is in}
+        for merged_rules, context in rule_sets_and_contexts:
+            for merged_rule in merged_rules:
+                if id(merged_rule) not in contexts:
+                    merged_rules_in_order.append(merged_rule)
+                    contexts[id(merged_rule)] = []
+                contexts[id(merged_rule)].append(context)
+
+        fallback_rules_and_contexts = []
+        for merged_rule in merged_rules_in_order:
+            demoted_rule = self._merging_strategy.get_demoted_rule(merged_rule)
+            if demoted_rule is not None:
+                fallback_rule = self._create_fallback_rule(demoted_rule, self._get_new_rule_name("Fallback"))
+                fallback_rules_and_contexts.append((fallback_rule,
+                                                    CCRMerger2._or_contexts(contexts[id(merged_rule)])))
+        return fallback_rules_and_contexts
+
+    def _create_fallback_rule(self, demoted_rule, name):
+        usage_tracker = self._spec_usage_tracker
+
+        class FallbackRule(MergeRule):
+            def process_recognition(self, node):
+                if usage_tracker is not None:
+                    CCRMerger2._record_spec_usage(node, specs_by_compound_id, usage_tracker)
+                MergeRule.process_recognition(self, node)
+
+        fallback_rule = FallbackRule(name, demoted_rule.get_mapping(), demoted_rule.get_extras(),
+                                     demoted_rule.get_defaults())
+        specs_by_compound_id = CCRMerger2._map_specs_by_compound_id([fallback_rule])
+        return fallback_rule
+
+    @staticmethod
+    def _map_specs_by_compound_id(rules):
+        """
+        :param rules: list of MergeRule
+        :return: {id of the Compound of each spec: spec}
+        """
+        specs_by_compound_id = {}
+        for rule in rules:
+            if rule.element is not None:
+                for compound in rule.element.children:
+                    specs_by_compound_id[id(compound)] = compound._spec
+        return specs_by_compound_id
+
+    @staticmethod
+    def _record_spec_usage(node, specs_by_compound_id, usage_tracker):
+        """
+        Records each spec which was spoken in a recognition.
+
+        :param node: the root node of the recognition
+        :param specs_by_compound_id: {id(Compound): spec}, from _map_specs_by_compound_id
+        :param usage_tracker: SpecUsageTracker
+        """
+        nodes = [node]
+        while len(nodes) > 0:
+            node = nodes.pop()
+            spec = specs_by_compound_id.get(id(node.actor))
+            if spec is not None:
+                usage_tracker.record_use(spec)
+            nodes.extend(node.children)
+
+    def _create_grammar_names(self, structure_fingerprints):
+        """
+        :param structure_fingerprints: list of str, one per repeat rule, or None
+        :return: list of content-derived grammar names, one per grammar, or None
+        """
+        if structure_fingerprints is None:
+            return None
+        if self._shared_global_rule:
+            combined = rule_fingerprint.combine(structure_fingerprints)
+            return ["ccr-" + combined[:CCRMerger2._NAME_HASH_LENGTH]]
+        return ["ccr-" + fingerprint[:CCRMerger2._NAME_HASH_LENGTH] for fingerprint in structure_fingerprints]
 
     @staticmethod
-    def _create_contexts(app_crs, rcns_to_details):
+    def _create_specific_crs_and_contexts(app_crs, partition_crs, rcns_to_details, shared_global_rule=False):
         """
-        Returns a list of AppContexts, based on 'executable', one for each
-        app rule, and if more than zero app rules, the negation context for the
-        global ccr rule. (Global rule should be active when none of the other
-        contexts are.) If there are zero app rules, [None] will be returned
-        so the result can be zipped.
+        Returns the rules which are specific to each ccr grammar, beyond the
+        global (core) rules, and each grammar's context:
+
+        - one for each app rule, with an AppContext based on 'executable'
+        - in partitioned mode, one for each partition rule, with a TitlePatternContext
+        - in partitioned, shared global rule mode, one for each app and partition
+          rule combination
+        - the global one, with no specific rules, whose context is the negation
+          of the other contexts (it should be active when none of the others are)
+
+        Where more than one partition's patterns match a title, the later
+        partition (in merge order) wins. Without a shared global rule, every
+        grammar is a full copy of the core rules, so app and partition rule
+        combinations would multiply the grammars' total size: instead, app rules
+        win over partition rules in their apps. If there are no app or partition
+        rules, [([], None)] is returned.
 
         :param app_crs: list of CompatibilityResult for app rules
+        :param partition_crs: list of (CompatibilityResult, title patterns) for partition rules
         :param rcns_to_details: map of {rule class name: rule details}
-        :return:
+        :param shared_global_rule: whether the core rules are merged once and shared by all grammars
+        :return: list of (list of CompatibilityResult, context) tuples, global first
+        """
+        app_contexts = [AppContext(executable=rcns_to_details[cr.rule_class_name()].executable,
+                                   title=rcns_to_details[cr.rule_class_name()].title) for cr in app_crs]
+        partition_contexts = []
+        for i, (_, patterns) in enumerate(partition_crs):
+            later_patterns = [p for _, later in partition_crs[i + 1:] for p in later]
+            partition_contexts.append(TitlePatternContext(patterns, later_patterns))
+
+        no_app_context = CCRMerger2._create_negation_context(app_contexts)
+        no_partition_context = CCRMerger2._create_negation_context(partition_contexts)
+
+        specific_crs_and_contexts = [([], CCRMerger2._and_contexts(no_app_context, no_partition_context))]
+        for (partition_cr, _), partition_context in zip(partition_crs, partition_contexts):
+            specific_crs_and_contexts.append(([partition_cr],
+                                              CCRMerger2._and_contexts(no_app_context, partition_context)))
+        for app_cr, app_context in zip(app_crs, app_contexts):
+            if not shared_global_rule:
+                specific_crs_and_contexts.append(([app_cr], app_context))
+                continue
+            specific_crs_and_contexts.append(([app_cr], CCRMerger2._and_contexts(app_context, no_partition_context)))
+            for (partition_cr, _), partition_context in zip(partition_crs, partition_contexts):
+                specific_crs_and_contexts.append(([app_cr, partition_cr], app_context & partition_context))
+        return specific_crs_and_contexts
+
+    @staticmethod
+    def _get_indexed_rules(compat_results, specific_crs_and_contexts):
+        """
+        :param compat_results: list of CompatibilityResult, in merge order
+        :param specific_crs_and_contexts: from _create_specific_crs_and_contexts
+        :return: list of (rule class name, MergeRule, context) for the commands index: a rule
+                 specific to some grammars is active where any of them is, the core rules everywhere
+        """
+        specific_contexts = {}
+        for specific_crs, context in specific_crs_and_contexts:
+            for cr in specific_crs:
+                specific_contexts.setdefault(cr.rule_class_name(), []).append(context)
+        return [(cr.rule_class_name(), cr.rule(),
+                 CCRMerger2._or_contexts(specific_contexts.get(cr.rule_class_name(), [None])))
+                for cr in compat_results]
+
+    @staticmethod
+    def _create_negation_context(contexts):
+        """
+        :return: a context which is active when none of the contexts are, or None if there are none
         """
-        contexts = []
         negation_context = None
-        for cr in app_crs:
-            details = rcns_to_details[cr.rule_class_name()]
-            context = AppContext(executable=details.executable, title=details.title)
-            contexts.append(context)
+        for context in contexts:
             if negation_context is None:
                 negation_context = ~context
             else:
                 negation_context &= ~context
-        contexts.insert(0, negation_context)
-        return contexts
+        return negation_context
+
+    @staticmethod
+    def _and_contexts(context, other_context):
+        """
+        :return: a context which is active when both are, where None is always active
+        """
+        if context is None:
+            return other_context
+        if other_context is None:
+            return context
+        return context & other_context
+
+    @staticmethod
+    def _or_contexts(contexts):
+        """
+        :return: a context which is active when any of the contexts are, where None is always active
+        """
+        if len(contexts) == 0 or None in contexts:
+            return None
+        union_context = contexts[0]
+        for context in contexts[1:]:
+            union_context |= context
+        return union_context
 
     @staticmethod
     def _rule_details_dict(managed_rules):
@@ -169,13 +779,18 @@ class CCRMerger2(object):
             result[managed_rule.get_rule_class_name()] = managed_rule.get_details()
         return result
 
-    def _create_repeat_rule(self, merge_rule):
-        merge_rule = merge_rule.prepare_for_merger()
-        alts = [RuleRef(rule=merge_rule)]  # +[RuleRef(rule=sm) for sm in selfmod]
+    def _create_repeat_rule(self, prepared_rules, name, context=None, max_repetitions=None):
+        if max_repetitions is None:
+            max_repetitions = self._max_repetitions
+        alts = [RuleRef(rule=prepared_rule) for prepared_rule in prepared_rules]
         single_action = Alternative(alts)
-        sequence = Repetition(single_action, min=1, max=self._max_repetitions, name=CCRMerger2._SEQ)
+        sequence = Repetition(single_action, min=1, max=max_repetitions, name=CCRMerger2._SEQ)
         original = Alternative(alts, name=CCRMerger2._ORIGINAL)
         terminal = Alternative(alts, name=CCRMerger2._TERMINAL)
+        usage_tracker = self._spec_usage_tracker
+        specs_by_compound_id = None
+        if usage_tracker is not None:
+            specs_by_compound_id = CCRMerger2._map_specs_by_compound_id(prepared_rules)
 
         class RepeatRule(CompoundRule):
             spec = "[<" + CCRMerger2._ORIGINAL + "> original] " + \
@@ -184,6 +799,8 @@ class CCRMerger2(object):
             extras = [sequence, original, terminal]
 
             def _process_recognition(self, node, extras):
+                if usage_tracker is not None:
+                    CCRMerger2._record_spec_usage(node, specs_by_compound_id, usage_tracker)
                 _original = extras[CCRMerger2._ORIGINAL] if CCRMerger2._ORIGINAL in extras else None
                 _sequence = extras[CCRMerger2._SEQ] if CCRMerger2._SEQ in extras else None
                 _terminal = extras[CCRMerger2._TERMINAL] if CCRMerger2._TERMINAL in extras else None
@@ -193,8 +810,25 @@ class CCRMerger2(object):
                         action.execute()
                 if _terminal is not None: _terminal.execute()
 
-        return RepeatRule(name=self._get_new_rule_name())
+        return RepeatRule(name=name, context=context)
 
-    def _get_new_rule_name(self):
-        self._sequence += 1
-        return "Repeater{}".format(str(self._sequence))
+    def _get_new_rule_name(self, prefix, fingerprint=None, used_names=None):
+        """
+        :param prefix: str
+        :param fingerprint: if given, the name is derived from it rather than a counter
+        :param used_names: set of names already used in the same merge; content-derived
+                names are suffixed to keep them unique
+        :return: str
+        """
+        if fingerprint is None:
+            self._sequence += 1
+            return "{}{}".format(prefix, str(self._sequence))
+        base_name = prefix + fingerprint[:CCRMerger2._NAME_HASH_LENGTH]
+        name = base_name
+        suffix = 1
+        while used_names is not None and name in used_names:
+            suffix += 1
+            name = "{}_{}".format(base_name, str(suffix))
+        if used_names is not None:
+            used_names.add(name)
+        return name
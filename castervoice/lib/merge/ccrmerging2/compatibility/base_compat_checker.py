@@ -4,7 +4,17 @@ from castervoice.lib.ctrl.mgr.errors.base_class_error import DontUseBaseClassErr
 class BaseCompatibilityChecker(object):
     """
     Implementors of new compat checkers should override the "compatibility_check" method.
+    They may also override "compatibility_check_with_graph" to make use of an
+    incompatibility graph which was already computed (see MergeCache).
     """
 
     def compatibility_check(self, mergerules):
         raise DontUseBaseClassError(self)
+
+    def compatibility_check_with_graph(self, mergerules, graph):
+        """
+        :param mergerules: collection of MergeRule
+        :param graph: BitsetGraph (or BiDiGraph) of rule class names, connected where rules share specs
+        :return: collection of CompatibilityResult
+        """
+        return self.compatibility_check(mergerules)
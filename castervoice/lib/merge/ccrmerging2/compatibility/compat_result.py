@@ -1,11 +1,14 @@
 class CompatibilityResult(object):
-    def __init__(self, mergerule, incompatible_rule_class_names=[]):
+    def __init__(self, mergerule, incompatible_rule_class_names=[], overlapping_rule_class_names=()):
         """
         :param mergerule: MergeRule
         :param incompatible_rule_class_names: list of strings
+        :param overlapping_rule_class_names: list of strings; rules which are compatible with this
+                one, but which have specs that overlap with its specs (see TrieCompatibilityChecker)
         """
         self._mergerule = mergerule
         self._incompatible_rule_class_names = incompatible_rule_class_names
+        self._overlapping_rule_class_names = overlapping_rule_class_names
 
     def rule(self):
         return self._mergerule
@@ -18,3 +21,6 @@ class CompatibilityResult(object):
 
     def incompatible_rule_class_names(self):
         return set(self._incompatible_rule_class_names)
+
+    def overlapping_rule_class_names(self):
+        return set(self._overlapping_rule_class_names)
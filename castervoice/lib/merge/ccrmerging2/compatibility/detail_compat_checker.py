@@ -1,7 +1,6 @@
 from castervoice.lib.merge.ccrmerging2.compatibility.base_compat_checker import BaseCompatibilityChecker
 from castervoice.lib.merge.ccrmerging2.compatibility.compat_result import CompatibilityResult
-from castervoice.lib.util.bidi_graph import BiDiGraph
-from castervoice.lib.util.hashable_list import HashableList
+from castervoice.lib.util.bitset_graph import BitsetGraph
 
 
 class DetailCompatibilityChecker(BaseCompatibilityChecker):
@@ -39,20 +38,22 @@ class DetailCompatibilityChecker(BaseCompatibilityChecker):
            are grouped by spec. What we want is a graph, with each RCN
            pointing to its incompatible RCNs.
            
-           Still O(n) for the total number of specs.
+           Still O(n) for the total number of specs: the graph stores
+           connections as bitsets, so adding a group is linear in its size.
         '''
         previously_computed_groups = set()
-        graph = BiDiGraph()
+        graph = BitsetGraph()
         # gomir = "group of mutually incompatible rules"
         for gomir in specs_to_lists_of_rcns.values():
             if len(gomir) == 1:
                 continue
 
-            if gomir.get_string() in previously_computed_groups:
+            gomir = tuple(gomir)
+            if gomir in previously_computed_groups:
                 continue
-            previously_computed_groups.add(gomir.get_string())
+            previously_computed_groups.add(gomir)
 
-            graph.add(*gomir.get_list())
+            graph.add(*gomir)
 
         '''
         3. Convert the incompatibility graph to a list of compat results.
@@ -64,6 +65,18 @@ class DetailCompatibilityChecker(BaseCompatibilityChecker):
             results.append(CompatibilityResult(rule, incompats))
         return results
 
+    def compatibility_check_with_graph(self, mergerules, graph):
+        rcns_to_rules = {}
+        for rule in mergerules:
+            rcns_to_rules[rule.get_rule_class_name()] = rule
+
+        results = []
+        for rcn in rcns_to_rules:
+            rule = rcns_to_rules[rcn]
+            incompats = graph.get_node(rcn)
+            results.append(CompatibilityResult(rule, incompats))
+        return results
+
     @staticmethod
     def _invert_mapping(rule, rule_specs, specs_to_rules):
         """
@@ -72,10 +85,13 @@ class DetailCompatibilityChecker(BaseCompatibilityChecker):
         further processing and (B) preserves which specs are responsible,
         in case we want a hook in here or something like that.
 
-        Format is a space delimited string with a leading space
+        Each spec's rule class names are listed in rule order, so the same
+        group of rules always produces the same list.
         """
-
+        rcn = rule.get_rule_class_name()
         for spec in rule_specs:
-            if spec not in specs_to_rules:
-                specs_to_rules[spec] = HashableList()
-            specs_to_rules[spec].add(rule.get_rule_class_name())
+            rcns = specs_to_rules.get(spec)
+            if rcns is None:
+                specs_to_rules[spec] = [rcn]
+            else:
+                rcns.append(rcn)
@@ -22,6 +22,19 @@ class SimpleCompatibilityChecker(BaseCompatibilityChecker):
 
         return list(reversed(results))
 
+    def compatibility_check_with_graph(self, mergerules, graph):
+        kept_rcns = set()
+        results = []
+
+        for rule in reversed(list(mergerules)):
+            rcn = rule.get_rule_class_name()
+            if SimpleCompatibilityChecker._intersection_exists(graph.get_node(rcn), kept_rcns):
+                continue
+            kept_rcns.add(rcn)
+            results.append(CompatibilityResult(rule, frozenset()))
+
+        return list(reversed(results))
+
     @staticmethod
     def _intersection_exists(set_a, set_b):
         """
@@ -0,0 +1,146 @@
+from dragonfly import Alternative, Empty, Literal, Optional, Sequence
+
+from castervoice.lib.merge.ccrmerging2.compatibility.base_compat_checker import BaseCompatibilityChecker
+from castervoice.lib.merge.ccrmerging2.compatibility.compat_result import CompatibilityResult
+
+
+class _TooManyExpansions(Exception):
+    pass
+
+
+class _TrieNode(object):
+    def __init__(self):
+        self.children = {}  # {token: _TrieNode}
+        self.ends = set()  # rcns with a path ending here
+        self.continues = set()  # rcns with a path passing through here
+
+
+class TrieCompatibilityChecker(BaseCompatibilityChecker):
+    """
+    Like SimpleCompatibilityChecker, eliminates incompatible rules using the
+    provided order, but two rules are incompatible if any of their specs can
+    be spoken the same way, not only if they have identical specs.
+    ("close [tab]" and "close" are incompatible.)
+
+    Each spec's optionals and alternatives are expanded into word sequences,
+    which are put into one trie shared by all rules. References to extras
+    are single tokens by extra name, so "go <n>" in two rules also conflicts.
+    Specs with more than max_expansions word sequences are treated as a
+    single opaque token, as if by SimpleCompatibilityChecker.
+
+    Rules which survive, but where one rule's word sequence is a prefix of
+    another's ("close" and "close tab"), are not eliminated, since CCR can
+    still recognize both. Those are reported as overlapping rules in the results,
+    which the merger warns about.
+    """
+
+    def __init__(self, max_expansions=64):
+        self._max_expansions = max_expansions
+
+    def compatibility_check(self, mergerules):
+        root = _TrieNode()
+        results = []
+
+        for rule in reversed(list(mergerules)):
+            rcn = rule.get_rule_class_name()
+            paths = self._get_paths(rule)
+            if TrieCompatibilityChecker._conflicts(root, paths):
+                continue
+            for path in paths:
+                TrieCompatibilityChecker._insert(root, path, rcn)
+            results.append(rule)
+
+        overlaps = TrieCompatibilityChecker._find_prefix_overlaps(root)
+        return [CompatibilityResult(rule, frozenset(), frozenset(overlaps.get(rule.get_rule_class_name(), ())))
+                for rule in reversed(results)]
+
+    def _get_paths(self, rule):
+        """
+        :param rule: MergeRule
+        :return: set of tuples of tokens
+        """
+        paths = set()
+        element = rule.element
+        compounds = [] if element is None else element.children
+        for compound in compounds:
+            try:
+                paths.update(self._expand(compound.children[0]))
+            except _TooManyExpansions:
+                paths.add((u"<spec:{}>".format(compound._spec),))
+        # a spec which can be spoken as nothing doesn't conflict with anything
+        paths.discard(())
+        return paths
+
+    def _expand(self, element):
+        """
+        :param element: dragonfly element
+        :return: list of tuples of tokens
+        """
+        if element.name is not None:
+            return [(u"<{}>".format(element.name),)]
+        if isinstance(element, Literal):
+            return [tuple([word.lower() for word in element.words])]
+        if isinstance(element, Empty):
+            return [()]
+        if isinstance(element, Optional):
+            return self._limit([()] + self._expand(element.children[0]))
+        if isinstance(element, Alternative):
+            expansions = []
+            for child in element.children:
+                expansions.extend(self._expand(child))
+                self._limit(expansions)
+            return expansions
+        if isinstance(element, Sequence):
+            expansions = [()]
+            for child in element.children:
+                child_expansions = self._expand(child)
+                expansions = self._limit([a + b for a in expansions for b in child_expansions])
+            return expansions
+        # anything else (dictation, integers, etc.) can't be expanded and is unique
+        return [(u"<{}:{}>".format(element.__class__.__name__, id(element)),)]
+
+    def _limit(self, expansions):
+        if len(expansions) > self._max_expansions:
+            raise _TooManyExpansions()
+        return expansions
+
+    @staticmethod
+    def _conflicts(root, paths):
+        """
+        :return: whether any of the paths is already in the trie, from another rule
+        """
+        for path in paths:
+            node = root
+            for token in path:
+                node = node.children.get(token)
+                if node is None:
+                    break
+            if node is not None and len(node.ends) > 0:
+                return True
+        return False
+
+    @staticmethod
+    def _insert(root, path, rcn):
+        node = root
+        for token in path:
+            node.continues.add(rcn)
+            node = node.children.setdefault(token, _TrieNode())
+        node.ends.add(rcn)
+
+    @staticmethod
+    def _find_prefix_overlaps(root):
+        """
+        :return: {rcn: set of rcns}, where one rule's word sequence is a prefix of the other's
+        """
+        overlaps = {}
+        nodes = [root]
+        while len(nodes) > 0:
+            node = nodes.pop()
+            nodes.extend(node.children.values())
+            for ending_rcn in node.ends:
+                for continuing_rcn in node.continues:
+                    if ending_rcn == continuing_rcn:
+                        continue
+                    overlaps.setdefault(ending_rcn, set()).add(continuing_rcn)
+                    overlaps.setdefault(continuing_rcn, set()).add(ending_rcn)
+        return overlaps
@@ -0,0 +1,131 @@
+import math
+
+from dragonfly import Alternative, Choice, Literal, Optional, RuleRef, Sequence
+from dragonfly.language.base.integer import Integer
+
+
+class ComplexityReport(object):
+    """
+    Estimated complexity of one or more rules. The numbers are additive, so
+    the complexity of rules merged together is the sum of their reports.
+    """
+
+    def __init__(self, elements=0, alternatives=0, choice_items=0, paths=0):
+        """
+        :param elements: number of dragonfly elements, counting referenced rules once each
+        :param alternatives: number of branches of all Alternatives (including Choices)
+        :param choice_items: number of items of all Choices
+        :param paths: number of distinct ways to speak one command of the rule(s)
+        """
+        self.elements = elements
+        self.alternatives = alternatives
+        self.choice_items = choice_items
+        self.paths = paths
+
+    def __add__(self, other):
+        return ComplexityReport(self.elements + other.elements,
+                                self.alternatives + other.alternatives,
+                                self.choice_items + other.choice_items,
+                                self.paths + other.paths)
+
+
+class CCRComplexity(object):
+    """
+    Estimated complexity of a CCR grammar made from rules with the given
+    (summed) ComplexityReport, repeatable up to max_repetitions times.
+    """
+
+    def __init__(self, report, rule_count, max_repetitions):
+        self.report = report
+        # the repeat rule has a Repetition plus two Alternatives of a RuleRef per rule; engines
+        # compile the Repetition into max_repetitions copies of its child
+        self.elements = report.elements + rule_count * (max_repetitions + 2) + max_repetitions + 3
+        self.repetition_depth = max_repetitions
+        # up to max_repetitions commands per utterance
+        self.log10_paths = max_repetitions * math.log10(max(report.paths, 1))
+
+    def get_description(self):
+        return "{} elements, {} alternatives, {} Choice items, {} repetitions, ~10^{:.1f} paths".format(
+            self.elements, self.report.alternatives, self.report.choice_items,
+            self.repetition_depth, self.log10_paths)
+
+
+class ComplexityAnalyzer(object):
+    """
+    Estimates the complexity of MappingRules/MergeRules from their element
+    trees, so that grammars which are too complex for the engine ("bad grammar")
+    can be caught before they are loaded.
+    """
+
+    def analyze_rule(self, rule):
+        """
+        :param rule: MappingRule or MergeRule
+        :return: ComplexityReport
+        """
+        report = ComplexityReport()
+        if rule.element is not None:
+            self._analyze(rule.element, report, set())
+            report.paths = self._count_paths(rule.element, {})
+        return report
+
+    def _analyze(self, element, report, seen_rules):
+        report.elements += 1
+        if isinstance(element, Alternative):
+            report.alternatives += len(element.children)
+        if isinstance(element, Choice):
+            report.choice_items += len(element.children)
+        if isinstance(element, RuleRef):
+            rule = element.rule
+            if id(rule) not in seen_rules and rule.element is not None:
+                seen_rules.add(id(rule))
+                self._analyze(rule.element, report, seen_rules)
+            return
+        for child in element.children:
+            self._analyze(child, report, seen_rules)
+
+    def _count_paths(self, element, memo):
+        key = id(element)
+        if key in memo:
+            return memo[key]
+        if isinstance(element, Integer):
+            paths = max(element._max - element._min, 1)
+        elif isinstance(element, RuleRef):
+            paths = 1 if element.rule.element is None else self._count_paths(element.rule.element, memo)
+        elif isinstance(element, Optional):
+            paths = 1 + self._count_paths(element.children[0], memo)
+        elif isinstance(element, Alternative):
+            paths = sum([self._count_paths(child, memo) for child in element.children])
+        elif isinstance(element, Sequence):
+            paths = 1
+            for child in element.children:
+                paths *= self._count_paths(child, memo)
+        else:
+            # literals, dictation, etc.
+            paths = 1
+        memo[key] = paths
+        return paths
+
+
+class ComplexityBudget(object):
+    """
+    Limits on CCR grammar complexity. A limit of 0 means no limit.
+    """
+
+    WARN = "warn"
+    DROP = "drop"
+
+    def __init__(self, max_elements=0, max_log10_paths=0, over_budget_action=WARN):
+        self.max_elements = max_elements
+        self.max_log10_paths = max_log10_paths
+        self.over_budget_action = over_budget_action
+
+    def is_limited(self):
+        return self.max_elements > 0 or self.max_log10_paths > 0
+
+    def is_exceeded_by(self, ccr_complexity):
+        """
+        :param ccr_complexity: CCRComplexity
+        :return: bool
+        """
+        return (0 < self.max_elements < ccr_complexity.elements) or \
+               (0 < self.max_log10_paths < ccr_complexity.log10_paths)
@@ -0,0 +1,31 @@
+import hashlib
+import os
+
+
+class FileHasher(object):
+    """
+    Hashes files' contents, only re-reading a file if its modification
+    time or size changed since it was last hashed.
+    """
+
+    def __init__(self):
+        self._hashes = {}  # {path: (mtime, size, hash)}
+
+    def get_hash(self, path):
+        """
+        :param path: str
+        :return: str, or None if the file can't be read
+        """
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        with open(path, "rb") as f:
+            file_hash = hashlib.sha1(f.read()).hexdigest()
+        self._hashes[path] = (stat.st_mtime, stat.st_size, file_hash)
+        return file_hash
@@ -1,3 +1,4 @@
 class EventType(object):
     ACTIVATION = "activation"
     NODE_CHANGE = "node change"
+    MERGE_TIMING = "merge timing"
@@ -0,0 +1,11 @@
+from castervoice.lib.merge.ccrmerging2.hooks.events.base_event import BaseHookEvent
+from castervoice.lib.merge.ccrmerging2.hooks.events.event_types import EventType
+
+
+class MergeTimingEvent(BaseHookEvent):
+    def __init__(self, timings):
+        """
+        :param timings: MergeTimings of a CCR merge and the loading of its grammars
+        """
+        super(MergeTimingEvent, self).__init__(EventType.MERGE_TIMING)
+        self.timings = timings
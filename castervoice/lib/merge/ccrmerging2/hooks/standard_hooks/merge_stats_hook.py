@@ -0,0 +1,39 @@
+import time
+
+from castervoice.lib import settings, utilities
+from castervoice.lib.merge.ccrmerging2.hooks.base_hook import BaseHook
+from castervoice.lib.merge.ccrmerging2.hooks.events.event_types import EventType
+
+
+class MergeStatsHook(BaseHook):
+    """
+    Appends the timings of each CCR merge to a rolling stats file, which
+    keeps only the most recent merges.
+    """
+
+    _MAX_MERGES = 100
+
+    def __init__(self):
+        super(MergeStatsHook, self).__init__(EventType.MERGE_TIMING)
+        self._path = settings.settings(["paths", "MERGE_STATS_PATH"])
+        self._merges = None
+
+    def get_pronunciation(self):
+        return "merge stats"
+
+    def run(self, event):
+        if self._merges is None:
+            self._merges = utilities.load_json_file(self._path).get("merges", [])
+        timings = event.timings
+        self._merges.append({
+            "time": int(time.time()),
+            "total_ms": round(timings.get_total_seconds() * 1000, 1),
+            "steps_ms": [[step, round(seconds * 1000, 1)] for step, seconds in timings.steps],
+            "counts": timings.counts
+        })
+        del self._merges[:-MergeStatsHook._MAX_MERGES]
+        utilities.save_json_file({"merges": self._merges}, self._path)
+
+
+def get_hook():
+    return MergeStatsHook
@@ -0,0 +1,107 @@
+from castervoice.lib.util.bitset_graph import BitsetGraph
+
+
+class _CachedRule(object):
+    def __init__(self, managed_rule, rule, version):
+        self.managed_rule = managed_rule
+        self.rule = rule
+        self.specs = frozenset(rule.get_mapping().keys())
+        self.version = version
+
+
+class MergeCache(object):
+    """
+    Keeps the per-rule results of a merge (instantiated, configured, and
+    transformed rules, plus their incompatibility edges) and the merged rules
+    between merges. When one rule is enabled or disabled, only the work which
+    depends on that rule gets redone.
+
+    This structure is not thread safe.
+    """
+
+    def __init__(self):
+        self._rules = {}  # {rcn: _CachedRule}
+        self._specs_to_rcns = {}  # {spec: set of rcns}
+        self._graph = BitsetGraph()
+        self._merged_rules = {}  # {merge key: MergeRule}, from the latest merge only
+        self._previous_merged_rules = {}
+        self._version = 0
+
+    def update(self, managed_rules, changed_rcns, prepare_fn):
+        """
+        Syncs the cache with the rules about to be merged. Rules which are new,
+        were reported changed, or whose ManagedRule was replaced (reloaded) get
+        prepared again; rules which are no longer present get dropped.
+
+        :param managed_rules: list of ManagedRule
+        :param changed_rcns: collection of rule class names which must not be reused
+        :param prepare_fn: function which takes a ManagedRule and returns a ready-to-sort rule
+        :return: list of prepared rules, in managed_rules order
+        """
+        current_rcns = set(mr.get_rule_class_name() for mr in managed_rules)
+        for rcn in list(self._rules.keys()):
+            if rcn not in current_rcns or rcn in changed_rcns:
+                self._remove(rcn)
+
+        prepared_rules = []
+        for mr in managed_rules:
+            rcn = mr.get_rule_class_name()
+            if rcn in self._rules and self._rules[rcn].managed_rule is not mr:
+                self._remove(rcn)
+            if rcn not in self._rules:
+                self._add(rcn, mr, prepare_fn(mr))
+            prepared_rules.append(self._rules[rcn].rule)
+
+        self._previous_merged_rules = self._merged_rules
+        self._merged_rules = {}
+        return prepared_rules
+
+    def get_incompatibility_graph(self):
+        """
+        :return: BitsetGraph of rcns, connected where rules share a spec
+        """
+        return self._graph
+
+    def get_merged_rule(self, compat_results, merge_fn, strategy_key=None):
+        """
+        Returns the merged rule for these compat results, reusing the one from
+        the previous merge if the same rule versions were merged in the same
+        order with the same incompatibilities (and the same strategy key).
+
+        :param compat_results: list of CompatibilityResult
+        :param merge_fn: the merging strategy's merge function
+        :param strategy_key: the merging strategy's get_cache_key for the compat results
+        :return: MergeRule
+        """
+        key = (tuple((cr.rule_class_name(),
+                      self._rules[cr.rule_class_name()].version,
+                      frozenset(cr.incompatible_rule_class_names())) for cr in compat_results),
+               strategy_key)
+        if key in self._merged_rules:
+            return self._merged_rules[key]
+        if key in self._previous_merged_rules:
+            merged_rule = self._previous_merged_rules[key]
+        else:
+            merged_rule = merge_fn(compat_results)
+        self._merged_rules[key] = merged_rule
+        return merged_rule
+
+    def _add(self, rcn, managed_rule, rule):
+        self._version += 1
+        cached_rule = _CachedRule(managed_rule, rule, self._version)
+        self._rules[rcn] = cached_rule
+        for spec in cached_rule.specs:
+            if spec not in self._specs_to_rcns:
+                self._specs_to_rcns[spec] = set()
+            # the other rules with this spec are already connected to each other
+            self._graph.add(rcn, *self._specs_to_rcns[spec])
+            self._specs_to_rcns[spec].add(rcn)
+
+    def _remove(self, rcn):
+        cached_rule = self._rules.pop(rcn)
+        for spec in cached_rule.specs:
+            rcns = self._specs_to_rcns[spec]
+            rcns.discard(rcn)
+            if len(rcns) == 0:
+                del self._specs_to_rcns[spec]
+        self._graph.remove(rcn)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+
+from dragonfly import get_engine
+
+from castervoice.lib import utilities
+from castervoice.lib.merge.ccrmerging2.file_hasher import FileHasher
+
+
+class MergePlanCache(object):
+    """
+    Persists the "plan" of the most recent merge: which rules survived the
+    sorting and compatibility checking steps, in what order, and with what
+    incompatibilities. If the next merge (usually the one at startup) would
+    have the same inputs, the merger can skip straight to merging.
+
+    Only one plan is kept: the key describes the merge inputs, so a plan for
+    a different set of inputs is simply replaced. The plan of the first
+    (startup) merge is written to disk right away. Later merges (rule
+    toggles) happen while the user waits, so their plans are written on a
+    timer, save_delay_seconds after the first unsaved one; a plan made less
+    than that before Caster exits is lost, and the next startup does a full merge.
+    """
+
+    def __init__(self, path, save_delay_seconds=30, create_timer=None):
+        """
+        :param path: str
+        :param save_delay_seconds: how long after a later merge its plan is written
+        :param create_timer: function(callback, interval in seconds) -> timer with stop(),
+                which calls back every interval; defaults to the engine's timers
+        """
+        self._path = path
+        self._plan = None
+        self._startup_key = None
+        self._file_hasher = FileHasher()
+        self._save_delay_seconds = save_delay_seconds
+        self._create_timer = create_timer or MergePlanCache._create_engine_timer
+        self._save_timer = None
+
+    def get_plan(self, key):
+        """
+        :param key: str, from create_key
+        :return: list of (rcn, list of incompatible rcns), or None if there's no valid plan
+        """
+        if self._plan is None:
+            self._plan = utilities.load_json_file(self._path)
+            self._startup_key = key
+        if self._plan.get("key") != key:
+            return None
+        return [(rcn, incompatible_rcns) for rcn, incompatible_rcns in self._plan["compat_results"]]
+
+    def save_plan(self, key, compat_results):
+        """
+        :param key: str, from create_key
+        :param compat_results: list of CompatibilityResult
+        """
+        compat_results_data = [[cr.rule_class_name(), sorted(cr.incompatible_rule_class_names())]
+                               for cr in compat_results]
+        self._plan = {"key": key, "compat_results": compat_results_data}
+        if key == self._startup_key:
+            self.save()
+        elif self._save_timer is None:
+            self._save_timer = self._create_timer(self.save, self._save_delay_seconds)
+
+    def save(self):
+        """
+        Writes the current plan, and cancels any pending timed write.
+        """
+        if self._save_timer is not None:
+            self._save_timer.stop()
+            self._save_timer = None
+        if self._plan is not None:
+            utilities.save_json_file(self._plan, self._path)
+
+    def create_key(self, managed_rules, selfmod_specs, other_inputs):
+        """
+        :param managed_rules: list of ManagedRule
+        :param selfmod_specs: {rcn: list of specs} for selfmod rules, whose specs don't come from source
+        :param other_inputs: anything else (json-serializable) which affects the merge plan
+        :return: str
+        """
+        rules_data = []
+        for mr in managed_rules:
+            details = mr.get_details()
+            rules_data.append([mr.get_rule_class_name(),
+                               self._file_hasher.get_hash(details.get_filepath()),
+                               details.declared_ccrtype,
+                               details.executable,
+                               details.title,
+                               details.transformer_exclusion,
+                               sorted(selfmod_specs.get(mr.get_rule_class_name(), []))])
+        data = json.dumps([rules_data, other_inputs], sort_keys=True)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _create_engine_timer(callback, interval):
+        return get_engine().create_timer(callback, interval)
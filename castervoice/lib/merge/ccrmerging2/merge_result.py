@@ -1,11 +1,25 @@
 class MergeResult(object):
 
-    def __init__(self, ccr_rules_and_contexts, all_rule_class_names, rules_enabled_diff):
+    def __init__(self, ccr_rules_and_contexts, all_rule_class_names, rules_enabled_diff, single_grammar=False,
+                 fingerprints=None, grammar_names=None, repetition_keys=None,
+                 fallback_rules_and_contexts=None, timings=None):
         """
         :param ccr_rules_and_contexts: 1-n RepeatRules and 0-n AppContexts
         :param all_rule_class_names: list of str
         :param rules_enabled_diff: RulesEnabledDiff
+        :param single_grammar: if True, the RepeatRules share rules between them, carry
+                their own contexts, and must all be loaded into one grammar
+        :param repetition_keys: if adaptive repetitions is on, one key per grammar, for reporting load times
+        :param fallback_rules_and_contexts: 0-n non-CCR rules of specs the merging strategy demoted,
+                and their AppContexts
+        :param timings: MergeTimings of the merge
         """
         self.ccr_rules_and_contexts = ccr_rules_and_contexts
         self.all_rule_class_names = all_rule_class_names
         self.rules_enabled_diff = rules_enabled_diff
+        self.single_grammar = single_grammar
+        self.fingerprints = fingerprints
+        self.grammar_names = grammar_names
+        self.repetition_keys = repetition_keys
+        self.fallback_rules_and_contexts = fallback_rules_and_contexts or []
+        self.timings = timings
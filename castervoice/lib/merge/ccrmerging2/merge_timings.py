@@ -0,0 +1,34 @@
+import timeit
+
+
+class MergeTimings(object):
+    """
+    Times the steps of a merge (and of loading its grammars), lap by lap,
+    and counts what was merged, so slow merges can be diagnosed.
+    """
+
+    def __init__(self):
+        self.steps = []  # [(step name, seconds)], in order
+        self.counts = {}  # {what was counted: int}
+        self._last_lap = timeit.default_timer()
+
+    def lap(self, step):
+        """
+        Ends a step: it took the time since the previous step ended (or the timings were created).
+
+        :param step: str, name of the step
+        """
+        now = timeit.default_timer()
+        self.steps.append((step, now - self._last_lap))
+        self._last_lap = now
+
+    def count(self, name, number):
+        self.counts[name] = number
+
+    def get_total_seconds(self):
+        return sum([seconds for _, seconds in self.steps])
+
+    def get_description(self):
+        steps = ", ".join(["{} {:.1f}ms".format(step, seconds * 1000) for step, seconds in self.steps])
+        counts = ", ".join(["{} {}".format(name, self.counts[name]) for name in sorted(self.counts)])
+        return "merge took {:.1f}ms: {} ({})".format(self.get_total_seconds() * 1000, steps, counts)
@@ -9,3 +9,22 @@ class BaseMergingStrategy(object):
 
     def merge_into_single(self, sorted_checked_rules):
         raise DontUseBaseClassError() # pylint: disable=no-value-for-parameter
+
+    def get_demoted_rule(self, merged_rule):
+        """
+        Strategies may leave some specs out of a merged rule, to be loaded as non-CCR commands instead.
+
+        :param merged_rule: MergeRule, returned by merge_into_single
+        :return: MergeRule of the specs left out of the merged rule, or None
+        """
+        return None
+
+    def get_cache_key(self, sorted_checked_rules):
+        """
+        Strategies whose merged rule depends on more than the rules and their
+        incompatibilities must say so, or an incremental merge may reuse a stale merged rule.
+
+        :param sorted_checked_rules: list of CompatibilityResult, as for merge_into_single
+        :return: hashable state which the merged rule also depends on, or None
+        """
+        return None
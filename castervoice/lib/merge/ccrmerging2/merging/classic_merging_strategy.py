@@ -1,4 +1,5 @@
 from castervoice.lib.merge.ccrmerging2.merging.base_merging_strategy import BaseMergingStrategy
+from castervoice.lib.merge.mergerule import MergeRule
 
 
 class ClassicMergingStrategy(BaseMergingStrategy):
@@ -9,7 +10,8 @@ class ClassicMergingStrategy(BaseMergingStrategy):
     def merge_into_single(self, sorted_checked_rules):
         """
         Merge any rules which aren't KO'd by their peers.
-        Done in O(n) for the total number of specs.
+        Done in O(n) for the total number of specs, and only
+        one merged rule is constructed.
 
         :param sorted_checked_rules: list of CompatibilityResult
         :return: MergeRule
@@ -25,20 +27,20 @@ class ClassicMergingStrategy(BaseMergingStrategy):
             indices_map[compat_result.rule_class_name()] = index
 
         # rules with higher indices (activated "later") get priority
-        merged_rule = None
+        surviving_rules = []
         for index in rule_range:
             compat_result = sorted_checked_rules[index]
             ko = False
             rule_index = indices_map[compat_result.rule_class_name()]
             # this looks like O(n^2), and it is for the rule graph, but it's O(n) for specs:
             for incompat_rcn in compat_result.incompatible_rule_class_names():
+                # incompatible rules which aren't part of this merge (e.g. other app rules) can't KO
+                if incompat_rcn not in indices_map:
+                    continue
                 incompat_index = indices_map[incompat_rcn]
                 if incompat_index > rule_index:
                     ko = True
                     break
             if not ko:
-                if merged_rule is None:
-                    merged_rule = compat_result.rule()
-                else:
-                    merged_rule = merged_rule.merge(compat_result.rule())
-        return merged_rule
+                surviving_rules.append(compat_result.rule())
+        return MergeRule.merge_all(surviving_rules)
@@ -0,0 +1,65 @@
+import weakref
+
+from castervoice.lib.merge.ccrmerging2.merging.classic_merging_strategy import ClassicMergingStrategy
+from castervoice.lib.merge.mergerule import MergeRule
+
+
+class UsagePruningMergingStrategy(ClassicMergingStrategy):
+    """
+    KOs incompatible rules like ClassicMergingStrategy, then demotes specs
+    which haven't been spoken in max_idle_days out of the merged rule. The
+    engine searches the CCR grammar on every utterance, so keeping it to the
+    specs which are actually used makes it smaller and faster to recognize.
+
+    Demoted specs are still available: the merger loads them as non-CCR
+    commands. Speaking one counts as a use, so it is promoted back into the
+    CCR grammar the next time the rules are merged. The merger's usage
+    tracker must be the same one given to this strategy.
+    """
+
+    def __init__(self, usage_tracker, max_idle_days):
+        """
+        :param usage_tracker: SpecUsageTracker
+        :param max_idle_days: how long a spec may go unspoken before it is demoted
+        """
+        self._usage_tracker = usage_tracker
+        self._max_idle_seconds = max_idle_days * 24 * 60 * 60
+        self._demoted_rules = weakref.WeakKeyDictionary()  # {merged rule: demoted rule}
+
+    def merge_into_single(self, sorted_checked_rules):
+        merged_rule = super(UsagePruningMergingStrategy, self).merge_into_single(sorted_checked_rules)
+        if merged_rule is None:
+            return None
+
+        mapping = merged_rule.get_mapping()
+        demoted_mapping = {}
+        for spec in self._get_idle_specs(mapping.keys()):
+            demoted_mapping[spec] = mapping.pop(spec)
+        if len(demoted_mapping) == 0:
+            return merged_rule
+
+        extras = merged_rule.get_extras()
+        defaults = merged_rule.get_defaults()
+        pruned_rule = MergeRule(mapping=mapping, extras=extras, defaults=defaults)
+        self._demoted_rules[pruned_rule] = MergeRule(mapping=demoted_mapping, extras=extras, defaults=defaults)
+        return pruned_rule
+
+    def get_demoted_rule(self, merged_rule):
+        return self._demoted_rules.get(merged_rule)
+
+    def get_cache_key(self, sorted_checked_rules):
+        # a spec which was spoken (or became idle) since the last merge changes the merged rule
+        specs = set()
+        for compat_result in sorted_checked_rules:
+            specs.update(compat_result.rule().get_mapping().keys())
+        return self._get_idle_specs(specs)
+
+    def _get_idle_specs(self, specs):
+        """
+        :param specs: iterable of str
+        :return: frozenset of the specs which are idle
+        """
+        idle_specs = frozenset([spec for spec in specs
+                                if self._usage_tracker.is_idle(spec, self._max_idle_seconds)])
+        self._usage_tracker.save()
+        return idle_specs
@@ -0,0 +1,26 @@
+from castervoice.lib import settings, const
+from castervoice.lib.config.config_toml import TomlConfig
+
+
+class CCRPartitionsConfig(TomlConfig):
+    """
+    Controls which global CCR rules get their own partition in partitioned
+    mode: {rule class name: list of window title patterns}.
+    """
+
+    def __init__(self):
+        super(CCRPartitionsConfig, self).__init__(settings.settings(["paths", "CCR_PARTITIONS_CONFIG_PATH"]))
+        self.load()
+        self._initialize()
+
+    def _initialize(self):
+        if len(self._config) == 0:
+            self._config = const.CCR_PARTITIONS_STARTER
+            self.save()
+
+    def get_patterns(self, rcn):
+        """
+        :param rcn: rule class name
+        :return: list of title patterns, or None if the rule isn't partitioned
+        """
+        return None if rcn not in self._config else list(self._config[rcn])
@@ -0,0 +1,39 @@
+import fnmatch
+import re
+
+from dragonfly import Context
+
+
+class TitlePatternContext(Context):
+    """
+    Matches windows whose title contains a word matching any of the given
+    glob patterns (case insensitive), such as "*.py" for an editor showing
+    "main.py - Editor", unless the title also has a word matching any of the
+    excluded patterns.
+    """
+
+    _WORD_SEPARATORS = re.compile(r"[\s\[\]()<>{}\"'|:,;*]+")
+
+    def __init__(self, patterns, excluded_patterns=()):
+        """
+        :param patterns: list of glob patterns, such as "*.py"
+        :param excluded_patterns: list of glob patterns
+        """
+        super(TitlePatternContext, self).__init__()
+        self._patterns = [pattern.lower() for pattern in patterns]
+        self._excluded_patterns = [pattern.lower() for pattern in excluded_patterns]
+        self._str = "{}, excluding {}".format(sorted(patterns), sorted(excluded_patterns))
+
+    def matches(self, executable, title, handle):
+        words = [word for word in TitlePatternContext._WORD_SEPARATORS.split((title or "").lower()) if len(word) > 0]
+        if not TitlePatternContext._any_match(self._patterns, words):
+            return False
+        return not TitlePatternContext._any_match(self._excluded_patterns, words)
+
+    @staticmethod
+    def _any_match(patterns, words):
+        for word in words:
+            for pattern in patterns:
+                if fnmatch.fnmatchcase(word, pattern):
+                    return True
+        return False
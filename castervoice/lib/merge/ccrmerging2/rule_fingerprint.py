@@ -0,0 +1,90 @@
+import hashlib
+
+from dragonfly import Choice, RuleRef
+
+_PRIMITIVES = (basestring, int, long, float, bool, type(None))
+
+
+def content_fingerprint(rules, context, max_repetitions):
+    """
+    Fingerprints the content of a CCR repeat rule: its merged rules' specs,
+    actions, extras, and defaults, plus its context. Actions and other
+    non-primitive values are fingerprinted by identity, so this is only
+    comparable within one session, but it changes if a rule is reloaded.
+
+    :param rules: the MappingRules (usually MergeRules) the repeat rule is made from
+    :param context: the repeat rule's context, or None
+    :param max_repetitions: the repeat rule's max repetitions
+    :return: str
+    """
+    return _hash(_describe(rules, context, max_repetitions, True))
+
+
+def structure_fingerprint(rules, context, max_repetitions=None):
+    """
+    Like content_fingerprint, but only fingerprints what the engine compiles
+    (specs, extras' structure, context), so it is stable across sessions.
+
+    :return: str
+    """
+    return _hash(_describe(rules, context, max_repetitions, False))
+
+
+def combine(fingerprints):
+    """
+    :param fingerprints: list of str
+    :return: str, a fingerprint of the fingerprints, in order
+    """
+    return _hash(u"\n".join(fingerprints))
+
+
+def _hash(description):
+    return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+
+def _describe(rules, context, max_repetitions, include_values):
+    parts = [str(context), str(max_repetitions)]
+    for rule in rules:
+        mapping = rule._mapping
+        for spec in sorted(mapping.keys()):
+            parts.append(spec)
+            if include_values:
+                parts.append(_describe_value(mapping[spec]))
+        extras = rule._extras
+        for name in sorted(extras.keys()):
+            parts.extend(_describe_element(extras[name], include_values))
+        if include_values:
+            defaults = rule._defaults
+            for name in sorted(defaults.keys()):
+                parts.append(name)
+                parts.append(_describe_value(defaults[name]))
+    return u"\n".join([_text(part) for part in parts])
+
+
+def _describe_element(element, include_values):
+    parts = [element.__class__.__name__, str(element.name)]
+    if include_values and not isinstance(element, Choice):
+        # transformers may recreate Choices, so those are described by their contents
+        parts.append(_describe_value(element))
+    if isinstance(element, Choice):
+        choices = element._choices
+        for key in sorted(choices.keys()):
+            parts.append(key)
+            if include_values:
+                parts.append(_describe_value(choices[key]))
+    elif isinstance(element, RuleRef) and element.rule.element is not None:
+        # referenced rules' generated names aren't stable, so describe their contents instead
+        parts.extend(_describe_element(element.rule.element, include_values))
+    else:
+        parts.append(element.gstring())
+    return parts
+
+
+def _describe_value(value):
+    if isinstance(value, _PRIMITIVES):
+        return repr(value)
+    return "{}@{}".format(value.__class__.__name__, id(value))
+
+
+def _text(part):
+    return part if isinstance(part, unicode) else part.decode("utf-8")
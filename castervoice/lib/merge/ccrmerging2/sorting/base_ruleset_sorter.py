@@ -10,3 +10,11 @@ class BaseRuleSetSorter(object):
 
     def sort_rules(self, rules):
         return list(rules)
+
+    def get_cache_key(self):
+        """
+        Sorters with configuration should include it in their keys.
+
+        :return: json-serializable key which identifies this sorter's ordering
+        """
+        return self.__class__.__name__
@@ -22,6 +22,9 @@ class ConfigBasedRuleSetSorter(BaseRuleSetSorter):
         sorted_indexed_rules = sorted(indexed_rules, key=lambda ir: ir.index)
         return [i.rule for i in sorted_indexed_rules]
 
+    def get_cache_key(self):
+        return [self.__class__.__name__, self._ordered_rcns]
+
     @staticmethod
     def _get_class_name(rule):
         return rule.__class__.__name__
@@ -0,0 +1,89 @@
+import time
+
+from castervoice.lib import settings
+from castervoice.lib.config.config_toml import TomlConfig
+
+
+class SpecUsageConfig(TomlConfig):
+    """
+    Persists CCR spec usage: {spec: [times used, last used time]}.
+    """
+
+    def __init__(self):
+        super(SpecUsageConfig, self).__init__(settings.settings(["paths", "SPEC_USAGE_PATH"]))
+        self.load()
+
+
+class SpecUsageTracker(object):
+    """
+    Counts how often each CCR spec is spoken, and remembers when it was last
+    spoken. A spec which has never been spoken counts as used when it is first
+    seen, so newly enabled rules get a full grace period.
+
+    Recognitions happen often, so saving is throttled to at most once per
+    save interval.
+    """
+
+    def __init__(self, config, save_interval_seconds=60):
+        """
+        :param config: SpecUsageConfig (or any BaseConfig with save)
+        :param save_interval_seconds: min time between saves caused by recognitions
+        """
+        self._config = config
+        self._save_interval_seconds = save_interval_seconds
+        self._last_save_time = 0
+        self._unsaved_changes = False
+
+    def record_use(self, spec):
+        """
+        :param spec: str, a spec which was just spoken
+        """
+        now = int(time.time())
+        entry = self._config.get(spec)
+        count = 0 if entry is None else int(entry[0])
+        self._config.put(spec, [count + 1, now])
+        self._unsaved_changes = True
+        if now - self._last_save_time >= self._save_interval_seconds:
+            self._save(now)
+
+    def is_idle(self, spec, max_idle_seconds):
+        """
+        :param spec: str
+        :param max_idle_seconds: how long a spec may go unspoken and not be idle
+        :return: whether the spec hasn't been spoken (or first seen) in over max_idle_seconds
+        """
+        now = int(time.time())
+        entry = self._config.get(spec)
+        if entry is None:
+            self._config.put(spec, [0, now])
+            self._unsaved_changes = True
+            return False
+        return now - int(entry[1]) > max_idle_seconds
+
+    def get_use_count(self, spec):
+        entry = self._config.get(spec)
+        return 0 if entry is None else int(entry[0])
+
+    def restore(self, specs):
+        """
+        Treats the specs as just used, without counting a use, so that they are no longer idle.
+
+        :param specs: iterable of str
+        """
+        now = int(time.time())
+        for spec in specs:
+            self._config.put(spec, [self.get_use_count(spec), now])
+        self._unsaved_changes = True
+        self._save(now)
+
+    def save(self):
+        """
+        Saves if anything has changed since the last save.
+        """
+        self._save(int(time.time()))
+
+    def _save(self, now):
+        if self._unsaved_changes:
+            self._config.save()
+            self._unsaved_changes = False
+        self._last_save_time = now
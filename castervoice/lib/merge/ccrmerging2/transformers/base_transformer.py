@@ -32,3 +32,14 @@ class BaseRuleTransformer(Pronounceable):
 
     def get_class_name(self):
         return self.__class__.__name__
+
+    def get_cache_key(self):
+        """
+        Transformers whose output depends only on their input rule and some
+        configuration (e.g. a file) can return a json-serializable key which
+        changes whenever that configuration does. Caches of transformed rules
+        are only used if all active transformers return a key.
+
+        :return: json-serializable, or None if this transformer's output can't be cached
+        """
+        return None
@@ -1,9 +1,13 @@
+import hashlib
+import json
+
 from dragonfly.grammar.elements import Choice
 
 from castervoice.lib import printer
 from castervoice.lib.merge.ccrmerging2.transformers.base_transformer import BaseRuleTransformer
 from castervoice.lib.merge.ccrmerging2.transformers.text_replacer.tr_item import TRItem
 from castervoice.lib.merge.ccrmerging2.transformers.text_replacer.tr_parser import TRParser
+from castervoice.lib.merge.ccrmerging2.transformers.text_replacer.tr_replacer import TRReplacer
 
 
 def _preserve(spec):
@@ -47,11 +51,7 @@ def _restore(pspec):
     return "".join(c)
 
 
-def _spec_override_from_config(rule, definitions):
-    '''redundant safety check'''
-    if len(definitions) == 0:
-        return rule
-
+def _spec_override_from_config(rule, spec_replacer, extra_replacer, default_replacer):
     '''SPECS'''
     mapping = rule._mapping.copy()
     specs_changed = False
@@ -59,12 +59,9 @@ def _spec_override_from_config(rule, definitions):
         action = mapping[spec]
 
         pspec = _preserve(spec)
-
-        for original in definitions.specs.keys():
-            if original in pspec.altered:
-                new = definitions.specs[original]
-                pspec.altered = pspec.altered.replace(original, new)
-
+        pspec.altered, replaced = spec_replacer.replace(pspec.altered)
+        if not replaced:
+            continue
         pspec.altered = _restore(pspec)
 
         if spec == pspec.altered:
@@ -81,18 +78,12 @@ def _spec_override_from_config(rule, definitions):
     for extra in extras_list:
         # only choices; no need to bother with dictation or integers
         if isinstance(extra, Choice):
-            choices_dict_copy = extra._choices.copy()  # operate on this copy of the choices dict
-            choices_dict_copy_keys = set(choices_dict_copy.keys())
+            choices_dict_copy = {}
             replaced_a_choice_key = False
-            for choices_key in choices_dict_copy_keys:  # ex: "dunce make" = key, something else = value
-                for replaceable_text in definitions.extras.keys():  # ex: "dunce" is key, "down" is the value
-                    if replaceable_text in choices_key:  # ex: "dunce" is in "dunce make"
-                        replaced_a_choice_key = True
-                        value = choices_dict_copy[choices_key]
-                        del choices_dict_copy[choices_key]
-                        replacement = definitions.extras[replaceable_text]
-                        choices_key = choices_key.replace(replaceable_text, replacement)
-                        choices_dict_copy[choices_key] = value
+            for choices_key, value in extra._choices.items():  # ex: "dunce make" = key, something else = value
+                choices_key, replaced = extra_replacer.replace(choices_key)  # ex: "dunce" -> "down"
+                replaced_a_choice_key = replaced_a_choice_key or replaced
+                choices_dict_copy[choices_key] = value
             if replaced_a_choice_key:
                 extras_changed = True
                 new_choice = Choice(extra.name, choices_dict_copy)
@@ -102,23 +93,16 @@ def _spec_override_from_config(rule, definitions):
     '''DEFAULTS'''
     defaults = rule._defaults.copy()
     defaults_changed = False
-    if len(defaults) > 0:
-        for default_key in defaults.keys():  #
-            value = defaults[default_key]
-            if isinstance(value, basestring):
-                '''only replace strings; also,
-                only replace values, not keys:
-                default_key should not be changed - it will never be spoken'''
-                nvalue = value  # new value
-                replaced_a_choice_key = False
-                for old in definitions.defaults.keys():  # 'old' is the target word(s) in the old 'value'
-                    new = definitions.defaults[old]
-                    if old in nvalue:
-                        nvalue = nvalue.replace(old, new)
-                        replaced_a_choice_key = True
-                if replaced_a_choice_key:
-                    defaults[default_key] = nvalue
-                    defaults_changed = True
+    for default_key in defaults.keys():
+        value = defaults[default_key]
+        if isinstance(value, basestring):
+            '''only replace strings; also,
+            only replace values, not keys:
+            default_key should not be changed - it will never be spoken'''
+            nvalue, replaced = default_replacer.replace(value)  # new value
+            if replaced:
+                defaults[default_key] = nvalue
+                defaults_changed = True
 
     if specs_changed or extras_changed or defaults_changed:
         # rule_class = rule.__class__
@@ -132,6 +116,8 @@ def _spec_override_from_config(rule, definitions):
 class TextReplacerTransformer(BaseRuleTransformer):
 
     def __init__(self, parser=TRParser):
+        self._replacers = {}
+        self._cache_key = None  # of the definitions the replacers were compiled from
         try:
             parser_instance = parser()
             self._definitions = parser_instance.create_definitions()
@@ -143,8 +129,33 @@ class TextReplacerTransformer(BaseRuleTransformer):
     def get_pronunciation(self):
         return "text replacer"
 
+    def get_cache_key(self):
+        self._update_replacers()
+        return self._cache_key
+
     def _transform(self, rule):
-        return _spec_override_from_config(rule, self._definitions)
+        if len(self._definitions) == 0:
+            return rule
+        self._update_replacers()
+        return _spec_override_from_config(rule,
+                                          self._replacers["specs"],
+                                          self._replacers["extras"],
+                                          self._replacers["defaults"])
+
+    def _update_replacers(self):
+        """
+        Compiles each kind of definitions once, recompiling (and rehashing
+        them for the cache key) only if the definitions have been changed since.
+        """
+        definitions = [self._definitions.specs, self._definitions.extras, self._definitions.defaults]
+        changed = False
+        for kind, replacements in zip(["specs", "extras", "defaults"], definitions):
+            replacer = self._replacers.get(kind)
+            if replacer is None or not replacer.is_for(replacements):
+                self._replacers[kind] = TRReplacer(replacements)
+                changed = True
+        if changed or self._cache_key is None:
+            self._cache_key = hashlib.sha1(json.dumps(definitions, sort_keys=True).encode("utf-8")).hexdigest()
 
     def _is_applicable(self, rule):
         return True
@@ -0,0 +1,60 @@
+import re
+
+
+class TRReplacer(object):
+    """
+    Replaces every occurrence of any of a set of texts in a single pass,
+    using one regex. The regex is shaped like a trie of the texts so that
+    matching doesn't try every text at every position. Where texts
+    overlap, the longest match wins. Replaced text is not scanned again,
+    so replacements don't chain.
+    """
+
+    def __init__(self, replacements):
+        """
+        :param replacements: dict of {text to replace: replacement}
+        """
+        self._replacements = dict(replacements)
+        self._lookup = dict([(k, v) for k, v in replacements.items() if len(k) > 0])
+        self._pattern = None
+        if len(self._lookup) > 0:
+            trie = {}
+            for text in self._lookup.keys():
+                node = trie
+                for c in text:
+                    node = node.setdefault(c, {})
+                node[None] = True
+            self._pattern = re.compile(TRReplacer._trie_to_regex(trie))
+
+    def replace(self, text):
+        """
+        :param text: str
+        :return: (str, bool): the text with replacements made, and whether any were made
+        """
+        if self._pattern is None:
+            return text, False
+        result, count = self._pattern.subn(lambda m: self._lookup[m.group(0)], text)
+        return result, count > 0
+
+    def is_for(self, replacements):
+        """
+        :param replacements: dict
+        :return: whether this replacer was compiled from an equal dict
+        """
+        return self._replacements == replacements
+
+    @staticmethod
+    def _trie_to_regex(node):
+        """
+        The branches of a node start with different characters, so at most one
+        can match. A node which also ends a text makes its branches optional
+        (and greedy), so the longest text is matched.
+        """
+        branches = [re.escape(c) + TRReplacer._trie_to_regex(child)
+                    for c, child in sorted(node.items()) if c is not None]
+        if len(branches) == 0:
+            return u""
+        if len(branches) == 1 and None not in node:
+            return branches[0]
+        regex = u"(?:" + u"|".join(branches) + u")"
+        return regex + u"?" if None in node else regex
@@ -0,0 +1,64 @@
+import inspect
+import json
+
+from castervoice.lib.merge.ccrmerging2.file_hasher import FileHasher
+from castervoice.lib.merge.selfmod.selfmodrule import BaseSelfModifyingRule
+
+
+class TransformedRuleCache(object):
+    """
+    Remembers what the transformers did to each rule class, so that the next
+    instance of that class can be given the transformed mapping, extras, and
+    defaults without running the transformers over it again.
+
+    An entry is only valid for the same rule class object, the same hash of the
+    rule's source file, and the same transformers configuration. Reloading a
+    rule or changing a transformer's configuration (e.g. words.txt) invalidates it.
+    Only one entry is kept per rule class name.
+
+    Selfmod rules are never cached: their content doesn't come from their source.
+    """
+
+    def __init__(self):
+        self._entries = {}  # {rcn: (key, content)}
+        self._file_hasher = FileHasher()
+
+    def create_key(self, rule, transformers_key):
+        """
+        :param rule: an untransformed rule instance
+        :param transformers_key: the TransformersRunner's cache key
+        :return: hashable key, or None if the rule's transformation can't be cached
+        """
+        if transformers_key is None or isinstance(rule, BaseSelfModifyingRule):
+            return None
+        rule_class = rule.__class__
+        try:
+            source_hash = self._file_hasher.get_hash(inspect.getsourcefile(rule_class))
+        except TypeError:
+            return None
+        if source_hash is None:
+            return None
+        return rule_class, source_hash, json.dumps(transformers_key, sort_keys=True)
+
+    def get(self, key):
+        """
+        :param key: from create_key
+        :return: (True, content) if there's an entry for the key, else (False, None);
+                 content is (mapping, extras, defaults) or None if the transformers changed nothing
+        """
+        entry = self._entries.get(key[0].__name__)
+        if entry is None or entry[0] != key:
+            return False, None
+        return True, entry[1]
+
+    def put(self, key, transformed_rule):
+        """
+        :param key: from create_key
+        :param transformed_rule: the transformers' output, or None if they changed nothing
+        """
+        content = None
+        if transformed_rule is not None:
+            content = (dict(transformed_rule._mapping),
+                       list(transformed_rule._extras.values()),
+                       dict(transformed_rule._defaults))
+        self._entries[key[0].__name__] = (key, content)
@@ -11,9 +11,15 @@ from castervoice.lib.merge.mergerule import MergeRule
 
 class TransformersRunner(ActivationRuleGenerator):
 
-    def __init__(self, config):
+    def __init__(self, config, rule_cache=None):
+        """
+        :param config: TransformersConfig
+        :param rule_cache: optional TransformedRuleCache; if present, rules whose
+               transformation is cached don't have the transformers run over them
+        """
         self._transformers_config = config
         self._transformers = []
+        self._rule_cache = rule_cache
 
     def add_transformer(self, transformer_class):
         transformer = None
@@ -52,19 +58,66 @@ class TransformersRunner(ActivationRuleGenerator):
 
         return TransformersActivationRule, details
 
-    def transform_rule(self, rule_instance):
+    def get_cache_key(self):
+        """
+        :return: json-serializable key for the active transformers' configuration,
+                 or None if any active transformer can't be cached
+        """
+        keys = []
+        for transformer in self._transformers:
+            key = transformer.get_cache_key()
+            if key is None:
+                return None
+            keys.append([transformer.get_class_name(), key])
+        return keys
+
+    def transform_rule(self, rule_instance, transformers_key=None):
+        """
+        :param rule_instance: rule to transform
+        :param transformers_key: get_cache_key(), if the caller already has it for the rules it is transforming
+        :return: transformed rule
+        """
+        cache_key = None
+        if self._rule_cache is not None and len(self._transformers) > 0:
+            if transformers_key is None:
+                transformers_key = self.get_cache_key()
+            cache_key = self._rule_cache.create_key(rule_instance, transformers_key)
+        if cache_key is not None:
+            hit, content = self._rule_cache.get(cache_key)
+            if hit:
+                return TransformersRunner._apply_cached_content(rule_instance, content)
+
         r = rule_instance
         orig_class = TransformersRunner._get_rule_class(r)
+        orig_content = (r._mapping, r._extras, r._defaults)
+        failed = False
         for transformer in self._transformers:
             try:
                 r = transformer.get_transformed_rule(r)
                 TransformersRunner._post_transform_validate(orig_class, r)
             except:
+                failed = True
                 err = "Error while running transformer {} with {} rule."
                 printer.out(err.format(transformer, r))
                 traceback.print_exc()
+
+        # only cache results which can be applied to another instance of the original class
+        if cache_key is not None and not failed and TransformersRunner._get_rule_class(r) == orig_class:
+            content = (r._mapping, r._extras, r._defaults)
+            unchanged = r is rule_instance and all([a is b for a, b in zip(orig_content, content)])
+            self._rule_cache.put(cache_key, None if unchanged else r)
         return r
 
+    @staticmethod
+    def _apply_cached_content(rule, content):
+        if content is None:
+            return rule
+        mapping, extras, defaults = content
+        return rule.__class__(name=rule.name,
+                              mapping=dict(mapping),
+                              extras=list(extras),
+                              defaults=dict(defaults))
+
     @staticmethod
     def _get_rule_class(rule):
         return rule.__class__
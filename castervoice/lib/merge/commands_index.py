@@ -0,0 +1,128 @@
+import re
+
+from dragonfly import Window
+
+_EXTRA_REFERENCE = re.compile(r"<[^<>]*>")
+_WORD = re.compile(r"[\w'.-]+", re.UNICODE)
+
+
+class CommandsIndex(object):
+    """
+    Answers questions about the CCR commands of the latest merge: what they
+    all are, which contain a word, and which rules they came from.
+
+    Merges happen far more often than anyone asks, so a merge only hands
+    over the rules (set_rules). The index (word -> specs, spec -> owning
+    rules) is built on the first query after a merge, and kept until the next.
+
+    Rules which are only active in some contexts (app rules, partition rules)
+    are indexed with their contexts, and queries only answer with the rules
+    active in the foreground window.
+    """
+
+    def __init__(self, get_foreground_window=Window.get_foreground):
+        """
+        :param get_foreground_window: function() -> Window, for matching rules' contexts
+        """
+        self._get_foreground_window = get_foreground_window
+        self._rcns_rules_and_contexts = []
+        self._owners = None  # {spec: list of rcns}
+        self._word_index = None  # {word: set of specs}
+        self._available_commands = None  # (frozenset of active rcns, str)
+
+    def set_rules(self, rcns_rules_and_contexts):
+        """
+        Replaces the indexed rules. Nothing is indexed until the next query.
+
+        :param rcns_rules_and_contexts: list of (rule class name, MergeRule, context), in merge order;
+                the context is where the rule's commands are active, or None for everywhere
+        """
+        self._rcns_rules_and_contexts = rcns_rules_and_contexts
+        self._owners = None
+        self._word_index = None
+        self._available_commands = None
+
+    def get_available_commands(self):
+        """
+        :return: str, the active specs, sorted, one per line
+        """
+        self._build()
+        active_rcns = self._get_active_rcns()
+        if self._available_commands is None or self._available_commands[0] != active_rcns:
+            specs = [spec for spec, owners in self._owners.items() if not active_rcns.isdisjoint(owners)]
+            if len(specs) == 0:
+                commands = "Available commands not set yet."
+            else:
+                commands = "\n".join(sorted(specs))
+            self._available_commands = (active_rcns, commands)
+        return self._available_commands[1]
+
+    def find_specs(self, words):
+        """
+        :param words: str, one or more words
+        :return: sorted list of the active specs which contain all of the words (extras' names don't count)
+        """
+        self._build()
+        specs = None
+        for word in CommandsIndex._get_words(words):
+            word_specs = self._word_index.get(word, frozenset())
+            specs = set(word_specs) if specs is None else specs & word_specs
+            if len(specs) == 0:
+                break
+        if not specs:
+            return []
+        active_rcns = self._get_active_rcns()
+        return sorted([spec for spec in specs if not active_rcns.isdisjoint(self._owners[spec])])
+
+    def get_owners(self, spec):
+        """
+        :param spec: str
+        :return: list of the class names of the active rules with the spec, in merge order; later rules win
+        """
+        self._build()
+        active_rcns = self._get_active_rcns()
+        return [rcn for rcn in self._owners.get(spec, ()) if rcn in active_rcns]
+
+    def _get_active_rcns(self):
+        """
+        :return: frozenset of the class names of the rules active in the foreground window
+        """
+        window = None
+        active_rcns = set()
+        for rcn, _, context in self._rcns_rules_and_contexts:
+            if context is not None:
+                if window is None:
+                    window = self._get_foreground_window()
+                if not context.matches(window.executable, window.title, window.handle):
+                    continue
+            active_rcns.add(rcn)
+        return frozenset(active_rcns)
+
+    def _build(self):
+        if self._owners is not None:
+            return
+        owners = {}
+        word_index = {}
+        for rcn, rule, _ in self._rcns_rules_and_contexts:
+            for spec in rule.get_mapping().keys():
+                if spec not in owners:
+                    owners[spec] = []
+                    for word in CommandsIndex._get_words(_EXTRA_REFERENCE.sub(" ", spec)):
+                        word_index.setdefault(word, set()).add(spec)
+                owners[spec].append(rcn)
+        self._owners = owners
+        self._word_index = word_index
+
+    @staticmethod
+    def _get_words(text):
+        return [word.lower() for word in _WORD.findall(text)]
+
+
+_INSTANCE = None
+
+
+def get_instance():
+    global _INSTANCE
+    if _INSTANCE is None:
+        _INSTANCE = CommandsIndex()
+    return _INSTANCE
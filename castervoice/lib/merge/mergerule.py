@@ -3,8 +3,9 @@ import re
 
 from dragonfly import Function, MappingRule
 
-from castervoice.lib import available_commands_tracker, printer
+from castervoice.lib import printer
 from castervoice.lib.ctrl.mgr.rule_formatter import _set_rdescripts
+from castervoice.lib.merge import commands_index, spec_cache
 from castervoice.lib.merge.ccrmerging2.pronounceable import Pronounceable
 
 
@@ -27,19 +28,37 @@ class MergeRule(MappingRule, Pronounceable):
         _set_rdescripts(_mapping, _name)
         #
         super(MergeRule, self).__init__(name=_name,
-                                        mapping=_mapping,
+                                        mapping={},
                                         extras=_extras,
                                         defaults=_defaults)
+        # build the element tree via the spec cache rather than MappingRule's parsing
+        self._mapping = _mapping
+        self._element = spec_cache.get_instance().create_element(self._mapping, self._extras)
 
     def merge(self, other):
-        new_mapping = self.get_mapping()
-        new_mapping.update(other.get_mapping())
+        return MergeRule.merge_all([self, other])
 
-        new_extras = self.get_extras()
-        new_extras.extend(other.get_extras())
+    @staticmethod
+    def merge_all(rules):
+        """
+        Merges any number of rules in one pass, constructing only one new rule.
+        Where rules have specs/extras/defaults in common, later rules win.
 
-        new_defaults = self.get_defaults()
-        new_defaults.update(other.get_defaults())
+        :param rules: list of MergeRule
+        :return: MergeRule, or None if rules is empty
+        """
+        if len(rules) == 0:
+            return None
+        if len(rules) == 1:
+            return rules[0]
+
+        new_mapping = {}
+        new_extras = []
+        new_defaults = {}
+        for rule in rules:
+            new_mapping.update(rule._mapping)
+            new_extras.extend(rule._extras.values())
+            new_defaults.update(rule._defaults)
 
         return MergeRule(mapping=new_mapping,
                          extras=new_extras,
@@ -62,38 +81,39 @@ class MergeRule(MappingRule, Pronounceable):
     def get_pronunciation(self):
         return self.pronunciation if self.pronunciation is not None else self._name
 
-    def prepare_for_merger(self):
+    def prepare_for_merger(self, name=None, list_commands=True):
         """
         The OrderedDict is an optimization for Kaldi engine,
         won't make a difference to other engines.
 
         This is also the appropriate place to add the "list available commands"
-        command, since this happens post-merge.
+        command, since this happens post-merge. The commands it lists come from
+        the commands index, which the merger updates.
 
+        :param name: rule name; must be given if more than one prepared rule will share a grammar
+        :param list_commands: whether to add "list available commands"; only one of the
+                prepared rules referenced by a repeat rule should have it
         :return: MergeRule
         """
 
-        unordered_specs = set(self._mapping.keys())
-        ordered_specs = sorted(unordered_specs)
-
         ordered_dict = collections.OrderedDict()
-        for spec in ordered_specs:
+        for spec in sorted(self._mapping.keys()):
             ordered_dict[spec] = self._mapping[spec]
 
-        act = available_commands_tracker.get_instance()
-        act.set_available_commands("\n".join(ordered_specs))
         # TODO: bring back metarule
-        ordered_dict["list available commands"] = Function(lambda: printer.out(act.get_available_commands()))
+        if list_commands:
+            ordered_dict["list available commands"] = \
+                Function(lambda: printer.out(commands_index.get_instance().get_available_commands()))
 
         extras_copy = self.get_extras()
         defaults_copy = self.get_defaults()
 
-        class PreparedRule(MappingRule):
+        class PreparedRule(MergeRule):
             mapping = ordered_dict
             extras = extras_copy
             defaults = defaults_copy
 
-        return PreparedRule()
+        return PreparedRule(name=name)
 
     def get_rule_class_name(self):
         return self.__class__.__name__
@@ -0,0 +1,166 @@
+import collections
+import locale
+import re
+
+from dragonfly import Alternative, Compound, Literal
+from dragonfly.parsing.parse import CompoundTransformer, ParseError
+
+from castervoice.lib import printer, settings
+
+_REFERENCE = re.compile(r"<\s*([^\s\[\]<>|()]+)\s*>")
+
+
+class _LRUCache(object):
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._items = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key not in self._items:
+            self.misses += 1
+            return None
+        self.hits += 1
+        value = self._items.pop(key)
+        self._items[key] = value
+        return value
+
+    def put(self, key, value):
+        if self._max_size <= 0:
+            return
+        self._items[key] = value
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _CachedCompound(Compound):
+    """
+    A Compound built from an already parsed and transformed spec.
+
+    Compound has no way of being given its element, so this sets the
+    attributes Compound.__init__ sets. That depends on dragonfly's internals:
+    see _is_cached_compound_compatible.
+    """
+
+    def __init__(self, spec, element, extras, value):
+        # pylint: disable=super-init-not-called
+        self._spec = spec
+        self._value = value
+        self._value_func = None
+        self._extras = extras
+        Alternative.__init__(self, (element,))
+
+
+# the arguments of the Compound.__init__ which _CachedCompound was written against
+_COMPOUND_INIT_ARGS = ("self", "spec", "extras", "actions", "name", "value", "value_func", "elements", "default")
+
+
+def _is_cached_compound_compatible():
+    """
+    :return: whether this version of dragonfly's Compound takes the same
+             arguments and sets the same attributes as _CachedCompound does
+    """
+    code = Compound.__init__.__code__
+    if tuple(code.co_varnames[:code.co_argcount]) != _COMPOUND_INIT_ARGS:
+        return False
+    try:
+        compound = Compound(u"spec cache <x>", elements={"x": Literal(u"x", name="x")}, value=1)
+        cached_compound = _CachedCompound(compound._spec, compound.children[0], compound._extras, 1)
+    except Exception:
+        return False
+    return sorted(vars(compound).keys()) == sorted(vars(cached_compound).keys()) and \
+        compound.gstring() == cached_compound.gstring()
+
+
+class SpecCache(object):
+    """
+    Memoizes spec parsing for rule construction. The same specs get parsed
+    many times over (validation, activation triggers, merging, transformers,
+    etc.), so this keeps two bounded caches:
+
+    1. spec -> parse tree
+    2. (spec, the extras the spec references) -> element tree
+
+    Extras are keyed by identity: the element tree contains the extras
+    themselves, so an element tree can only be reused with the same extras.
+    Cached entries keep references to their extras so the identities stay valid.
+    """
+
+    def __init__(self, max_size):
+        self._trees = _LRUCache(max_size)
+        self._elements = _LRUCache(max_size)
+        self._compatible = _is_cached_compound_compatible()
+        if not self._compatible:
+            printer.out("Spec cache disabled: unsupported version of dragonfly's Compound.")
+
+    def create_element(self, mapping, extras):
+        """
+        Creates a MappingRule's root element.
+
+        :param mapping: dict of {spec: action}
+        :param extras: dict of {name: element}
+        :return: Alternative, or None if mapping is empty
+        """
+        children = [self.create_compound(spec, extras, value) for spec, value in mapping.items()]
+        return Alternative(children) if children else None
+
+    def create_compound(self, spec, extras, value):
+        """
+        Equivalent to Compound(spec, elements=extras, value=value).
+
+        :param spec: str
+        :param extras: dict of {name: element}
+        :param value: the Compound's value (an action, for MappingRules)
+        :return: Compound
+        """
+        if not self._compatible:
+            return Compound(spec, elements=extras, value=value)
+        if isinstance(spec, bytes):
+            spec = spec.decode(locale.getpreferredencoding())
+        referenced_extras = tuple([extras.get(name) for name in sorted(set(_REFERENCE.findall(spec)))])
+        key = (spec, tuple([id(extra) for extra in referenced_extras]))
+
+        cached = self._elements.get(key)
+        if cached is None:
+            if None in referenced_extras:
+                # let Compound raise its usual error for the missing extra
+                return Compound(spec, elements=extras, value=value)
+            try:
+                element = CompoundTransformer(extras).transform(self._get_tree(spec))
+            except ParseError:
+                raise
+            except Exception as e:
+                raise ParseError("Exception raised transforming %r: %s" % (spec, e))
+            cached = (referenced_extras, element)
+            self._elements.put(key, cached)
+        return _CachedCompound(spec, cached[1], extras, value)
+
+    def get_stats_report(self):
+        return "Spec cache: parse trees {} hits / {} misses ({} cached), " \
+               "element trees {} hits / {} misses ({} cached)".format(
+                   self._trees.hits, self._trees.misses, len(self._trees),
+                   self._elements.hits, self._elements.misses, len(self._elements))
+
+    def _get_tree(self, spec):
+        tree = self._trees.get(spec)
+        if tree is None:
+            try:
+                tree = Compound._parser.parse(spec)
+            except Exception as e:
+                raise ParseError("Exception raised parsing %r: %s" % (spec, e))
+            self._trees.put(spec, tree)
+        return tree
+
+
+_INSTANCE = None
+
+
+def get_instance():
+    global _INSTANCE
+    if _INSTANCE is None:
+        _INSTANCE = SpecCache(int(settings.settings(["ccr_merging", "spec_cache_size"], 10000)))
+    return _INSTANCE
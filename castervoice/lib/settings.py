@@ -318,6 +318,20 @@ def _get_defaults():
                 _USER_DIR + "/data/hooks.toml",
             "COMPANION_CONFIG_PATH":
                 _USER_DIR + "/data/companion_config.toml",
+            "MERGE_PLAN_PATH":
+                _USER_DIR + "/data/merge_plan.json",
+            "REPETITIONS_CONFIG_PATH":
+                _USER_DIR + "/data/repetitions.toml",
+            "SPEC_USAGE_PATH":
+                _USER_DIR + "/data/spec_usage.toml",
+            "CCR_PARTITIONS_CONFIG_PATH":
+                _USER_DIR + "/data/ccr_partitions.toml",
+            "MERGE_STATS_PATH":
+                _USER_DIR + "/data/merge_stats.json",
+            "CONTENT_MANIFEST_PATH":
+                _USER_DIR + "/data/content_manifest.json",
+            "LIFECYCLE_TRACE_PATH":
+                _USER_DIR + "/data/lifecycle_trace.json",
             "DLL_PATH":
                 _BASE_PATH + "/lib/dll/",
             "GDEF_FILE":
@@ -427,6 +441,9 @@ def _get_defaults():
             "use_aenea": False,
             "hmc": True,
             "ccr_on": True,
+            "content_scan_manifest": False,  # only rescan new/changed content files at startup
+            "lazy_rule_loading": False,  # import disabled rules the first time they're enabled
+            "lifecycle_profiler": False,  # time startup/reloads, write a Chrome trace, print the slowest steps
             "status_window_foreground_on_error": False,
         },
         # Grammar reloading section
@@ -434,6 +451,26 @@ def _get_defaults():
             "reload_trigger": "timer", # manual or timer
             "reload_timer_seconds": 5, # seconds
         },
+        # CCR merging section
+        "ccr_merging": {
+            "incremental_merging": False, # reuse unchanged rules' work between merges
+            "shared_global_rule": False, # app ccr rules reference one global rule instead of copying it
+            "spec_cache_size": 10000, # max parsed specs kept for rule construction; 0 disables
+            "content_derived_names": False, # name grammars/rules by content hash so engines can cache compiles
+            "merge_plan_cache": False, # persist merge plans so unchanged startup merges skip sorting/checking
+            "transformed_rule_cache": False, # reuse transformers' output for unchanged rule classes
+            "trie_compatibility_checker": False, # also treat specs which can be spoken the same way as conflicts
+            "complexity_max_elements": 0, # estimated elements per ccr grammar before warning/dropping; 0 = no limit
+            "complexity_max_log10_paths": 0, # estimated log10 of spoken paths per ccr grammar; 0 = no limit
+            "complexity_over_budget": "warn", # "warn" or "drop" (drops lowest priority ccr rules)
+            "adaptive_repetitions": False, # learn each ccr grammar's max repetitions from its load time
+            "adaptive_repetitions_target_load_seconds": 1.0,
+            "adaptive_repetitions_min": 4,
+            "adaptive_repetitions_max": 32,
+            "usage_pruning": False, # move ccr specs which haven't been spoken in a while to non-ccr grammars
+            "usage_pruning_idle_days": 30,
+            "partitioned_ccr": False, # language ccr rules are only active when the window title matches them
+        },
 
         "formats": {
             "_default": {
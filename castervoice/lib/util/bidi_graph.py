@@ -15,12 +15,23 @@ class BiDiGraph(object):
         node_range = range(0, len(nodes))
         for i in node_range:
             node = nodes[i]
-            if node not in self._nodes.keys():
+            if node not in self._nodes:
                 self._nodes[node] = set()
             for k in node_range:
                 if i != k:
                     self._nodes[node].add(nodes[k])
 
+    def remove(self, node):
+        """
+        Removes a node from the graph, along with all of its connections.
+
+        :param node: a hashable object; need not be in the graph
+        """
+        if node not in self._nodes:
+            return
+        for other in self._nodes.pop(node):
+            self._nodes[other].discard(node)
+
     def get_node(self, node):
         return frozenset() if node not in self._nodes else self._nodes[node]
 
@@ -1,8 +1,9 @@
-from dragonfly import MappingRule, Function, RunCommand, Playback
+from dragonfly import MappingRule, Function, RunCommand, Playback, Dictation
 
-from castervoice.lib import control
+from castervoice.lib import control, printer
 from castervoice.lib.ctrl.dependencies import update, find_pip
 from castervoice.lib.ctrl.mgr.rule_details import RuleDetails
+from castervoice.lib.merge import commands_index
 from castervoice.lib.merge.state.short import R
 
 _PIP = find_pip()
@@ -21,6 +22,17 @@ class _DependencyUpdate(RunCommand):
             Playback([(["reboot", "dragon"], 0.0)]).execute()
 
 
+def _list_commands_containing(words):
+    specs = commands_index.get_instance().find_specs(str(words))
+    printer.out("Commands containing '{}' ({}):\n{}".format(words, len(specs), "\n".join(specs)))
+
+
+def _list_command_owners(words):
+    index = commands_index.get_instance()
+    owners = ["{}: {}".format(spec, ", ".join(index.get_owners(spec))) for spec in index.find_specs(str(words))]
+    printer.out("Rules with commands containing '{}':\n{}".format(words, "\n".join(owners)))
+
+
 class CasterRule(MappingRule):
     mapping = {
         # update management
@@ -34,7 +46,16 @@ class CasterRule(MappingRule):
             R(Function(lambda: control.nexus().set_ccr_active(True))),
         "disable c c r":
             R(Function(lambda: control.nexus().set_ccr_active(False))),
+
+        # diagnostics
+        "list commands containing <words>":
+            R(Function(_list_commands_containing)),
+        "which rule owns <words>":
+            R(Function(_list_command_owners)),
     }
+    extras = [
+        Dictation("words"),
+    ]
 
 
 def get_rule():
@@ -0,0 +1,48 @@
+import importlib
+import pkgutil
+import timeit
+
+from dragonfly import get_engine
+
+from tests.test_util import settings_mocking
+
+
+def setup_environment():
+    """
+    Benchmarks run outside of the test runner, so they need the same
+    setup: the text engine, and settings which never touch the disk.
+    """
+    get_engine("text")
+    settings_mocking.prevent_initialize()
+    settings_mocking.prevent_save()
+
+
+def get_stock_global_ccr_rule_classes():
+    """
+    :return: list of the global CCR rule classes in the core and language rule sets
+    """
+    import castervoice.rules.ccr
+    import castervoice.rules.core
+    from castervoice.lib.const import CCRType
+
+    rule_classes = []
+    for package in [castervoice.rules.core, castervoice.rules.ccr]:
+        for _, module_name, is_package in pkgutil.walk_packages(package.__path__, package.__name__ + "."):
+            if is_package:
+                continue
+            module = importlib.import_module(module_name)
+            if not hasattr(module, "get_rule"):
+                continue
+            rule_class, details = module.get_rule()
+            if details.declared_ccrtype == CCRType.GLOBAL:
+                rule_classes.append(rule_class)
+    return rule_classes
+
+
+def best_time(fn, repetitions=5):
+    """
+    :param fn: no-arg function to time
+    :param repetitions: number of runs
+    :return: the fastest run, in seconds
+    """
+    return min(timeit.repeat(fn, repeat=repetitions, number=1))
@@ -0,0 +1,37 @@
+"""
+Compares merging the stock core + language CCR rules pairwise (one new
+MergeRule per merge) against MergeRule.merge_all (one new MergeRule total).
+
+Run from the repository root:
+    python -m tests.benchmark.merge_all_benchmark
+"""
+from castervoice.lib.merge.mergerule import MergeRule
+from tests.benchmark import benchmark_util
+
+
+def _merge_pairwise(rules):
+    merged_rule = rules[0]
+    for rule in rules[1:]:
+        new_mapping = merged_rule.get_mapping()
+        new_mapping.update(rule.get_mapping())
+        new_extras = merged_rule.get_extras()
+        new_extras.extend(rule.get_extras())
+        new_defaults = merged_rule.get_defaults()
+        new_defaults.update(rule.get_defaults())
+        merged_rule = MergeRule(mapping=new_mapping, extras=new_extras, defaults=new_defaults)
+    return merged_rule
+
+
+if __name__ == "__main__":
+    benchmark_util.setup_environment()
+
+    rules = [rule_class() for rule_class in benchmark_util.get_stock_global_ccr_rule_classes()]
+    spec_count = len(MergeRule.merge_all(rules).get_mapping())
+
+    pairwise_time = benchmark_util.best_time(lambda: _merge_pairwise(rules))
+    merge_all_time = benchmark_util.best_time(lambda: MergeRule.merge_all(rules))
+
+    print("{} rules, {} specs".format(len(rules), spec_count))
+    print("pairwise merge: {:.4f}s".format(pairwise_time))
+    print("merge_all:      {:.4f}s".format(merge_all_time))
+    print("speedup:        {:.1f}x".format(pairwise_time / merge_all_time))
@@ -0,0 +1,216 @@
+"""
+Runs synthetic rule sets of growing size through CCRMerger2 with each
+compatibility checker, and reports wall time, peak memory, and the size of
+the loaded CCR grammars (in elements, as estimated by ComplexityAnalyzer),
+so that regressions in ccrmerging2 show up as numbers.
+
+Each run happens in a fresh process so that peak memory isn't inherited
+from earlier (smaller) runs. Peak memory is only available where the
+resource module is (not on Windows).
+
+Run from the repository root:
+    python -m tests.benchmark.merger_scaling_benchmark
+    python -m tests.benchmark.merger_scaling_benchmark --rules 10 100 --checkers simple --overlap 0.5
+"""
+import argparse
+import multiprocessing
+import random
+import timeit
+
+from tests.benchmark import benchmark_util
+
+_CHECKERS = ["simple", "detail", "trie"]
+_STRATEGIES = ["classic", "usage_pruning"]
+
+
+class RuleSetShape(object):
+    """
+    The shape of a synthetic rule set.
+    """
+
+    def __init__(self, rule_count, specs_per_rule, extras_per_rule, choice_size, app_ratio, overlap_ratio):
+        """
+        :param rule_count: number of rules
+        :param specs_per_rule: number of specs in each rule
+        :param extras_per_rule: number of Choice extras in each rule; specs reference them in turn
+        :param choice_size: number of items in each Choice
+        :param app_ratio: fraction of rules which are app rules, the rest being global
+        :param overlap_ratio: fraction of specs drawn from a pool shared by all rules, so rules conflict
+        """
+        self.rule_count = rule_count
+        self.specs_per_rule = specs_per_rule
+        self.extras_per_rule = extras_per_rule
+        self.choice_size = choice_size
+        self.app_ratio = app_ratio
+        self.overlap_ratio = overlap_ratio
+
+
+def create_managed_rules(shape, seed=0):
+    """
+    Generates MergeRule classes with the given shape, deterministically.
+
+    :param shape: RuleSetShape
+    :param seed: random seed for which specs overlap
+    :return: list of ManagedRule
+    """
+    from dragonfly import Choice
+    from castervoice.lib.const import CCRType
+    from castervoice.lib.ctrl.mgr.managed_rule import ManagedRule
+    from castervoice.lib.ctrl.mgr.rule_details import RuleDetails
+    from castervoice.lib.merge.mergerule import MergeRule
+    from castervoice.lib.merge.state.actions2 import NullAction
+
+    randomizer = random.Random(seed)
+    shared_spec_pool_size = max(shape.specs_per_rule, shape.rule_count // 4)
+    app_count = int(shape.rule_count * shape.app_ratio)
+
+    managed_rules = []
+    for r in range(shape.rule_count):
+        extras = [Choice("extra{}".format(e), dict([("item {} {}".format(e, c), c)
+                                                    for c in range(shape.choice_size)]))
+                  for e in range(shape.extras_per_rule)]
+        mapping = {}
+        for s in range(shape.specs_per_rule):
+            if randomizer.random() < shape.overlap_ratio:
+                words = "shared {}".format(randomizer.randrange(shared_spec_pool_size))
+            else:
+                words = "rule {} spec {}".format(r, s)
+            if shape.extras_per_rule > 0:
+                words += " <extra{}>".format(s % shape.extras_per_rule)
+            mapping[words] = NullAction()
+        rule_class = type("SyntheticRule{}".format(r), (MergeRule,), {"mapping": mapping, "extras": extras})
+
+        if r < app_count:
+            details = RuleDetails(ccrtype=CCRType.APP, executable="app{}".format(r))
+        else:
+            details = RuleDetails(ccrtype=CCRType.GLOBAL)
+        managed_rules.append(ManagedRule(rule_class, details))
+    return managed_rules
+
+
+def _create_merger(checker_name, strategy_name):
+    from mock import Mock
+    from castervoice.lib.config.config_base import BaseConfig
+    from castervoice.lib.merge.ccrmerging2.ccrmerger2 import CCRMerger2
+    from castervoice.lib.merge.ccrmerging2.compatibility.detail_compat_checker import DetailCompatibilityChecker
+    from castervoice.lib.merge.ccrmerging2.compatibility.simple_compat_checker import SimpleCompatibilityChecker
+    from castervoice.lib.merge.ccrmerging2.compatibility.trie_compat_checker import TrieCompatibilityChecker
+    from castervoice.lib.merge.ccrmerging2.merging.classic_merging_strategy import ClassicMergingStrategy
+    from castervoice.lib.merge.ccrmerging2.merging.usage_pruning_merging_strategy import \
+        UsagePruningMergingStrategy
+    from castervoice.lib.merge.ccrmerging2.spec_usage import SpecUsageTracker
+    from castervoice.lib.merge.ccrmerging2.transformers.transformers_runner import TransformersRunner
+
+    class _InMemoryConfig(BaseConfig):
+        def save(self):
+            pass
+
+    checkers = {
+        "simple": SimpleCompatibilityChecker,
+        "detail": DetailCompatibilityChecker,
+        "trie": TrieCompatibilityChecker
+    }
+    usage_tracker = None
+    strategy = ClassicMergingStrategy()
+    if strategy_name == "usage_pruning":
+        usage_tracker = SpecUsageTracker(_InMemoryConfig())
+        strategy = UsagePruningMergingStrategy(usage_tracker, 30)
+    return CCRMerger2(TransformersRunner(Mock()), checkers[checker_name](), strategy, 16, Mock(),
+                      spec_usage_tracker=usage_tracker)
+
+
+def _get_peak_memory_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # kilobytes on Linux, bytes on OS X: good enough for comparing runs on one machine
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_benchmark(shape, checker_name, strategy_name):
+    """
+    Merges and loads one synthetic rule set. Meant to be run in a fresh process.
+
+    :return: dict of results
+    """
+    benchmark_util.setup_environment()
+    from dragonfly import Grammar
+    from castervoice.lib.merge.ccrmerging2.complexity_analyzer import ComplexityAnalyzer
+    from castervoice.lib.merge.ccrmerging2.sorting.config_ruleset_sorter import ConfigBasedRuleSetSorter
+
+    managed_rules = create_managed_rules(shape)
+    merger = _create_merger(checker_name, strategy_name)
+    sorter = ConfigBasedRuleSetSorter([mr.get_rule_class_name() for mr in managed_rules])
+    memory_before = _get_peak_memory_kb()
+
+    start = timeit.default_timer()
+    merge_result = merger.merge_rules(managed_rules, sorter)
+    merge_seconds = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    grammars = []
+    for i, (rule, context) in enumerate(merge_result.ccr_rules_and_contexts):
+        grammar = Grammar("ccr-{}".format(i), context=context)
+        grammar.add_rule(rule)
+        grammar.load()
+        grammars.append(grammar)
+    load_seconds = timeit.default_timer() - start
+
+    analyzer = ComplexityAnalyzer()
+    elements = sum([analyzer.analyze_rule(rule).elements for rule, _ in merge_result.ccr_rules_and_contexts])
+    memory_after = _get_peak_memory_kb()
+    for grammar in grammars:
+        grammar.unload()
+
+    return {
+        "merge_seconds": merge_seconds,
+        "load_seconds": load_seconds,
+        "grammars": len(grammars),
+        # rules which passed the compatibility check and complexity budget, before
+        # the merging strategy (which may demote specs to fallback rules) ran
+        "kept_rules": len(merge_result.all_rule_class_names),
+        "elements": elements,
+        "peak_memory_kb": None if memory_before is None else memory_after - memory_before
+    }
+
+
+def _run_in_fresh_process(args):
+    return run_benchmark(*args)
+
+
+def _format_row(columns):
+    return "".join(["{:>14}".format(column) for column in columns])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CCRMerger2 scaling benchmark with synthetic rule sets")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 500, 1000, 5000])
+    parser.add_argument("--specs-per-rule", type=int, default=10)
+    parser.add_argument("--extras-per-rule", type=int, default=2)
+    parser.add_argument("--choice-size", type=int, default=10)
+    parser.add_argument("--app-ratio", type=float, default=0.01)
+    parser.add_argument("--overlap", type=float, default=0.05)
+    parser.add_argument("--checkers", nargs="+", choices=_CHECKERS, default=_CHECKERS)
+    parser.add_argument("--strategies", nargs="+", choices=_STRATEGIES, default=["classic"])
+    args = parser.parse_args()
+
+    print("{} specs/rule, {} extras/rule, {} items/Choice, {:.0%} app rules, {:.0%} overlapping specs".format(
+        args.specs_per_rule, args.extras_per_rule, args.choice_size, args.app_ratio, args.overlap))
+    print(_format_row(["rules", "checker", "strategy", "merge s", "load s", "grammars", "kept rules", "elements",
+                       "peak KB"]))
+    for rule_count in args.rules:
+        shape = RuleSetShape(rule_count, args.specs_per_rule, args.extras_per_rule, args.choice_size,
+                             args.app_ratio, args.overlap)
+        for checker_name in args.checkers:
+            for strategy_name in args.strategies:
+                pool = multiprocessing.Pool(processes=1)
+                try:
+                    result = pool.apply(_run_in_fresh_process, ((shape, checker_name, strategy_name),))
+                finally:
+                    pool.terminate()
+                peak_memory = "n/a" if result["peak_memory_kb"] is None else result["peak_memory_kb"]
+                print(_format_row([rule_count, checker_name, strategy_name,
+                                   "{:.3f}".format(result["merge_seconds"]),
+                                   "{:.3f}".format(result["load_seconds"]),
+                                   result["grammars"], result["kept_rules"], result["elements"], peak_memory]))
@@ -0,0 +1,90 @@
+"""
+Compares the text replacer's old per-definition replacement loop against
+its single-pass replacers, running both over the stock core + language
+CCR rules with a generated 1,000-line words.txt.
+
+Run from the repository root:
+    python -m tests.benchmark.text_replacer_benchmark
+"""
+from dragonfly import Choice
+
+from castervoice.lib.merge.ccrmerging2.transformers.text_replacer import text_replacer
+from castervoice.lib.merge.ccrmerging2.transformers.text_replacer.text_replacer import TextReplacerTransformer
+from castervoice.lib.merge.ccrmerging2.transformers.text_replacer.tr_parser import TRParser
+from tests.benchmark import benchmark_util
+
+_WORDS_TXT_LINES = 1000
+
+
+class _GeneratedTRParser(TRParser):
+    """
+    Parses a generated words.txt: every word in the stock rules' specs and
+    choices is remapped (until there are enough lines), then padded with
+    definitions which match nothing.
+    """
+
+    def __init__(self, rules):
+        self._words = set()
+        for rule in rules:
+            for spec in rule._mapping.keys():
+                self._words.update([w for w in spec.split() if w.isalpha()])
+            for extra in rule._extras.values():
+                if isinstance(extra, Choice):
+                    for key in extra._choices.keys():
+                        self._words.update([w for w in key.split() if w.isalpha()])
+
+    def _get_lines(self):
+        lines = ["<<<ANY>>>"]
+        for word in sorted(self._words)[:_WORDS_TXT_LINES // 2]:
+            lines.append("{} -> {}x".format(word, word))
+        while len(lines) <= _WORDS_TXT_LINES:
+            lines.append("unused{} -> nothing".format(len(lines)))
+        return lines
+
+
+def _legacy_replace(text, replacements):
+    """
+    The replacement loop as it was before the single-pass replacers:
+    every definition is checked against every string.
+    """
+    for original in replacements.keys():
+        if original in text:
+            text = text.replace(original, replacements[original])
+    return text
+
+
+def _get_strings(rules):
+    """
+    :return: the strings the text replacer rewrites: specs (with bound extras
+             already hidden, as the transformer does it) and choice keys
+    """
+    strings = []
+    for rule in rules:
+        strings.extend([text_replacer._preserve(spec).cleaned for spec in rule._mapping.keys()])
+        for extra in rule._extras.values():
+            if isinstance(extra, Choice):
+                strings.extend(extra._choices.keys())
+    return strings
+
+
+if __name__ == "__main__":
+    benchmark_util.setup_environment()
+
+    rule_classes = benchmark_util.get_stock_global_ccr_rule_classes()
+    rules = [rc() for rc in rule_classes]
+    transformer = TextReplacerTransformer(lambda: _GeneratedTRParser(rules))
+    definitions = transformer._definitions
+    transformer._update_replacers()
+    replacer = transformer._replacers["specs"]
+    strings = _get_strings(rules)
+
+    legacy_time = benchmark_util.best_time(lambda: [_legacy_replace(s, definitions.specs) for s in strings])
+    single_pass_time = benchmark_util.best_time(lambda: [replacer.replace(s) for s in strings])
+    transform_time = benchmark_util.best_time(
+        lambda: [transformer.get_transformed_rule(rc()) for rc in rule_classes], repetitions=3)
+
+    print("{} rules, {} strings, {} words.txt lines".format(len(rules), len(strings), _WORDS_TXT_LINES))
+    print("per-definition loop:   {:.4f}s".format(legacy_time))
+    print("single-pass replacer:  {:.4f}s".format(single_pass_time))
+    print("speedup:               {:.1f}x".format(legacy_time / single_pass_time))
+    print("full transform of all rules (incl. rebuilding them): {:.4f}s".format(transform_time))
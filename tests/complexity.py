@@ -3,34 +3,23 @@ Created on Oct 10, 2015
 
 @author: synkarius
 '''
-import io
 import random
-import re
-import time
 
 from dragonfly.grammar.elements import Choice
-from dragonfly.grammar.grammar_base import Grammar
 
 from castervoice.lib import settings
 from castervoice.lib.actions import Text
+from castervoice.lib.merge.ccrmerging2.complexity_analyzer import CCRComplexity, ComplexityAnalyzer, \
+    ComplexityReport
 from castervoice.rules.core.alphabet_rules.alphabet import Alphabet
 from castervoice.rules.core.navigation_rules.nav import Navigation
 from castervoice.rules.core.numbers_rules.numeric import Numbers
 from castervoice.rules.core.punctuation_rules.punctuation import Punctuation
 from castervoice.rules.ccr.python_rules.python import Python
-from castervoice.lib.merge.ccrmerger_legacy import CCRMerger # Deprecated
-from castervoice.lib.merge.merge.mergepair import MergeInf # Deprecated
 from castervoice.lib.merge.mergerule import MergeRule
 from castervoice.lib.merge.state.short import R
 
 
-def _report_to_file(message, path=None):
-    _path = settings.SETTINGS["paths"]["LOG_PATH"]
-    if path is not None: _path = path
-    with io.open(_path, 'at', encoding="utf-8") as f:
-        f.write(unicode(message) + "\n")
-
-
 def get_500_words():
     return [
         "basin", "return", "picture", "unequaled", "drop", "nonstop", "protective",
@@ -149,119 +138,25 @@ def core_and_python():
     return [Alphabet(), Navigation(), Numbers(), Punctuation(), Python()]
 
 
-def prep_merger(merger, nc, ns):
-    ctr = ComplexityTestRule(nc, ns)
-    for rule in core_and_python() + [ctr]:
-        merger.add_global_rule(rule)
-    merger.update_config()
-    merger.merge(MergeInf.BOOT)
-
-
-def prep_grammar(grammar, nc, ns):
-    ctr = ComplexityTestRule(nc, ns)
-    for rule in core_and_python() + [ctr]:
-        grammar.add_rule(rule)
-
-
-class Result(object):
-    def __init__(self, report, choices, specs, elements, ccr_max, broke):
-        self.report = report
-        self.choices = choices
-        self.specs = specs
-        self.elements = elements
-        self.ccr_max = ccr_max
-        self.broke = broke
-
-
-def test(specs, choices, ccr_max):
-    broke = False
-
-    print("creating complexity test: \n"\
-                     +str(specs)+" specs \n"\
-                     +str(choices)+" Choice-500s \n"\
-                     +str(ccr_max) + " ccr max" )
-
-    grammar = Grammar("test " + str(int(time.time())))
-    print(grammar)
-    '''set up realistic scenario'''
-    merger = CCRMerger(False)
-    prep_grammar(grammar, choices, specs)
-    prep_merger(merger, choices, specs)
-
-    report = grammar.get_complexity_string()
-    print(".")
-    '''activate everything except the heavy rule'''
-    merger_ccr_activator = merger.global_rule_changer()
-    for rule in core_and_python():
-        merger_ccr_activator(rule.get_pronunciation(), True, False)
-    print("..")
-    merger.selfmod_rule_changer()("css", True, False)
-    print("...")
-    '''activate the heavy rule'''
-    try:
-        merger_ccr_activator(ComplexityTestRule.pronunciation, True, False)
-    except:
-        broke = True
-    #             reports.append("BadGrammar at "+str(i)+" Choice-500s ; "+str(i)+" specs\n"+report+"\n")
-    #             kCUs.append(complexity * ccr_max / 1000)
-    m = re.search(r"rules, ([0-9]+) elements", report)
-    elements = m.group(1)
-    print("... .   e(" + elements + ")")
-    '''clean up'''
-    merger.wipe()
-    for rule in grammar.rules:
-        rule.disable()
-    grammar.disable()
-    del grammar
-    print("... ..")
-
-    return Result(report, choices, specs, elements, ccr_max, broke)
-
-
-def run_tests():
-    original_ccr_max = settings.SETTINGS["miscellaneous"]["max_ccr_repetitions"]
-    reports = [
-        "Caster/Dragonfly Grammar Complexity Report v2\n===============================\n\n"
-    ]
-    start_time = time.time()
-    cycle_count = 1
-
-    for i in range(0, 3):
-        if i != 0: settings.SETTINGS["miscellaneous"]["max_ccr_repetitions"] += 1
-        ccr_max = settings.SETTINGS["miscellaneous"]["max_ccr_repetitions"] + 2
-        print("Run " + str(i + 1) + " /3")
-
-        not_max_yet = True
-        nspecs = 2
-        nc_orig = 2
-        while not_max_yet:
-
-            for nchoices in range(nc_orig, 500, 4):
-
-                result = test(nspecs, nchoices, ccr_max)
-                reports.append("\ncycles: "+str(cycle_count)\
-                               +" | ccrm: "+str(result.ccr_max)\
-                               +" | specs: "+str(result.specs)\
-                               +" | choice-500s: "+str(result.choices)\
-                               +" | elements: "+str(result.elements)\
-                               +" | broke: "+str(result.broke)\
-                               +"\n")
-                cycle_count += 1
-                if result.broke:
-                    nspecs += 2
-
-                    reports.append(result.report + "\n")
-                    '''if choices max out at 1, the test is over'''
-                    if result.choices == nc_orig: not_max_yet = False
-                    break
-
-    reports.append("\nSettings toml CCR Max Reps: " + str(original_ccr_max) + "\n")
-    reports.append(
-        "Total time for test: " + str(int(time.time() - start_time)) + " sec\n\n")
-    result = "".join(reports)
-    report_path = settings.SETTINGS["paths"]["BASE_PATH"] + "/bin/data/complexity_report_" + str(
-        time.time()) + ".txt"
-    print("Report saved to " + report_path)
-    _report_to_file(result, report_path)
-
-    settings.SETTINGS["miscellaneous"]["max_ccr_repetitions"] = original_ccr_max
+def estimate(rules, ccr_max):
+    analyzer = ComplexityAnalyzer()
+    report = ComplexityReport()
+    for rule in rules:
+        report += analyzer.analyze_rule(rule)
+    return CCRComplexity(report, len(rules), ccr_max)
+
+
+def run_tests(max_choices=10, max_specs=10):
+    '''
+    Prints the estimated complexity of the core + python CCR rules plus
+    a ComplexityTestRule of increasing size. Compare against where the
+    engine starts raising "bad grammar" errors to pick complexity budgets
+    (see ccr_merging settings).
+    '''
+    ccr_max = int(settings.settings(["miscellaneous", "max_ccr_repetitions"]))
+    base_rules = core_and_python()
+    print("core + python: " + estimate(base_rules, ccr_max).get_description())
+    for nchoices in range(0, max_choices + 1, 2):
+        for nspecs in range(2, max_specs + 1, 4):
+            complexity = estimate(base_rules + [ComplexityTestRule(nchoices, nspecs)], ccr_max)
+            print("specs: {} | choice-500s: {} | {}".format(nspecs, nchoices, complexity.get_description()))
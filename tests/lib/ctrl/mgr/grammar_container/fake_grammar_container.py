@@ -6,6 +6,7 @@ class FakeGrammarContainer(object):
     def __init__(self):
         self.ccr = []
         self.non_ccr = {}
+        self.ccr_enabled = True
 
     def _pass(self):
         pass
@@ -17,11 +18,18 @@ class FakeGrammarContainer(object):
         else:
             del self.non_ccr[rcn]
 
-    def set_ccr(self, ccr_grammars):
+    def set_ccr(self, ccr_grammars, fingerprints=None):
         for grammar in ccr_grammars:
             grammar.load = lambda: self._pass()
 
         self.ccr = ccr_grammars
+        return ccr_grammars
 
     def wipe_ccr(self):
         pass
+
+    def has_ccr(self):
+        return len(self.ccr) > 0
+
+    def set_ccr_enabled(self, enabled):
+        self.ccr_enabled = enabled
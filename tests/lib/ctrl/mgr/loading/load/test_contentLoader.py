@@ -1,3 +1,6 @@
+import os
+import sys
+
 from mock import Mock
 
 from castervoice.lib.ctrl.mgr.loading.load import content_loader
@@ -105,3 +108,22 @@ class TestContentLoader(SettingsEnabledTestCase):
         expected_error = "No method named 'get_rule' was found on 'rule_module'. Did you forget to implement it?"
         self.assertIsNone(rule_class)
         self.assertEqual(expected_error, spy.get_first())
+
+    def test_package_content_is_imported_by_package_name(self):
+        import castervoice
+        directory = os.path.join(os.path.dirname(castervoice.__file__), "rules", "ccr", "python_rules")
+        self.cl._get_load_fn = lambda: self.cl._load_module
+        self.cl._register_module_location(directory, "python")
+        sys_path = list(sys.path)
+
+        rule_class, _ = self.cl.idem_import_module("python", ContentType.GET_RULE)
+
+        self.assertEqual("castervoice.rules.ccr.python_rules.python", rule_class.__module__)
+        self.assertEqual(sys_path, sys.path)
+
+    def test_non_package_content_is_imported_from_its_file(self):
+        self.cl._register_module_location("/mock/user/dir/rules", "my_rule")
+        importable_name, file_path = self.cl._module_locations["my_rule"]
+
+        self.assertTrue(importable_name.startswith("caster_content_my_rule_"))
+        self.assertEqual(os.path.abspath("/mock/user/dir/rules/my_rule.py"), file_path)
@@ -1,3 +1,4 @@
+import os
 from unittest import TestCase
 
 from mock import Mock
@@ -45,6 +46,34 @@ class TestContentRequestGenerator(TestCase):
                                                  "  return ZHook"]]
         self._do_assertions(ContentType.GET_HOOK, "some_hook")
 
+    def test_unchanged_file_is_not_read(self):
+        manifest = Mock()
+        manifest.get.return_value = (True, (ContentType.GET_RULE, "Abc", None))
+        self.crg = ContentRequestGenerator(manifest)
+        self.crg._walk = Mock(side_effect=[[("/relevant/path", [], ["__init__.py", "some_rule.py"])]])
+        self.crg._get_file_stat = Mock(return_value=(1.5, 100))
+        self.crg._get_file_lines = Mock()
+
+        self._do_assertions(ContentType.GET_RULE, "some_rule", "Abc")
+        self.crg._get_file_lines.assert_not_called()
+        manifest.get.assert_called_once_with("/relevant/path" + os.sep + "some_rule.py", 1.5, 100)
+        manifest.save.assert_called_once_with()
+
+    def test_changed_file_is_scanned_and_remembered(self):
+        manifest = Mock()
+        manifest.get.return_value = (False, None)
+        self.crg = ContentRequestGenerator(manifest)
+        self.crg._walk = Mock(side_effect=[[("/relevant/path", [], ["some_hook.py"])]])
+        self.crg._get_file_stat = Mock(return_value=(1.5, 100))
+        self.crg._get_file_lines = Mock(side_effect=[["class ZHook(BaseHook):pass",
+                                                      "def get_hook():",
+                                                      "  return ZHook"]])
+
+        self._do_assertions(ContentType.GET_HOOK, "some_hook")
+        file_path = "/relevant/path" + os.sep + "some_hook.py"
+        manifest.put.assert_called_once_with(file_path, 1.5, 100, ContentType.GET_HOOK, None, None)
+        manifest.retain.assert_called_once_with("test_dir", {file_path})
+
     def _do_assertions(self, content_type, module_name, class_name=None):
         results = self.crg.get_all_content_modules("test_dir")
         self.assertEqual(1, len(results))
@@ -0,0 +1,85 @@
+import json
+import os
+from unittest import TestCase
+
+from mock import patch
+
+from castervoice.lib.ctrl.mgr.loading.load.content_scan_manifest import ContentScanManifest
+from castervoice.lib.ctrl.mgr.loading.load.content_type import ContentType
+
+
+_MANIFEST_PATH = os.path.join("data", "content_manifest.json")
+_RULES_DIRECTORY = os.path.join("caster", "rules")
+_RULE_PATH = os.path.join(_RULES_DIRECTORY, "alphabet.py")
+_RULE_METADATA = {"trigger": "alphabet", "ccrtype": "global"}
+
+
+class TestContentScanManifest(TestCase):
+
+    def setUp(self):
+        self._files = {}
+        utilities_patcher = patch("castervoice.lib.ctrl.mgr.loading.load.content_scan_manifest.utilities")
+        self.utilities = utilities_patcher.start()
+        self.addCleanup(utilities_patcher.stop)
+        self.utilities.load_json_file.side_effect = self._load_json_file
+        self.utilities.save_json_file.side_effect = self._save_json_file
+        self.manifest = ContentScanManifest(_MANIFEST_PATH)
+
+    def _load_json_file(self, path):
+        return json.loads(self._files.get(path, "{}"))
+
+    def _save_json_file(self, data, path):
+        self._files[path] = json.dumps(data)
+
+    def _put_rule(self, file_path=_RULE_PATH, mtime=100.0, size=2000):
+        self.manifest.put(file_path, mtime, size, ContentType.GET_RULE, "Alphabet", _RULE_METADATA)
+
+    def test_get_unscanned_file(self):
+        self.assertEqual((False, None), self.manifest.get(_RULE_PATH, 100.0, 2000))
+
+    def test_get_unchanged_file(self):
+        self._put_rule()
+
+        self.assertEqual((True, (ContentType.GET_RULE, "Alphabet", _RULE_METADATA)),
+                         self.manifest.get(_RULE_PATH, 100.0, 2000))
+
+    def test_get_changed_file(self):
+        self._put_rule()
+
+        self.assertEqual((False, None), self.manifest.get(_RULE_PATH, 101.0, 2000))
+        self.assertEqual((False, None), self.manifest.get(_RULE_PATH, 100.0, 2001))
+
+    def test_retain_forgets_unseen_files_in_directory(self):
+        kept_path = os.path.join(_RULES_DIRECTORY, "kept.py")
+        self._put_rule()
+        self._put_rule(kept_path)
+
+        self.manifest.retain(_RULES_DIRECTORY, [kept_path])
+
+        self.assertFalse(self.manifest.get(_RULE_PATH, 100.0, 2000)[0])
+        self.assertTrue(self.manifest.get(kept_path, 100.0, 2000)[0])
+
+    def test_retain_keeps_files_of_sibling_directory(self):
+        sibling_path = os.path.join(_RULES_DIRECTORY + "_old", "alphabet.py")
+        self._put_rule(sibling_path)
+
+        self.manifest.retain(_RULES_DIRECTORY, [])
+
+        self.assertTrue(self.manifest.get(sibling_path, 100.0, 2000)[0])
+
+    def test_save_and_load_round_trip(self):
+        self._put_rule()
+        self.manifest.save()
+
+        loaded_manifest = ContentScanManifest(_MANIFEST_PATH)
+
+        self.assertEqual((True, (ContentType.GET_RULE, "Alphabet", _RULE_METADATA)),
+                         loaded_manifest.get(_RULE_PATH, 100.0, 2000))
+
+    def test_save_only_when_changed(self):
+        self.manifest.save()
+        self._put_rule()
+        self.manifest.save()
+        self.manifest.save()
+
+        self.assertEqual(1, self.utilities.save_json_file.call_count)
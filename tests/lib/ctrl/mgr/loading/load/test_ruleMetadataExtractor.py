@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from castervoice.lib.const import CCRType
+from castervoice.lib.ctrl.mgr.loading.load.rule_metadata_extractor import RuleMetadataExtractor
+
+
+class TestRuleMetadataExtractor(TestCase):
+
+    def setUp(self):
+        self.extractor = RuleMetadataExtractor()
+
+    def test_merge_rule(self):
+        source = "\n".join(["class Python(MergeRule):",
+                            "    pronunciation = \"python\"",
+                            "    mapping = {}",
+                            "",
+                            "def get_rule():",
+                            "    return Python, RuleDetails(ccrtype=CCRType.GLOBAL)"])
+        self.assertEqual({"trigger": "python", "ccrtype": CCRType.GLOBAL},
+                         self.extractor.extract(source, "Python"))
+
+    def test_merge_rule_without_pronunciation_uses_class_name(self):
+        source = "\n".join(["class Java(MergeRule):",
+                            "    mapping = {}",
+                            "",
+                            "def get_rule():",
+                            "    return [Java, RuleDetails(ccrtype=\"global\")]"])
+        self.assertEqual({"trigger": "Java", "ccrtype": CCRType.GLOBAL},
+                         self.extractor.extract(source, "Java"))
+
+    def test_non_ccr_merge_rule_without_pronunciation_uses_details_name(self):
+        source = "\n".join(["class Notes(MergeRule):",
+                            "    mapping = {}",
+                            "",
+                            "def get_rule():",
+                            "    return Notes, RuleDetails(name=\"note taking\")"])
+        self.assertEqual({"trigger": "note taking", "ccrtype": None},
+                         self.extractor.extract(source, "Notes"))
+
+    def test_mapping_rule_with_details_variable(self):
+        source = "\n".join(["class OutlookRule(MappingRule):",
+                            "    mapping = {}",
+                            "",
+                            "def get_rule():",
+                            "    details = RuleDetails(name=\"outlook\", executable=\"outlook\")",
+                            "    return OutlookRule, details"])
+        self.assertEqual({"trigger": "outlook", "ccrtype": None},
+                         self.extractor.extract(source, "OutlookRule"))
+
+    def test_selfmod_rule_is_not_extracted(self):
+        source = "\n".join(["class Alias(SelfModifyingRule):",
+                            "    pronunciation = \"alias\"",
+                            "",
+                            "def get_rule():",
+                            "    return Alias, RuleDetails(ccrtype=CCRType.SELFMOD)"])
+        self.assertEqual({}, self.extractor.extract(source, "Alias"))
+
+    def test_computed_name_is_not_extracted(self):
+        source = "\n".join(["class Abc(MappingRule):",
+                            "    mapping = {}",
+                            "",
+                            "def get_rule():",
+                            "    return Abc, RuleDetails(name=\"a\" + \"bc\")"])
+        self.assertEqual({}, self.extractor.extract(source, "Abc"))
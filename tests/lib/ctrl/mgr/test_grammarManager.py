@@ -1,4 +1,4 @@
-from mock import Mock
+from mock import Mock, patch
 
 from castervoice.lib.ctrl.mgr.loading.load.initial_content import FullContentSet
 from tests.test_util import settings_mocking
@@ -40,6 +40,7 @@ class TestGrammarManager(SettingsEnabledTestCase):
     def _initialize(self, content):
         # self._content_loader.load_everything.side_effect = [content]
         [self._gm.register_rule(rc, d) for rc, d in content.rules]
+        [self._gm.register_lazy_rule(lr) for lr in content.lazy_rules]
         [self._transformers_runner.add_transformer(t) for t in content.transformers]
         [self._hooks_runner.add_hook(h) for h in content.hooks]
         self._gm.load_activation_grammars()
@@ -146,6 +147,40 @@ class TestGrammarManager(SettingsEnabledTestCase):
         self.assertEqual(2, len(self._gm._grammars_container.non_ccr.keys()))
         self.assertEqual(1, len(self._gm._grammars_container.ccr))
 
+    def test_merge_timing_event(self):
+        from castervoice.lib.merge.ccrmerging2.hooks.base_hook import BaseHook
+        from castervoice.lib.merge import spec_cache
+        from castervoice.lib.merge.ccrmerging2.hooks.events.event_types import EventType
+        from castervoice.rules.core.alphabet_rules import alphabet
+
+        events = []
+
+        class TimingRecorderHook(BaseHook):
+            def __init__(self):
+                super(TimingRecorderHook, self).__init__(EventType.MERGE_TIMING)
+
+            def get_pronunciation(self):
+                return "timing recorder"
+
+            def run(self, event):
+                events.append(event)
+
+        self._setup_rules_config_file(loadable_true=["Alphabet"], enabled=["Alphabet"])
+        self._hooks_runner._hooks_config.set_hook_active("TimingRecorderHook", True)
+        with patch("castervoice.lib.ctrl.mgr.grammar_manager.printer") as printer:
+            self._initialize(FullContentSet([alphabet.get_rule()], [], [TimingRecorderHook]))
+
+        self.assertEqual(1, len(events))
+        timings = events[0].timings
+        printer.out.assert_any_call("{}. {}".format(timings.get_description(),
+                                                    spec_cache.get_instance().get_stats_report()))
+        steps = [step for step, _ in timings.steps]
+        for step in ["transform", "sort", "compatibility check", "merge", "repeat rules", "set ccr", "grammar load"]:
+            self.assertIn(step, steps)
+        self.assertEqual(1, timings.counts["merged rules"])
+        self.assertEqual(len(alphabet.Alphabet.mapping), timings.counts["specs"])
+        self.assertEqual(1, timings.counts["grammars loaded"])
+
     def test_initialize_two_compatible_global_mergerules(self):
         from castervoice.rules.core.alphabet_rules import alphabet
         from castervoice.rules.core.punctuation_rules import punctuation
@@ -156,6 +191,37 @@ class TestGrammarManager(SettingsEnabledTestCase):
         self.assertEqual(2, len(self._gm._grammars_container.non_ccr.keys()))
         self.assertEqual(1, len(self._gm._grammars_container.ccr))
 
+    def test_initialize_discards_spare_instances(self):
+        """
+        Rules which weren't loaded at startup shouldn't keep the instance made for
+        validating them: it would be handed out (stale) when they're first enabled.
+        """
+        from castervoice.rules.core.alphabet_rules import alphabet
+        from castervoice.rules.core.punctuation_rules import punctuation
+
+        self._setup_rules_config_file(loadable_true=["Alphabet", "Punctuation"], enabled=["Alphabet"])
+        self._initialize(FullContentSet([alphabet.get_rule(), punctuation.get_rule()], [], []))
+
+        for managed_rule in self._gm._managed_rules.values():
+            self.assertIsNone(managed_rule._spare_instance)
+
+    def test_ccr_toggle_keeps_ccr_grammars(self):
+        from castervoice.rules.core.alphabet_rules import alphabet
+
+        self._setup_rules_config_file(loadable_true=["Alphabet"], enabled=["Alphabet"])
+        self._initialize(FullContentSet([alphabet.get_rule()], [], []))
+        ccr_grammars = self._gm._grammars_container.ccr
+        merge_rules = Mock(side_effect=self._gm._merger.merge_rules)
+        self._gm._merger.merge_rules = merge_rules
+
+        self._gm.set_ccr_active(False)
+        self.assertFalse(self._gm._grammars_container.ccr_enabled)
+        self._gm.set_ccr_active(True)
+        self.assertTrue(self._gm._grammars_container.ccr_enabled)
+
+        merge_rules.assert_not_called()
+        self.assertIs(ccr_grammars, self._gm._grammars_container.ccr)
+
     def test_enable_rule_causes_a_save(self):
         from castervoice.lib import utilities
         from castervoice.lib.ctrl.mgr.rules_config import RulesConfig
@@ -296,3 +362,107 @@ class TestGrammarManager(SettingsEnabledTestCase):
 
         # simulate a spoken "enable" command from the GrammarActivator:
         self._gm._change_rule_enabled("Python", False)
+
+    def test_batch_enable_merges_and_saves_once(self):
+        from castervoice.lib import utilities
+        from castervoice.lib.ctrl.mgr.rules_config import RulesConfig
+        from castervoice.rules.ccr.java_rules import java
+        from castervoice.rules.ccr.python_rules import python
+        from castervoice.rules.core.alphabet_rules import alphabet
+        from castervoice.rules.core.punctuation_rules import punctuation
+
+        # "write" the rules.toml file:
+        self._setup_rules_config_file(loadable_true=["Alphabet", "Punctuation", "Java", "Python"],
+                                      enabled=["Alphabet"])
+
+        # initialize the gm
+        self._initialize(FullContentSet([alphabet.get_rule(), punctuation.get_rule(),
+                                         java.get_rule(), python.get_rule()], [], []))
+        merge_rules = Mock(side_effect=self._gm._merger.merge_rules)
+        self._gm._merger.merge_rules = merge_rules
+        save = Mock(side_effect=self._rule_config.save)
+        self._rule_config.save = save
+
+        # Python is knocked out by Java, which is enabled after it
+        self._gm.change_rules_enabled([("Punctuation", True), ("Python", True), ("Java", True)])
+
+        self.assertEqual(1, merge_rules.call_count)
+        self.assertEqual(1, save.call_count)
+        config = utilities.load_toml_file(TestGrammarManager._MOCK_PATH_RULES_CONFIG)
+        self.assertEqual(["Alphabet", "Punctuation", "Java"],
+                         [rcn for rcn in config[RulesConfig._ENABLED_ORDERED]
+                          if rcn in ["Alphabet", "Punctuation", "Java", "Python"]])
+
+    def test_batch_enable_voice_command(self):
+        from dragonfly import Grammar, get_engine
+        from castervoice.rules.core.alphabet_rules import alphabet
+        from castervoice.rules.core.punctuation_rules import punctuation
+
+        self._setup_rules_config_file(loadable_true=["Alphabet", "Punctuation"], enabled=[])
+        self._initialize(FullContentSet([alphabet.get_rule(), punctuation.get_rule()], [], []))
+        self._gm.change_rules_enabled = Mock()
+        # the fake grammar container doesn't load grammars
+        activator_grammar = self._gm._grammars_container.non_ccr["GrammarActivatorRule"]
+        Grammar.load(activator_grammar)
+
+        try:
+            get_engine().mimic("enable punctuation and alphabet")
+        finally:
+            activator_grammar.unload()
+
+        self._gm.change_rules_enabled.assert_called_once_with([("Punctuation", True), ("Alphabet", True)])
+
+    def test_lazy_rule_is_loaded_when_enabled(self):
+        from castervoice.lib import utilities
+        from castervoice.lib.const import CCRType
+        from castervoice.lib.ctrl.mgr.loading.load.lazy_rule import LazyRule
+        from castervoice.lib.ctrl.mgr.rules_config import RulesConfig
+        from castervoice.rules.core.alphabet_rules import alphabet
+        from castervoice.rules.core.punctuation_rules import punctuation
+
+        self._setup_rules_config_file(loadable_true=["Alphabet", "Punctuation"], enabled=["Alphabet"])
+        lazy_punctuation = LazyRule("Punctuation", "punctuation", CCRType.GLOBAL, "/some/dir", "punctuation")
+        self._initialize(FullContentSet([alphabet.get_rule()], [], [], [lazy_punctuation]))
+        self._content_loader.load_lazy_rule.return_value = punctuation.get_rule()
+        self.assertNotIn("Punctuation", self._gm._managed_rules)
+        self.assertEqual("punctuation", self._gm._activator._class_name_to_trigger["Punctuation"])
+
+        # disabling a rule which was never loaded doesn't load it
+        self._gm._change_rule_enabled("Punctuation", False)
+        self._content_loader.load_lazy_rule.assert_not_called()
+
+        self._gm._change_rule_enabled("Punctuation", True)
+        self._content_loader.load_lazy_rule.assert_called_once_with(lazy_punctuation)
+        self.assertIn("Punctuation", self._gm._managed_rules)
+        config = utilities.load_toml_file(TestGrammarManager._MOCK_PATH_RULES_CONFIG)
+        self.assertIn("Punctuation", config[RulesConfig._ENABLED_ORDERED])
+
+    def test_rules_are_instantiated_once_per_load(self):
+        from dragonfly import MappingRule
+        from castervoice.lib.const import CCRType
+        from castervoice.lib.ctrl.mgr.rule_details import RuleDetails
+        from castervoice.lib.merge.mergerule import MergeRule
+        from castervoice.lib.merge.state.actions2 import NullAction
+
+        instantiations = {}
+
+        class CountedCCRRule(MergeRule):
+            mapping = {"counted ccr": NullAction()}
+
+            def __init__(self, *args, **kwargs):
+                instantiations["CountedCCRRule"] = instantiations.get("CountedCCRRule", 0) + 1
+                super(CountedCCRRule, self).__init__(*args, **kwargs)
+
+        class CountedRule(MappingRule):
+            mapping = {"counted": NullAction()}
+
+            def __init__(self, *args, **kwargs):
+                instantiations["CountedRule"] = instantiations.get("CountedRule", 0) + 1
+                super(CountedRule, self).__init__(*args, **kwargs)
+
+        self._setup_rules_config_file(loadable_true=["CountedCCRRule", "CountedRule"],
+                                      enabled=["CountedCCRRule", "CountedRule"])
+        self._initialize(FullContentSet([(CountedCCRRule, RuleDetails(ccrtype=CCRType.GLOBAL)),
+                                         (CountedRule, RuleDetails(name="counted"))], [], []))
+
+        self.assertEqual({"CountedCCRRule": 1, "CountedRule": 1}, instantiations)
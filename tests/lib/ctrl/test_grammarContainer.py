@@ -13,6 +13,8 @@ class _FakeGrammar(object):
     def __init__(self):
         self.rules = []
 
+    def enable(self): pass
+
     def disable(self): pass
 
     def unload(self): pass
@@ -50,6 +52,28 @@ class TestGrammarContainer(TestCase):
         self.grammar.disable.assert_called_with()
         self.grammar.unload.assert_called_with()
 
+    def test_set_ccr_keeps_unchanged_grammars(self):
+        gc = BasicGrammarContainer()
+        changed_grammar = _FakeGrammar()
+        changed_grammar.unload = Mock()
+        gc.set_ccr([self.grammar, changed_grammar], ["a", "b"])
+        new_grammar_a = _FakeGrammar()
+        new_grammar_c = _FakeGrammar()
+        grammars_to_load = gc.set_ccr([new_grammar_a, new_grammar_c], ["a", "c"])
+
+        self.assertEqual([new_grammar_c], grammars_to_load)
+        self.grammar.unload.assert_not_called()
+        changed_grammar.unload.assert_called_with()
+
+    def test_set_ccr_without_fingerprints_replaces_all(self):
+        gc = BasicGrammarContainer()
+        gc.set_ccr([self.grammar], ["a"])
+        new_grammar = _FakeGrammar()
+        grammars_to_load = gc.set_ccr([new_grammar])
+
+        self.assertEqual([new_grammar], grammars_to_load)
+        self.grammar.unload.assert_called_with()
+
     def test_set_non_ccr_update(self):
         gc = BasicGrammarContainer()
         gc.set_non_ccr("test", self.grammar)
@@ -75,3 +99,15 @@ class TestGrammarContainer(TestCase):
         gc.set_ccr = Mock()
         gc.wipe_ccr()
         gc.set_ccr.assert_called_with([])
+
+    def test_set_ccr_enabled_keeps_grammars_loaded(self):
+        gc = BasicGrammarContainer()
+        self.grammar.enable = Mock()
+        gc.set_ccr([self.grammar])
+
+        gc.set_ccr_enabled(False)
+        self.grammar.disable.assert_called_with()
+        gc.set_ccr_enabled(True)
+        self.grammar.enable.assert_called_with()
+        self.grammar.unload.assert_not_called()
+        self.assertTrue(gc.has_ccr())
@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from castervoice.lib.ctrl.lifecycle_profiler import LifecycleProfiler
+
+
+class _FakeClock(object):
+    def __init__(self):
+        self.seconds = 10.0
+
+    def __call__(self):
+        return self.seconds
+
+    def advance(self, seconds):
+        self.seconds += seconds
+
+
+class TestLifecycleProfiler(TestCase):
+
+    def setUp(self):
+        self.clock = _FakeClock()
+        self.profiler = LifecycleProfiler(self.clock)
+
+    def _profile_startup(self):
+        with self.profiler.span("nexus", "startup"):
+            self.clock.advance(0.1)
+            with self.profiler.span("rule_a", "import", {"content": "get_rule"}):
+                self.clock.advance(0.5)
+            with self.profiler.span("rule_b", "import"):
+                self.clock.advance(0.2)
+
+    def test_nothing_is_recorded_until_enabled(self):
+        self._profile_startup()
+
+        self.assertEqual([], self.profiler.get_trace_events())
+
+    def test_spans_are_chrome_trace_events(self):
+        self.profiler.enable()
+        self._profile_startup()
+
+        events = self.profiler.get_trace_events()
+        self.assertEqual(["rule_a", "rule_b", "nexus"], [e["name"] for e in events])
+        rule_a = events[0]
+        self.assertEqual("X", rule_a["ph"])
+        self.assertEqual("import", rule_a["cat"])
+        self.assertEqual(100000, rule_a["ts"])
+        self.assertEqual(500000, rule_a["dur"])
+        self.assertEqual({"content": "get_rule"}, rule_a["args"])
+        self.assertEqual(800000, events[2]["dur"])
+
+    def test_spans_added_after_the_fact_nest(self):
+        start = self.profiler.now()
+        self.clock.advance(1.0)
+        self.profiler.enable()
+        self._profile_startup()
+        self.profiler.add_span("caster", "startup", start, self.profiler.now())
+
+        slowest = self.profiler.get_slowest_spans(4)
+
+        # self time excludes child spans
+        self.assertEqual(["caster", "rule_a", "rule_b", "nexus"], [event["name"] for _, _, event in slowest])
+        self.assertEqual([1000000, 500000, 200000, 100000], [self_us for self_us, _, _ in slowest])
+        self.assertEqual([1800000, 500000, 200000, 800000], [total_us for _, total_us, _ in slowest])
+
+    def test_summary_lists_slowest_spans(self):
+        self.profiler.enable()
+        self._profile_startup()
+
+        lines = self.profiler.get_summary(2).split("\n")
+
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[1].endswith("import        rule_a"))
+        self.assertIn("500.0", lines[1])
+        self.assertTrue(lines[2].endswith("rule_b"))
@@ -24,6 +24,23 @@ class _TestRuleC(MergeRule):
     }
 
 
+class _FakeRule(object):
+    """
+    Just enough of a MergeRule for compatibility checking, so that
+    thousands of them can be made quickly.
+    """
+
+    def __init__(self, rcn, specs):
+        self._rcn = rcn
+        self._mapping = dict([(spec, None) for spec in specs])
+
+    def get_rule_class_name(self):
+        return self._rcn
+
+    def get_mapping(self):
+        return self._mapping
+
+
 class TestDetailCompatibilityChecker(TestCase):
 
     def setUp(self):
@@ -65,6 +82,27 @@ class TestDetailCompatibilityChecker(TestCase):
         self.assertIn("_TestRuleB", c_incompats)
         self.assertIn("_TestRuleA", c_incompats)
 
+    def test_scaling(self):
+        """
+        5,000 rules x 50 specs: each rule shares half of its specs with the
+        next rule, and one spec with every 500th rule.
+        """
+        rule_count = 5000
+        rules = []
+        for i in range(rule_count):
+            specs = ["spec {}".format(n) for n in range(i * 25, i * 25 + 49)]
+            specs.append("common {}".format(i % 500))
+            rules.append(_FakeRule("Rule{}".format(i), specs))
+
+        result = self.compat_checker.compatibility_check(rules)
+
+        self.assertEqual(rule_count, len(result))
+        expected_0 = ["Rule1"] + ["Rule{}".format(i) for i in range(500, rule_count, 500)]
+        self.assertItemsEqual(expected_0, self._get_incompatible_set_for_rule_class(result, "Rule0"))
+        expected_2501 = ["Rule2500", "Rule2502"] + \
+                        ["Rule{}".format(i) for i in range(1, rule_count, 500) if i != 2501]
+        self.assertItemsEqual(expected_2501, self._get_incompatible_set_for_rule_class(result, "Rule2501"))
+
     def _get_incompatible_set_for_rule_class(self, compat_result, rcn):
         for cr in compat_result:
             if cr.rule_class_name() == rcn:
@@ -0,0 +1,94 @@
+from unittest import TestCase
+
+from dragonfly import Dictation
+
+from castervoice.lib.merge.additions import IntegerRefST
+from castervoice.lib.merge.ccrmerging2.compatibility.trie_compat_checker import TrieCompatibilityChecker
+from castervoice.lib.merge.mergerule import MergeRule
+from castervoice.lib.merge.state.actions2 import NullAction
+from tests.lib.merge.ccrmerging2.fake_rules import FakeRuleOne, FakeRuleTwo, FakeRuleThree
+
+
+class _CloseTabRule(MergeRule):
+    mapping = {
+        "close [tab | window]": NullAction()
+    }
+
+
+class _CloseRule(MergeRule):
+    mapping = {
+        "close": NullAction()
+    }
+
+
+class _CloseTabsRule(MergeRule):
+    mapping = {
+        "close tabs": NullAction()
+    }
+
+
+class _GoRule(MergeRule):
+    mapping = {
+        "go <n>": NullAction(),
+        "say <text>": NullAction()
+    }
+    extras = [IntegerRefST("n", 1, 10), Dictation("text")]
+
+
+class _OtherGoRule(MergeRule):
+    mapping = {
+        "go <n>": NullAction()
+    }
+    extras = [IntegerRefST("n", 1, 20)]
+
+
+class TestTrieCompatibilityChecker(TestCase):
+
+    def setUp(self):
+        self._compat_checker = TrieCompatibilityChecker()
+
+    def test_identical_specs_eliminated(self):
+        a = FakeRuleOne()
+        b = FakeRuleTwo()
+        results = self._compat_checker.compatibility_check([a, b])
+        self.assertEqual(1, len(results))
+        self.assertIs(b, results[0].rule())
+
+    def test_order_preservation(self):
+        a = FakeRuleOne()
+        b = FakeRuleThree()
+        results = self._compat_checker.compatibility_check([a, b])
+        self.assertIs(a, results[0].rule())
+        self.assertIs(b, results[1].rule())
+
+    def test_expanded_specs_eliminated(self):
+        """
+        "close [tab | window]" can be spoken as "close".
+        """
+        close_tab = _CloseTabRule()
+        results = self._compat_checker.compatibility_check([_CloseRule(), close_tab])
+        self.assertEqual(1, len(results))
+        self.assertIs(close_tab, results[0].rule())
+
+    def test_same_extra_names_eliminated(self):
+        go = _GoRule()
+        results = self._compat_checker.compatibility_check([_OtherGoRule(), go])
+        self.assertEqual(1, len(results))
+        self.assertIs(go, results[0].rule())
+
+    def test_prefix_overlaps_reported(self):
+        results = self._compat_checker.compatibility_check([_CloseRule(), _CloseTabsRule(), _GoRule()])
+        self.assertEqual(3, len(results))
+        overlaps = dict([(cr.rule_class_name(), cr.overlapping_rule_class_names()) for cr in results])
+        self.assertItemsEqual(["_CloseTabsRule"], overlaps["_CloseRule"])
+        self.assertItemsEqual(["_CloseRule"], overlaps["_CloseTabsRule"])
+        self.assertItemsEqual([], overlaps["_GoRule"])
+
+    def test_too_many_expansions(self):
+        """
+        Specs with too many expansions fall back to exact comparison.
+        """
+        self._compat_checker = TrieCompatibilityChecker(max_expansions=2)
+        close_tab = _CloseTabRule()
+        results = self._compat_checker.compatibility_check([_CloseRule(), close_tab])
+        self.assertEqual(2, len(results))
@@ -0,0 +1,34 @@
+from mock import patch
+
+from castervoice.lib.merge.ccrmerging2.hooks.events.merge_timing_event import MergeTimingEvent
+from castervoice.lib.merge.ccrmerging2.hooks.standard_hooks.merge_stats_hook import MergeStatsHook
+from castervoice.lib.merge.ccrmerging2.merge_timings import MergeTimings
+from tests.test_util.settings_mocking import SettingsEnabledTestCase
+
+
+class TestMergeStatsHook(SettingsEnabledTestCase):
+
+    def setUp(self):
+        self._set_setting(["paths", "MERGE_STATS_PATH"], "/mock/merge_stats.json")
+
+    @staticmethod
+    def _create_event():
+        timings = MergeTimings()
+        timings.lap("transform")
+        timings.count("rules", 3)
+        return MergeTimingEvent(timings)
+
+    def test_appends_to_rolling_stats(self):
+        old_merges = [{"total_ms": i} for i in range(MergeStatsHook._MAX_MERGES)]
+        with patch("castervoice.lib.utilities.load_json_file", return_value={"merges": old_merges}), \
+                patch("castervoice.lib.utilities.save_json_file") as save_json_file:
+            hook = MergeStatsHook()
+            hook.run(TestMergeStatsHook._create_event())
+
+            saved, path = save_json_file.call_args[0]
+            self.assertEqual("/mock/merge_stats.json", path)
+            merges = saved["merges"]
+            self.assertEqual(MergeStatsHook._MAX_MERGES, len(merges))
+            self.assertEqual(1, merges[0]["total_ms"])
+            self.assertEqual("transform", merges[-1]["steps_ms"][0][0])
+            self.assertEqual({"rules": 3}, merges[-1]["counts"])
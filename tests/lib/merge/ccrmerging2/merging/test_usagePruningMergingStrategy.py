@@ -0,0 +1,76 @@
+import time
+from unittest import TestCase
+
+from castervoice.lib.config.config_base import BaseConfig
+from castervoice.lib.merge.ccrmerging2.compatibility.compat_result import CompatibilityResult
+from castervoice.lib.merge.ccrmerging2.merging.usage_pruning_merging_strategy import UsagePruningMergingStrategy
+from castervoice.lib.merge.ccrmerging2.spec_usage import SpecUsageTracker
+from castervoice.lib.merge.mergerule import MergeRule
+from castervoice.lib.merge.state.actions2 import NullAction
+
+
+class _FakeSpecUsageConfig(BaseConfig):
+    def __init__(self):
+        super(_FakeSpecUsageConfig, self).__init__()
+        self.saves = 0
+
+    def save(self):
+        self.saves += 1
+
+
+class _TestRule(MergeRule):
+    mapping = {
+        "hot": NullAction(),
+        "cold": NullAction(),
+        "new": NullAction()
+    }
+
+
+class TestUsagePruningMergingStrategy(TestCase):
+
+    def setUp(self):
+        self.config = _FakeSpecUsageConfig()
+        now = int(time.time())
+        self.config.put("hot", [5, now - 60 * 60])
+        self.config.put("cold", [1, now - 3 * 24 * 60 * 60])
+        self.usage_tracker = SpecUsageTracker(self.config)
+        self.merge_strategy = UsagePruningMergingStrategy(self.usage_tracker, 2)
+
+    def _merge(self):
+        return self.merge_strategy.merge_into_single([CompatibilityResult(_TestRule(), set())])
+
+    def test_idle_specs_are_demoted(self):
+        merged_rule = self._merge()
+
+        self.assertItemsEqual(["hot", "new"], merged_rule.get_mapping().keys())
+        demoted_rule = self.merge_strategy.get_demoted_rule(merged_rule)
+        self.assertItemsEqual(["cold"], demoted_rule.get_mapping().keys())
+
+    def test_new_specs_get_grace_period(self):
+        self._merge()
+
+        self.assertIsNotNone(self.config.get("new"))
+        self.assertFalse(self.usage_tracker.is_idle("new", 60))
+        self.assertEqual(1, self.config.saves)
+
+    def test_used_spec_is_promoted(self):
+        self.usage_tracker.record_use("cold")
+        merged_rule = self._merge()
+
+        self.assertItemsEqual(["hot", "cold", "new"], merged_rule.get_mapping().keys())
+        self.assertIsNone(self.merge_strategy.get_demoted_rule(merged_rule))
+        self.assertEqual(2, self.usage_tracker.get_use_count("cold"))
+
+    def test_restored_spec_is_promoted(self):
+        self.usage_tracker.restore(["cold"])
+        merged_rule = self._merge()
+
+        self.assertIn("cold", merged_rule.get_mapping())
+        self.assertEqual(1, self.usage_tracker.get_use_count("cold"))
+
+    def test_recognitions_save_at_most_once_per_interval(self):
+        self.usage_tracker.record_use("hot")
+        self.usage_tracker.record_use("hot")
+
+        self.assertEqual(1, self.config.saves)
+        self.assertEqual(7, self.usage_tracker.get_use_count("hot"))
@@ -0,0 +1,24 @@
+from unittest import TestCase
+
+from castervoice.lib.merge.ccrmerging2.partitioning.title_pattern_context import TitlePatternContext
+
+
+class TestTitlePatternContext(TestCase):
+
+    def test_matches_title_word(self):
+        context = TitlePatternContext(["*.py", "*.pyw"])
+
+        self.assertTrue(context.matches("code.exe", "main.py - Visual Studio Code", None))
+        self.assertTrue(context.matches("notepad++.exe", "*C:\\src\\MAIN.PY - Notepad++", None))
+        self.assertTrue(context.matches("code.exe", "[tool.pyw]", None))
+        self.assertFalse(context.matches("code.exe", "main.pyc - Visual Studio Code", None))
+        self.assertFalse(context.matches("code.exe", "python notes.txt", None))
+
+    def test_excluded_patterns(self):
+        context = TitlePatternContext(["*.py"], ["*.rs"])
+
+        self.assertTrue(context.matches("code.exe", "main.py", None))
+        self.assertFalse(context.matches("code.exe", "main.py | lib.rs", None))
+
+    def test_no_title(self):
+        self.assertFalse(TitlePatternContext(["*.py"]).matches("code.exe", None, None))
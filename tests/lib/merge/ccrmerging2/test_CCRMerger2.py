@@ -1,5 +1,8 @@
+import time
+
+from dragonfly import Function, Grammar, get_engine
 from dragonfly.grammar.context import LogicNotContext, Context, LogicAndContext
-from mock import Mock
+from mock import Mock, patch
 from castervoice.lib.context import AppContext
 from castervoice.rules.apps.editor.eclipse_rules.eclipse import EclipseCCR
 from castervoice.rules.apps.editor.vscode_rules.vscode import VSCodeCcrRule
@@ -9,14 +12,46 @@ from castervoice.lib.const import CCRType
 from castervoice.lib.ctrl.mgr.managed_rule import ManagedRule
 from castervoice.lib.ctrl.mgr.rule_details import RuleDetails
 from castervoice.lib.ctrl.nexus import Nexus
+from castervoice.lib.merge.commands_index import CommandsIndex
+from castervoice.lib.merge.mergerule import MergeRule
+from castervoice.lib.merge.ccrmerging2.ccrmerger2 import CCRMerger2
+from castervoice.lib.merge.ccrmerging2.compatibility.detail_compat_checker import DetailCompatibilityChecker
+from castervoice.lib.merge.ccrmerging2.compatibility.simple_compat_checker import SimpleCompatibilityChecker
+from castervoice.lib.merge.ccrmerging2.compatibility.trie_compat_checker import TrieCompatibilityChecker
+from castervoice.lib.merge.ccrmerging2.complexity_analyzer import CCRComplexity, ComplexityAnalyzer, \
+    ComplexityBudget
+from castervoice.lib.merge.ccrmerging2.merge_cache import MergeCache
+from castervoice.lib.merge.ccrmerging2.merge_plan_cache import MergePlanCache
+from castervoice.lib.merge.ccrmerging2.merging.classic_merging_strategy import ClassicMergingStrategy
+from castervoice.lib.merge.ccrmerging2.merging.usage_pruning_merging_strategy import UsagePruningMergingStrategy
+from castervoice.lib.merge.ccrmerging2.spec_usage import SpecUsageTracker
 from castervoice.lib.merge.ccrmerging2.sorting.config_ruleset_sorter import ConfigBasedRuleSetSorter
 from castervoice.lib.merge.ccrmerging2.transformers.text_replacer.text_replacer import TextReplacerTransformer
 from castervoice.lib.merge.ccrmerging2.transformers.transformers_runner import TransformersRunner
-from tests.lib.merge.ccrmerging2.fake_rules import FakeRuleOne, FakeRuleTwo
+from tests.lib.merge.ccrmerging2.fake_rules import FakeRuleOne, FakeRuleTwo, FakeRuleThree
 from tests.lib.merge.ccrmerging2.transformers.text_replacer import mock_TRParser
 from tests.test_util.settings_mocking import SettingsEnabledTestCase
 
 
+class _UsageRule(MergeRule):
+    mapping = {
+        "usage alpha": Function(lambda: None),
+        "usage bravo": Function(lambda: None)
+    }
+
+
+class _CloseRule(MergeRule):
+    mapping = {
+        "close": Function(lambda: None)
+    }
+
+
+class _CloseTabRule(MergeRule):
+    mapping = {
+        "close tab": Function(lambda: None)
+    }
+
+
 class TestCCRMerger2(SettingsEnabledTestCase):
 
     @staticmethod
@@ -141,3 +176,504 @@ class TestCCRMerger2(SettingsEnabledTestCase):
         self.assertIsInstance(context_2, AppContext)
         self.assertIsInstance(context_3, AppContext)
         # TODO: write a similar unit test to check the executables/titles validity of the contexts produced
+
+    def test_incremental_merging_matches_full_merging(self):
+        """
+        A merger with a MergeCache should produce the same results as a merger
+        without one, across a series of enables/disables.
+        """
+        self._set_setting(["ccr_merging", "incremental_merging"], True)
+        incremental_merger = Nexus._create_merger(self.selfmodrule_configurer, self.transformers_runner)
+        self.assertIsNotNone(incremental_merger._merge_cache)
+
+        mrs = {
+            "Alphabet": TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL),
+            "Navigation": TestCCRMerger2._create_managed_rule(Navigation, CCRType.GLOBAL),
+            "FakeRuleOne": TestCCRMerger2._create_managed_rule(FakeRuleOne, CCRType.GLOBAL),
+            "FakeRuleTwo": TestCCRMerger2._create_managed_rule(FakeRuleTwo, CCRType.GLOBAL),
+            "FakeRuleThree": TestCCRMerger2._create_managed_rule(FakeRuleThree, CCRType.GLOBAL),
+            "EclipseCCR": TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse"),
+            "VSCodeCcrRule": TestCCRMerger2._create_managed_rule(VSCodeCcrRule, CCRType.APP, "vscode")
+        }
+        enabled_sequence = [
+            ["Alphabet"],
+            ["Alphabet", "Navigation"],
+            ["Alphabet", "Navigation", "FakeRuleOne"],
+            ["Alphabet", "Navigation", "FakeRuleOne", "FakeRuleTwo"],
+            ["Alphabet", "Navigation", "FakeRuleOne", "FakeRuleTwo", "EclipseCCR"],
+            ["Alphabet", "FakeRuleOne", "FakeRuleTwo", "EclipseCCR", "VSCodeCcrRule"],
+            ["Alphabet", "FakeRuleOne", "EclipseCCR", "VSCodeCcrRule", "FakeRuleThree"],
+            ["Alphabet", "FakeRuleOne", "VSCodeCcrRule", "FakeRuleThree"],
+            ["Alphabet", "FakeRuleOne", "VSCodeCcrRule", "FakeRuleThree", "Navigation"]
+        ]
+
+        for enabled_rcns in enabled_sequence:
+            sorter = ConfigBasedRuleSetSorter(enabled_rcns)
+            managed_rules = [mrs[rcn] for rcn in enabled_rcns]
+            expected = self.merger.merge_rules(managed_rules, sorter)
+            actual = incremental_merger.merge_rules(managed_rules, sorter, enabled_rcns[-1:])
+
+            self.assertEqual(expected.all_rule_class_names, actual.all_rule_class_names)
+            self.assertEqual(expected.rules_enabled_diff.newly_enabled, actual.rules_enabled_diff.newly_enabled)
+            self.assertEqual(expected.rules_enabled_diff.newly_disabled, actual.rules_enabled_diff.newly_disabled)
+            self.assertEqual(len(expected.ccr_rules_and_contexts), len(actual.ccr_rules_and_contexts))
+            for i in range(0, len(expected.ccr_rules_and_contexts)):
+                expected_rule = self._extract_merged_rule_from_repeatrule(expected.ccr_rules_and_contexts, i)
+                actual_rule = self._extract_merged_rule_from_repeatrule(actual.ccr_rules_and_contexts, i)
+                self.assertItemsEqual(expected_rule._mapping.keys(), actual_rule._mapping.keys())
+                self.assertItemsEqual(expected_rule._extras.keys(), actual_rule._extras.keys())
+                self.assertItemsEqual(expected_rule._defaults.keys(), actual_rule._defaults.keys())
+                self.assertEqual(str(expected.ccr_rules_and_contexts[i][1]),
+                                 str(actual.ccr_rules_and_contexts[i][1]))
+
+    def _get_repeat_rule_alt_rules(self, rules_and_contexts, index):
+        repeat_rule = rules_and_contexts[index][0]
+        return [rule_ref._rule for rule_ref in repeat_rule._extras["caster_base_sequence"]._child._children]
+
+    def test_shared_global_rule(self):
+        """
+        In shared global rule mode, app repeat rules should reference the one
+        global merged rule rather than copies of it, and all of the repeat rules
+        should fit into a single grammar.
+        """
+        self._set_setting(["ccr_merging", "shared_global_rule"], True)
+        merger = Nexus._create_merger(self.selfmodrule_configurer, self.transformers_runner)
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        eclipse_app_mr = TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse")
+        vscode_app_mr = TestCCRMerger2._create_managed_rule(VSCodeCcrRule, CCRType.APP, "vscode")
+        result = merger.merge_rules([alphabet_mr, eclipse_app_mr, vscode_app_mr], self.sorter)
+
+        self.assertTrue(result.single_grammar)
+        self.assertEqual(3, len(result.ccr_rules_and_contexts))
+        global_alts = self._get_repeat_rule_alt_rules(result.ccr_rules_and_contexts, 0)
+        eclipse_alts = self._get_repeat_rule_alt_rules(result.ccr_rules_and_contexts, 1)
+        vscode_alts = self._get_repeat_rule_alt_rules(result.ccr_rules_and_contexts, 2)
+        self.assertEqual(1, len(global_alts))
+        self.assertIs(global_alts[0], eclipse_alts[0])
+        self.assertIs(global_alts[0], vscode_alts[0])
+        self.assertTrue("eclipse" not in str(global_alts[0]._mapping))
+        # "list available commands" is only in the global rule, so no repeat rule has it twice
+        self.assertIn("list available commands", global_alts[0]._mapping)
+        self.assertItemsEqual(EclipseCCR.mapping.keys(), eclipse_alts[1]._mapping.keys())
+        for repeat_rule, context in result.ccr_rules_and_contexts:
+            self.assertIs(context, repeat_rule._context)
+
+        grammar = Grammar("shared")
+        for repeat_rule, _ in result.ccr_rules_and_contexts:
+            grammar.add_rule(repeat_rule)
+        grammar.add_all_dependencies()
+        prepared_rules = [rule for rule in grammar.rules if rule.name.startswith("Prepared")]
+        self.assertEqual(3, len(prepared_rules))
+
+    def test_shared_global_rule_incompatible_app_rule(self):
+        """
+        An app rule which is incompatible with a global rule gets its own full copy.
+        """
+        merger = CCRMerger2(self.transformers_runner, DetailCompatibilityChecker(), ClassicMergingStrategy(),
+                            4, self.selfmodrule_configurer, shared_global_rule=True)
+        sorter = ConfigBasedRuleSetSorter(["FakeRuleOne", "FakeRuleThree", "FakeRuleTwo"])
+        one_mr = TestCCRMerger2._create_managed_rule(FakeRuleOne, CCRType.GLOBAL)
+        three_mr = TestCCRMerger2._create_managed_rule(FakeRuleThree, CCRType.GLOBAL)
+        two_app_mr = TestCCRMerger2._create_managed_rule(FakeRuleTwo, CCRType.APP, "two")
+        result = merger.merge_rules([one_mr, three_mr, two_app_mr], sorter)
+
+        self.assertEqual(2, len(result.ccr_rules_and_contexts))
+        app_alts = self._get_repeat_rule_alt_rules(result.ccr_rules_and_contexts, 1)
+        self.assertEqual(1, len(app_alts))
+        self.assertItemsEqual(["a", "b", "c", "two exclusive", "list available commands"],
+                              app_alts[0]._mapping.keys())
+
+    def test_fingerprints(self):
+        """
+        Merging the same rules twice should produce the same fingerprints; adding
+        an app rule should only change the fingerprint of the global rule (its
+        negation context changes) and add one for the app rule.
+        """
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        eclipse_app_mr = TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse")
+        vscode_app_mr = TestCCRMerger2._create_managed_rule(VSCodeCcrRule, CCRType.APP, "vscode")
+        first = self.merger.merge_rules([alphabet_mr, eclipse_app_mr], self.sorter)
+        second = self.merger.merge_rules([alphabet_mr, eclipse_app_mr], self.sorter)
+        third = self.merger.merge_rules([alphabet_mr, eclipse_app_mr, vscode_app_mr], self.sorter)
+
+        self.assertEqual(2, len(first.fingerprints))
+        self.assertEqual(first.fingerprints, second.fingerprints)
+        self.assertNotEqual(first.fingerprints[0], third.fingerprints[0])
+        self.assertEqual(first.fingerprints[1], third.fingerprints[1])
+        self.assertEqual(3, len(set(third.fingerprints)))
+
+    def test_content_derived_names(self):
+        """
+        With content-derived names, separate mergers (e.g. separate sessions)
+        should name the same content the same way.
+        """
+        self._set_setting(["ccr_merging", "content_derived_names"], True)
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        eclipse_app_mr = TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse")
+        first = Nexus._create_merger(self.selfmodrule_configurer, self.transformers_runner) \
+            .merge_rules([alphabet_mr, eclipse_app_mr], self.sorter)
+        second = Nexus._create_merger(self.selfmodrule_configurer, self.transformers_runner) \
+            .merge_rules([alphabet_mr, eclipse_app_mr], self.sorter)
+        other = Nexus._create_merger(self.selfmodrule_configurer, self.transformers_runner) \
+            .merge_rules([alphabet_mr], self.sorter)
+
+        first_rule_names = [rule.name for rule, _ in first.ccr_rules_and_contexts]
+        self.assertEqual(first_rule_names, [rule.name for rule, _ in second.ccr_rules_and_contexts])
+        self.assertEqual(first.grammar_names, second.grammar_names)
+        self.assertEqual(2, len(set(first.grammar_names)))
+        self.assertNotIn(other.grammar_names[0], first.grammar_names)
+        self.assertTrue(first_rule_names[0].startswith("Repeater"))
+
+    def test_merge_plan_cache(self):
+        """
+        A merge with the same inputs as a previously persisted merge should skip
+        sorting and compatibility checking, and produce the same result.
+        """
+        saved_files = {}
+        with patch("castervoice.lib.utilities.save_json_file",
+                   side_effect=lambda data, path: saved_files.update({path: data})), \
+                patch("castervoice.lib.utilities.load_json_file",
+                      side_effect=lambda path: saved_files.get(path, {})):
+            alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+            one_mr = TestCCRMerger2._create_managed_rule(FakeRuleOne, CCRType.GLOBAL)
+            two_mr = TestCCRMerger2._create_managed_rule(FakeRuleTwo, CCRType.GLOBAL)
+            managed_rules = [alphabet_mr, one_mr, two_mr]
+            sorter = ConfigBasedRuleSetSorter(["Alphabet", "FakeRuleOne", "FakeRuleTwo"])
+
+            first_merger = CCRMerger2(self.transformers_runner, Mock(wraps=SimpleCompatibilityChecker()),
+                                      ClassicMergingStrategy(), 4, self.selfmodrule_configurer,
+                                      merge_plan_cache=MergePlanCache("merge_plan.json"))
+            expected = first_merger.merge_rules(managed_rules, sorter)
+            self.assertEqual(1, len(saved_files))
+
+            # a new merger and cache, as if Caster restarted
+            checker = Mock(wraps=SimpleCompatibilityChecker())
+            second_merger = CCRMerger2(self.transformers_runner, checker,
+                                       ClassicMergingStrategy(), 4, self.selfmodrule_configurer,
+                                       merge_plan_cache=MergePlanCache("merge_plan.json"))
+            sorter.sort_rules = Mock(wraps=sorter.sort_rules)
+            actual = second_merger.merge_rules(managed_rules, sorter)
+
+            sorter.sort_rules.assert_not_called()
+            checker.compatibility_check.assert_not_called()
+            self.assertEqual(expected.all_rule_class_names, actual.all_rule_class_names)
+            self.assertEqual(expected.rules_enabled_diff.newly_disabled, actual.rules_enabled_diff.newly_disabled)
+            expected_rule = self._extract_merged_rule_from_repeatrule(expected.ccr_rules_and_contexts)
+            actual_rule = self._extract_merged_rule_from_repeatrule(actual.ccr_rules_and_contexts)
+            self.assertItemsEqual(expected_rule._mapping.keys(), actual_rule._mapping.keys())
+
+    def test_merge_plan_cache_defers_later_plans(self):
+        """
+        Plans after the startup merge should be written on a timer, and the
+        latest one should be what the next startup gets.
+        """
+        saved_files = {}
+        create_timer = Mock()
+        with patch("castervoice.lib.utilities.save_json_file",
+                   side_effect=lambda data, path: saved_files.update({path: data})), \
+                patch("castervoice.lib.utilities.load_json_file",
+                      side_effect=lambda path: saved_files.get(path, {})):
+            alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+            one_mr = TestCCRMerger2._create_managed_rule(FakeRuleOne, CCRType.GLOBAL)
+            sorter = ConfigBasedRuleSetSorter(["Alphabet", "FakeRuleOne"])
+            plan_cache = MergePlanCache("merge_plan.json", 30, create_timer)
+            merger = CCRMerger2(self.transformers_runner, Mock(wraps=SimpleCompatibilityChecker()),
+                                ClassicMergingStrategy(), 4, self.selfmodrule_configurer,
+                                merge_plan_cache=plan_cache)
+            merger.merge_rules([alphabet_mr], sorter)
+            create_timer.assert_not_called()
+
+            # a rule toggle: the plan isn't written until the timer goes off
+            saved_files.clear()
+            merger.merge_rules([alphabet_mr, one_mr], sorter)
+            merger.merge_rules([one_mr], sorter)
+            self.assertEqual({}, saved_files)
+            create_timer.assert_called_once_with(plan_cache.save, 30)
+            plan_cache.save()
+            create_timer.return_value.stop.assert_called_once()
+
+            # as if Caster restarted
+            checker = Mock(wraps=SimpleCompatibilityChecker())
+            restarted_merger = CCRMerger2(self.transformers_runner, checker, ClassicMergingStrategy(), 4,
+                                          self.selfmodrule_configurer,
+                                          merge_plan_cache=MergePlanCache("merge_plan.json"))
+            restarted_merger.merge_rules([one_mr], sorter)
+            checker.compatibility_check.assert_not_called()
+
+    def test_commands_index_limited_to_active_context(self):
+        """
+        App rules' commands should only be listed in their apps.
+        """
+        window = Mock(executable="notepad", title="", handle=1)
+        index = CommandsIndex(lambda: window)
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(), ClassicMergingStrategy(), 4,
+                            self.selfmodrule_configurer)
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        eclipse_app_mr = TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse")
+        eclipse_spec = EclipseCCR.mapping.keys()[0]
+
+        with patch("castervoice.lib.merge.commands_index.get_instance", return_value=index):
+            merger.merge_rules([alphabet_mr, eclipse_app_mr], self.sorter)
+
+        self.assertEqual([], index.get_owners(eclipse_spec))
+        self.assertIn(Alphabet.mapping.keys()[0], index.get_available_commands().split("\n"))
+        window.executable = "eclipse"
+        self.assertEqual(["EclipseCCR"], index.get_owners(eclipse_spec))
+
+    def test_overlapping_rules_reported(self):
+        """
+        Rules which survive the trie compatibility check with overlapping
+        commands should be reported, once until the overlaps change.
+        """
+        merger = CCRMerger2(self.transformers_runner, TrieCompatibilityChecker(), ClassicMergingStrategy(), 4,
+                            self.selfmodrule_configurer)
+        close_mr = TestCCRMerger2._create_managed_rule(_CloseRule, CCRType.GLOBAL)
+        close_tab_mr = TestCCRMerger2._create_managed_rule(_CloseTabRule, CCRType.GLOBAL)
+        sorter = ConfigBasedRuleSetSorter(["_CloseRule", "_CloseTabRule"])
+
+        with patch("castervoice.lib.merge.ccrmerging2.ccrmerger2.printer") as printer:
+            result = merger.merge_rules([close_mr, close_tab_mr], sorter)
+            merger.merge_rules([close_mr, close_tab_mr], sorter)
+
+        self.assertEqual(["_CloseRule", "_CloseTabRule"], result.all_rule_class_names)
+        printer.out.assert_called_once_with("CCR rules with overlapping commands: _CloseRule and _CloseTabRule")
+
+    def test_complexity_budget_drop(self):
+        """
+        When over the complexity budget in "drop" mode, the lowest priority
+        (earliest in merge order) rules should be dropped until under budget.
+        """
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        nav_mr = TestCCRMerger2._create_managed_rule(Navigation, CCRType.GLOBAL)
+        analyzer = ComplexityAnalyzer()
+        max_elements = CCRComplexity(analyzer.analyze_rule(Navigation()), 1, 4).elements
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(), ClassicMergingStrategy(), 4,
+                            self.selfmodrule_configurer,
+                            complexity_budget=ComplexityBudget(max_elements, 0, ComplexityBudget.DROP))
+
+        result = merger.merge_rules([alphabet_mr, nav_mr], self.sorter)
+
+        self.assertEqual(["Navigation"], result.all_rule_class_names)
+        self.assertItemsEqual(["Alphabet"], result.rules_enabled_diff.newly_disabled)
+
+    def test_complexity_budget_drop_from_over_budget_grammar(self):
+        """
+        When only an app grammar is over budget, its app rule should be
+        dropped rather than the global rules which every grammar has.
+        """
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        nav_mr = TestCCRMerger2._create_managed_rule(Navigation, CCRType.GLOBAL)
+        eclipse_app_mr = TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse")
+        analyzer = ComplexityAnalyzer()
+        global_report = analyzer.analyze_rule(Alphabet()) + analyzer.analyze_rule(Navigation())
+        max_elements = CCRComplexity(global_report, 2, 4).elements
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(), ClassicMergingStrategy(), 4,
+                            self.selfmodrule_configurer,
+                            complexity_budget=ComplexityBudget(max_elements, 0, ComplexityBudget.DROP))
+
+        result = merger.merge_rules([alphabet_mr, nav_mr, eclipse_app_mr], self.sorter)
+
+        self.assertEqual(["Alphabet", "Navigation"], result.all_rule_class_names)
+        self.assertItemsEqual(["EclipseCCR"], result.rules_enabled_diff.newly_disabled)
+
+    def test_complexity_budget_uses_learned_repetitions(self):
+        """
+        With adaptive repetitions, the budget should be checked against the
+        max repetitions the grammar will actually be built with.
+        """
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        nav_mr = TestCCRMerger2._create_managed_rule(Navigation, CCRType.GLOBAL)
+        analyzer = ComplexityAnalyzer()
+        global_report = analyzer.analyze_rule(Alphabet()) + analyzer.analyze_rule(Navigation())
+        max_elements = CCRComplexity(global_report, 2, 4).elements
+        adaptive_repetitions = Mock()
+        adaptive_repetitions.get_max_repetitions.return_value = 16
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(), ClassicMergingStrategy(), 4,
+                            self.selfmodrule_configurer,
+                            complexity_budget=ComplexityBudget(max_elements, 0, ComplexityBudget.DROP),
+                            adaptive_repetitions=adaptive_repetitions)
+
+        result = merger.merge_rules([alphabet_mr, nav_mr], self.sorter)
+
+        self.assertEqual(["Navigation"], result.all_rule_class_names)
+
+    def test_complexity_budget_warn(self):
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        nav_mr = TestCCRMerger2._create_managed_rule(Navigation, CCRType.GLOBAL)
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(), ClassicMergingStrategy(), 4,
+                            self.selfmodrule_configurer,
+                            complexity_budget=ComplexityBudget(1, 0, ComplexityBudget.WARN))
+
+        result = merger.merge_rules([alphabet_mr, nav_mr], self.sorter)
+
+        self.assertEqual(["Alphabet", "Navigation"], result.all_rule_class_names)
+
+    def test_adaptive_repetitions(self):
+        """
+        With adaptive repetitions, each repeat rule gets the max repetitions
+        learned for its rule set, and load times are reported by rule set key.
+        """
+        adaptive_repetitions = Mock()
+        adaptive_repetitions.get_max_repetitions.return_value = 7
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(), ClassicMergingStrategy(), 4,
+                            self.selfmodrule_configurer, adaptive_repetitions=adaptive_repetitions)
+        alphabet_mr = TestCCRMerger2._create_managed_rule(Alphabet, CCRType.GLOBAL)
+        eclipse_app_mr = TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse")
+
+        result = merger.merge_rules([alphabet_mr, eclipse_app_mr], self.sorter)
+
+        self.assertEqual(2, len(result.repetition_keys))
+        self.assertNotEqual(result.repetition_keys[0], result.repetition_keys[1])
+        for repeat_rule, _ in result.ccr_rules_and_contexts:
+            self.assertEqual(7, repeat_rule._extras["caster_base_sequence"]._max)
+        merger.record_load_time(result.repetition_keys[1], 0.5)
+        adaptive_repetitions.record_load_time.assert_called_once_with(result.repetition_keys[1], 0.5)
+
+    def test_usage_pruning(self):
+        """
+        Idle specs should be demoted to non-ccr fallback rules, spoken specs
+        (ccr or fallback) should be recorded, and restoring demoted specs should remerge.
+        """
+        usage_config = Mock()
+        usage_data = {"usage bravo": [0, int(time.time()) - 3 * 24 * 60 * 60]}
+        usage_config.get.side_effect = usage_data.get
+        usage_config.put.side_effect = usage_data.__setitem__
+        usage_tracker = SpecUsageTracker(usage_config)
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(),
+                            UsagePruningMergingStrategy(usage_tracker, 2), 4, self.selfmodrule_configurer,
+                            spec_usage_tracker=usage_tracker)
+        remerge_fn = Mock()
+        merger.set_remerge_fn(remerge_fn)
+        usage_mr = TestCCRMerger2._create_managed_rule(_UsageRule, CCRType.GLOBAL)
+
+        result = merger.merge_rules([usage_mr], ConfigBasedRuleSetSorter(["_UsageRule"]))
+
+        self.assertEqual(["usage bravo"], merger.get_demoted_specs())
+        self.assertEqual(1, len(result.fallback_rules_and_contexts))
+        merged_rule = self._extract_merged_rule_from_repeatrule(result.ccr_rules_and_contexts)
+        self.assertNotIn("usage bravo", merged_rule.get_mapping())
+
+        grammar = Grammar("usage pruning test")
+        grammar.add_rule(result.ccr_rules_and_contexts[0][0])
+        grammar.add_rule(result.fallback_rules_and_contexts[0][0])
+        grammar.load()
+        try:
+            get_engine().mimic("usage alpha usage alpha")
+            get_engine().mimic("usage bravo")
+        finally:
+            grammar.unload()
+        self.assertEqual(2, usage_tracker.get_use_count("usage alpha"))
+        self.assertEqual(1, usage_tracker.get_use_count("usage bravo"))
+
+        merger.restore_demoted_specs()
+        remerge_fn.assert_called_once_with()
+
+    @staticmethod
+    def _create_usage_tracker(usage_data):
+        usage_config = Mock()
+        usage_config.get.side_effect = usage_data.get
+        usage_config.put.side_effect = usage_data.__setitem__
+        return SpecUsageTracker(usage_config)
+
+    def test_usage_pruning_with_merge_cache(self):
+        """
+        With incremental merging, a demoted spec which was spoken since the last
+        merge should be promoted by the next merge, not stay demoted in a cached merged rule.
+        """
+        usage_tracker = TestCCRMerger2._create_usage_tracker(
+            {"usage bravo": [0, int(time.time()) - 3 * 24 * 60 * 60]})
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(),
+                            UsagePruningMergingStrategy(usage_tracker, 2), 4, self.selfmodrule_configurer,
+                            merge_cache=MergeCache(), spec_usage_tracker=usage_tracker)
+        usage_mr = TestCCRMerger2._create_managed_rule(_UsageRule, CCRType.GLOBAL)
+        sorter = ConfigBasedRuleSetSorter(["_UsageRule"])
+
+        merger.merge_rules([usage_mr], sorter)
+        self.assertEqual(["usage bravo"], merger.get_demoted_specs())
+        merger.merge_rules([usage_mr], sorter)
+        self.assertEqual(["usage bravo"], merger.get_demoted_specs())
+
+        usage_tracker.record_use("usage bravo")
+        result = merger.merge_rules([usage_mr], sorter)
+
+        self.assertEqual([], merger.get_demoted_specs())
+        merged_rule = self._extract_merged_rule_from_repeatrule(result.ccr_rules_and_contexts)
+        self.assertIn("usage bravo", merged_rule.get_mapping())
+
+    def test_usage_pruning_shared_global_rule_has_one_fallback(self):
+        """
+        In shared global rule mode, the global merged rule is in every rule set,
+        but its demoted specs should only get one fallback rule, active everywhere.
+        """
+        usage_tracker = TestCCRMerger2._create_usage_tracker(
+            {"usage bravo": [0, int(time.time()) - 3 * 24 * 60 * 60]})
+        merger = CCRMerger2(self.transformers_runner, SimpleCompatibilityChecker(),
+                            UsagePruningMergingStrategy(usage_tracker, 2), 4, self.selfmodrule_configurer,
+                            shared_global_rule=True, spec_usage_tracker=usage_tracker)
+        usage_mr = TestCCRMerger2._create_managed_rule(_UsageRule, CCRType.GLOBAL)
+        eclipse_app_mr = TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse")
+
+        result = merger.merge_rules([usage_mr, eclipse_app_mr], ConfigBasedRuleSetSorter(["_UsageRule", "EclipseCCR"]))
+
+        self.assertEqual(2, len(result.ccr_rules_and_contexts))
+        self.assertEqual(1, len(result.fallback_rules_and_contexts))
+        fallback_rule, context = result.fallback_rules_and_contexts[0]
+        self.assertEqual(["usage bravo"], fallback_rule.get_mapping().keys())
+        self.assertTrue(context.matches("notepad.exe", "notes.txt", None))
+        self.assertTrue(context.matches("eclipse.exe", "x.java", None))
+
+    _PARTITION_WINDOWS = [("notepad.exe", "notes.txt"), ("notepad.exe", "x.one"), ("notepad.exe", "x.two"),
+                          ("notepad.exe", "x.one x.two"), ("eclipse.exe", "x.txt"), ("eclipse.exe", "x.one"),
+                          ("eclipse.exe", "x.two")]
+
+    def _merge_partitioned(self, shared_global_rule):
+        ccr_partitions = Mock()
+        ccr_partitions.get_patterns.side_effect = {"FakeRuleOne": ["*.one"], "FakeRuleTwo": ["*.two"]}.get
+        merger = CCRMerger2(self.transformers_runner, DetailCompatibilityChecker(), ClassicMergingStrategy(),
+                            4, self.selfmodrule_configurer, shared_global_rule=shared_global_rule,
+                            ccr_partitions=ccr_partitions)
+        sorter = ConfigBasedRuleSetSorter(["FakeRuleOne", "FakeRuleTwo", "FakeRuleThree", "EclipseCCR"])
+        one_mr = TestCCRMerger2._create_managed_rule(FakeRuleOne, CCRType.GLOBAL)
+        two_mr = TestCCRMerger2._create_managed_rule(FakeRuleTwo, CCRType.GLOBAL)
+        three_mr = TestCCRMerger2._create_managed_rule(FakeRuleThree, CCRType.GLOBAL)
+        eclipse_app_mr = TestCCRMerger2._create_managed_rule(EclipseCCR, CCRType.APP, "eclipse")
+        return merger.merge_rules([one_mr, two_mr, three_mr, eclipse_app_mr], sorter)
+
+    def _assert_active_rules(self, result, expected_indices):
+        for (executable, title), expected_index in zip(TestCCRMerger2._PARTITION_WINDOWS, expected_indices):
+            active = [i for i, (_, context) in enumerate(result.ccr_rules_and_contexts)
+                      if context.matches(executable, title, None)]
+            self.assertEqual([expected_index], active, title)
+
+    def test_partitioned_ccr(self):
+        """
+        In partitioned mode, partition rules should each get a grammar with
+        the core rules (and app rules their own), rather than being merged (and
+        KO'd) together, and exactly one of the grammars should be active for a window.
+        Each grammar is a full copy of the core rules, so app rules win over
+        partitions rather than getting a grammar for each combination.
+        """
+        result = self._merge_partitioned(False)
+
+        # core, 2 partitions, eclipse
+        self.assertEqual(4, len(result.ccr_rules_and_contexts))
+        self.assertItemsEqual(["FakeRuleOne", "FakeRuleTwo", "FakeRuleThree", "EclipseCCR"],
+                              result.all_rule_class_names)
+        core_rule = self._extract_merged_rule_from_repeatrule(result.ccr_rules_and_contexts, 0)
+        one_rule = self._extract_merged_rule_from_repeatrule(result.ccr_rules_and_contexts, 1)
+        two_rule = self._extract_merged_rule_from_repeatrule(result.ccr_rules_and_contexts, 2)
+        self.assertItemsEqual(["c", "list available commands"], core_rule._mapping.keys())
+        self.assertIn("one exclusive", one_rule._mapping)
+        self.assertIn("two exclusive", two_rule._mapping)
+        self._assert_active_rules(result, [0, 1, 2, 2, 3, 3, 3])
+
+    def test_partitioned_ccr_shared_global_rule(self):
+        """
+        With a shared global rule, app and partition rule combinations only
+        add small merged rules, so each gets its own repeat rule.
+        """
+        result = self._merge_partitioned(True)
+
+        # core, 2 partitions, eclipse, eclipse with each partition
+        self.assertEqual(6, len(result.ccr_rules_and_contexts))
+        self._assert_active_rules(result, [0, 1, 2, 2, 3, 4, 5])
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from castervoice.lib.config.config_base import BaseConfig
+from castervoice.lib.merge.ccrmerging2.adaptive_repetitions import AdaptiveRepetitions
+
+
+class _FakeRepetitionsConfig(BaseConfig):
+    def __init__(self):
+        super(_FakeRepetitionsConfig, self).__init__()
+        self.saves = 0
+
+    def save(self):
+        self.saves += 1
+
+    def get_all_keys(self):
+        return list(self._config.keys())
+
+    def remove(self, key):
+        self._config.pop(key, None)
+
+
+class TestAdaptiveRepetitions(TestCase):
+
+    def setUp(self):
+        self.config = _FakeRepetitionsConfig()
+        self.adaptive_repetitions = AdaptiveRepetitions(self.config, 16, 4, 32, 1.0)
+
+    def test_default(self):
+        self.assertEqual(16, self.adaptive_repetitions.get_max_repetitions("a"))
+
+    def test_slow_load_lowers_repetitions(self):
+        self.adaptive_repetitions.record_load_time("a", 2.0)
+        self.assertEqual(8, self.adaptive_repetitions.get_max_repetitions("a"))
+        self.assertEqual(16, self.adaptive_repetitions.get_max_repetitions("b"))
+        self.assertEqual(1, self.config.saves)
+
+    def test_fast_load_raises_repetitions(self):
+        self.adaptive_repetitions.record_load_time("a", 0.1)
+        self.assertEqual(20, self.adaptive_repetitions.get_max_repetitions("a"))
+
+    def test_on_target_load_keeps_repetitions(self):
+        self.adaptive_repetitions.record_load_time("a", 0.8)
+        self.assertEqual(16, self.adaptive_repetitions.get_max_repetitions("a"))
+
+    def test_limits(self):
+        self.adaptive_repetitions.record_load_time("a", 100.0)
+        self.assertEqual(4, self.adaptive_repetitions.get_max_repetitions("a"))
+        for i in range(20):
+            self.adaptive_repetitions.record_load_time("a", 0.0)
+        self.assertEqual(32, self.adaptive_repetitions.get_max_repetitions("a"))
+
+    def test_prune(self):
+        for i in range(AdaptiveRepetitions._MAX_ENTRIES + 5):
+            self.config.put("old" + str(i), [16, 0])
+        self.adaptive_repetitions.record_load_time("a", 2.0)
+        self.assertEqual(AdaptiveRepetitions._MAX_ENTRIES, len(self.config.get_all_keys()))
+        self.assertEqual(8, self.adaptive_repetitions.get_max_repetitions("a"))
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from dragonfly import Choice, Dictation
+
+from castervoice.lib.merge.ccrmerging2.complexity_analyzer import CCRComplexity, ComplexityAnalyzer, \
+    ComplexityBudget
+from castervoice.lib.merge.mergerule import MergeRule
+from castervoice.lib.merge.state.actions2 import NullAction
+
+
+class _TestRule(MergeRule):
+    mapping = {
+        "hello [there] <x>": NullAction(),
+        "say <text>": NullAction()
+    }
+    extras = [
+        Choice("x", {"one": 1, "two": 2, "three": 3}),
+        Dictation("text")
+    ]
+
+
+class TestComplexityAnalyzer(TestCase):
+
+    def setUp(self):
+        self.analyzer = ComplexityAnalyzer()
+
+    def test_analyze_rule(self):
+        report = self.analyzer.analyze_rule(_TestRule())
+        self.assertEqual(3, report.choice_items)
+        # "hello [there] <x>": 2 * 3; "say <text>": 1
+        self.assertEqual(7, report.paths)
+        self.assertTrue(report.alternatives >= 2 + 3)
+
+    def test_reports_add_up(self):
+        report = self.analyzer.analyze_rule(_TestRule())
+        total = report + report
+        self.assertEqual(2 * report.elements, total.elements)
+        self.assertEqual(2 * report.paths, total.paths)
+
+    def test_ccr_complexity(self):
+        report = self.analyzer.analyze_rule(_TestRule())
+        complexity = CCRComplexity(report, 1, 3)
+        self.assertTrue(complexity.elements > report.elements)
+        self.assertAlmostEqual(3 * 0.845, complexity.log10_paths, places=2)
+
+    def test_budget(self):
+        complexity = CCRComplexity(self.analyzer.analyze_rule(_TestRule()), 1, 3)
+        self.assertFalse(ComplexityBudget().is_limited())
+        self.assertFalse(ComplexityBudget().is_exceeded_by(complexity))
+        self.assertTrue(ComplexityBudget(max_elements=complexity.elements - 1).is_exceeded_by(complexity))
+        self.assertFalse(ComplexityBudget(max_elements=complexity.elements).is_exceeded_by(complexity))
+        self.assertTrue(ComplexityBudget(max_log10_paths=2).is_exceeded_by(complexity))
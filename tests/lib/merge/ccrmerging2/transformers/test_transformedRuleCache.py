@@ -0,0 +1,90 @@
+import hashlib
+from unittest import TestCase
+
+from dragonfly import Dictation
+from mock import MagicMock, Mock, patch
+
+from castervoice.lib.merge.ccrmerging2.transformers.text_replacer.text_replacer import TextReplacerTransformer
+from castervoice.lib.merge.ccrmerging2.transformers.transformed_rule_cache import TransformedRuleCache
+from castervoice.lib.merge.ccrmerging2.transformers.transformers_runner import TransformersRunner
+from castervoice.lib.merge.mergerule import MergeRule
+from castervoice.lib.merge.selfmod.selfmodrule import BaseSelfModifyingRule
+from castervoice.lib.merge.state.actions2 import NullAction
+from tests.lib.merge.ccrmerging2.transformers.text_replacer import mock_TRParser
+
+
+class _TestMergeRule(MergeRule):
+    mapping = {
+        "some <text>": NullAction(),
+        "other": NullAction()
+    }
+    extras = [Dictation("text")]
+
+
+class _MockTextReplacerTransformer(TextReplacerTransformer):
+    def __init__(self):
+        TextReplacerTransformer.__init__(self, mock_TRParser.MockTRParser)
+
+
+class TestTransformedRuleCache(TestCase):
+
+    def setUp(self):
+        for definitions in [mock_TRParser.MOCK_SPECS, mock_TRParser.MOCK_EXTRAS, mock_TRParser.MOCK_DEFAULTS]:
+            definitions.clear()
+        mock_TRParser.MOCK_SPECS["some"] = "any"
+        self.transformers_runner = TransformersRunner(MagicMock(), TransformedRuleCache())
+        self.transformers_runner.add_transformer(_MockTextReplacerTransformer)
+
+    def tearDown(self):
+        mock_TRParser.MOCK_SPECS.clear()
+
+    def test_cached_transformation(self):
+        expected = self.transformers_runner.transform_rule(_TestMergeRule())
+        with patch.object(_MockTextReplacerTransformer, "get_transformed_rule") as transform:
+            actual = self.transformers_runner.transform_rule(_TestMergeRule())
+
+            transform.assert_not_called()
+        self.assertItemsEqual(expected._mapping.keys(), actual._mapping.keys())
+        self.assertIn("any <text>", actual._mapping)
+        self.assertIn("any <text>", actual.get_mapping())
+
+    def test_cached_transformation_is_new_instance(self):
+        self.transformers_runner.transform_rule(_TestMergeRule())
+        rule = _TestMergeRule()
+        actual = self.transformers_runner.transform_rule(rule)
+
+        self.assertIsNot(rule, actual)
+        self.assertIsInstance(actual, _TestMergeRule)
+        self.assertIn("some <text>", rule._mapping)
+
+    def test_cache_key_is_rehashed_only_when_definitions_change(self):
+        transformer = _MockTextReplacerTransformer()
+        with patch("hashlib.sha1", wraps=hashlib.sha1) as sha1:
+            key = transformer.get_cache_key()
+            self.assertEqual(key, transformer.get_cache_key())
+            self.assertEqual(1, sha1.call_count)
+
+            mock_TRParser.MOCK_SPECS["some"] = "a few"
+            self.assertNotEqual(key, transformer.get_cache_key())
+            self.assertEqual(2, sha1.call_count)
+
+    def test_definitions_change_invalidates(self):
+        self.transformers_runner.transform_rule(_TestMergeRule())
+        mock_TRParser.MOCK_SPECS["some"] = "a few"
+        rule = self.transformers_runner.transform_rule(_TestMergeRule())
+
+        self.assertIn("a few <text>", rule._mapping)
+
+    def test_source_change_invalidates(self):
+        self.transformers_runner.transform_rule(_TestMergeRule())
+        with patch("castervoice.lib.merge.ccrmerging2.file_hasher.FileHasher.get_hash", return_value="changed"):
+            with patch.object(_MockTextReplacerTransformer, "get_transformed_rule",
+                              side_effect=lambda rule: rule) as transform:
+                self.transformers_runner.transform_rule(_TestMergeRule())
+
+                transform.assert_called_once()
+
+    def test_selfmod_rules_not_cached(self):
+        selfmod_rule = Mock(spec=BaseSelfModifyingRule)
+
+        self.assertIsNone(TransformedRuleCache().create_key(selfmod_rule, []))
@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from castervoice.lib.merge.ccrmerging2.transformers.text_replacer.tr_replacer import TRReplacer
+
+
+class TestTRReplacer(TestCase):
+
+    def test_replace_all_occurrences(self):
+        replacer = TRReplacer({"shock": "earthquake", "sauce": "up"})
+        self.assertEqual(("earthquake up earthquake", True), replacer.replace("shock sauce shock"))
+
+    def test_no_replacements(self):
+        replacer = TRReplacer({"shock": "earthquake"})
+        self.assertEqual(("sauce", False), replacer.replace("sauce"))
+
+    def test_longest_match_wins(self):
+        replacer = TRReplacer({"dunce": "down", "dunce make": "descend"})
+        self.assertEqual(("descend now", True), replacer.replace("dunce make now"))
+
+    def test_replacements_do_not_chain(self):
+        replacer = TRReplacer({"shock": "sauce", "sauce": "up"})
+        self.assertEqual(("sauce up", True), replacer.replace("shock sauce"))
+
+    def test_special_characters_and_empty_text(self):
+        replacer = TRReplacer({"(a|b)": "c", "": "x"})
+        self.assertEqual(("c a", True), replacer.replace("(a|b) a"))
+
+    def test_is_for(self):
+        replacements = {"shock": "earthquake"}
+        replacer = TRReplacer(replacements)
+        self.assertTrue(replacer.is_for({"shock": "earthquake"}))
+        replacements["sauce"] = "up"
+        self.assertFalse(replacer.is_for(replacements))
@@ -107,3 +107,15 @@ class TestTextReplacerTransformer(TestCase):
         self.assertEqual("_TestMappingRule", transformed_rule1.__class__.__name__)
         transformed_rule2 = trt.get_transformed_rule(rule2)
         self.assertEqual("_TestMergeRule", transformed_rule2.__class__.__name__)
+
+    def test_bound_extras_are_preserved(self):
+        trt = TextReplacerTransformer(mock_TRParser.MockTRParser)
+        rule = _TestMergeRule()
+        mock_TRParser.MOCK_SPECS["text"] = "words"
+        mock_TRParser.MOCK_SPECS["other"] = "another"
+        transformed_rule = trt.get_transformed_rule(rule)
+        del mock_TRParser.MOCK_SPECS["text"]
+        del mock_TRParser.MOCK_SPECS["other"]
+
+        self.assertTrue("some <text>" in transformed_rule._mapping)
+        self.assertTrue("another [<choice>]" in transformed_rule._mapping)
@@ -0,0 +1,65 @@
+from unittest import TestCase
+
+from dragonfly import AppContext, IntegerRef
+from mock import Mock
+
+from castervoice.lib.merge.commands_index import CommandsIndex
+from castervoice.lib.merge.mergerule import MergeRule
+from castervoice.lib.merge.state.actions2 import NullAction
+
+
+class _TestRuleA(MergeRule):
+    mapping = {
+        "go to line <n>": NullAction(),
+        "close [tab]": NullAction()
+    }
+    extras = [IntegerRef("n", 1, 100)]
+
+
+class _TestRuleB(MergeRule):
+    mapping = {
+        "close [tab]": NullAction(),
+        "save file": NullAction()
+    }
+
+
+class TestCommandsIndex(TestCase):
+
+    def setUp(self):
+        self.window = Mock(executable="notepad", title="", handle=1)
+        self.index = CommandsIndex(lambda: self.window)
+        self.index.set_rules([("_TestRuleA", _TestRuleA(), None), ("_TestRuleB", _TestRuleB(), None)])
+
+    def test_available_commands(self):
+        self.assertEqual("close [tab]\ngo to line <n>\nsave file", self.index.get_available_commands())
+
+    def test_find_specs(self):
+        self.assertEqual(["close [tab]"], self.index.find_specs("tab"))
+        self.assertEqual(["go to line <n>"], self.index.find_specs("Line to"))
+        self.assertEqual([], self.index.find_specs("n"))
+        self.assertEqual([], self.index.find_specs("save tab"))
+
+    def test_get_owners(self):
+        self.assertEqual(["_TestRuleA", "_TestRuleB"], self.index.get_owners("close [tab]"))
+        self.assertEqual(["_TestRuleB"], self.index.get_owners("save file"))
+        self.assertEqual([], self.index.get_owners("nothing"))
+
+    def test_set_rules_invalidates(self):
+        self.index.find_specs("save")
+        self.index.set_rules([("_TestRuleA", _TestRuleA(), None)])
+
+        self.assertEqual([], self.index.find_specs("save"))
+        self.assertEqual("close [tab]\ngo to line <n>", self.index.get_available_commands())
+
+    def test_rules_of_other_contexts_are_left_out(self):
+        self.index.set_rules([("_TestRuleA", _TestRuleA(), None),
+                              ("_TestRuleB", _TestRuleB(), AppContext(executable="eclipse"))])
+
+        self.assertEqual("close [tab]\ngo to line <n>", self.index.get_available_commands())
+        self.assertEqual([], self.index.find_specs("save"))
+        self.assertEqual(["_TestRuleA"], self.index.get_owners("close [tab]"))
+
+        self.window.executable = "eclipse"
+        self.assertEqual("close [tab]\ngo to line <n>\nsave file", self.index.get_available_commands())
+        self.assertEqual(["save file"], self.index.find_specs("save"))
+        self.assertEqual(["_TestRuleA", "_TestRuleB"], self.index.get_owners("close [tab]"))
@@ -0,0 +1,59 @@
+from unittest import TestCase
+
+from dragonfly import Choice
+
+from castervoice.lib.merge.mergerule import MergeRule
+from castervoice.lib.merge.state.actions2 import NullAction
+
+
+class _TestRuleA(MergeRule):
+    mapping = {
+        "hello <x>": NullAction(),
+        "a": NullAction()
+    }
+    extras = [Choice("x", {"one": 1})]
+    defaults = {"x": 1}
+
+
+class _TestRuleB(MergeRule):
+    mapping = {
+        "hello <x>": NullAction(),
+        "b": NullAction()
+    }
+    extras = [Choice("x", {"two": 2})]
+    defaults = {"x": 2}
+
+
+class _TestRuleC(MergeRule):
+    mapping = {
+        "c": NullAction()
+    }
+
+
+class TestMergeRule(TestCase):
+
+    def test_merge_all_empty(self):
+        self.assertIsNone(MergeRule.merge_all([]))
+
+    def test_merge_all_single(self):
+        """
+        Merging a single rule should not construct a new rule.
+        """
+        rule = _TestRuleA()
+        self.assertIs(rule, MergeRule.merge_all([rule]))
+
+    def test_merge_all_later_rules_win(self):
+        merged_rule = MergeRule.merge_all([_TestRuleA(), _TestRuleB(), _TestRuleC()])
+
+        self.assertItemsEqual(["hello <x>", "a", "b", "c"], merged_rule.get_mapping().keys())
+        self.assertEqual(2, merged_rule.get_defaults()["x"])
+        self.assertItemsEqual(["two"], merged_rule._extras["x"]._choices.keys())
+
+    def test_merge_all_matches_pairwise_merge(self):
+        rules = [_TestRuleC(), _TestRuleB(), _TestRuleA()]
+        merged_rule = MergeRule.merge_all(rules)
+        pairwise_merged_rule = rules[0].merge(rules[1]).merge(rules[2])
+
+        self.assertItemsEqual(pairwise_merged_rule.get_mapping().keys(), merged_rule.get_mapping().keys())
+        self.assertEqual(pairwise_merged_rule.get_defaults(), merged_rule.get_defaults())
+        self.assertEqual(pairwise_merged_rule._extras["x"]._choices, merged_rule._extras["x"]._choices)
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from dragonfly import Choice, Compound, MappingRule
+from dragonfly.parsing.parse import ParseError
+from mock import patch
+
+from castervoice.lib.merge import spec_cache
+from castervoice.lib.merge.spec_cache import SpecCache
+from castervoice.lib.merge.state.actions2 import NullAction
+
+
+class TestSpecCache(TestCase):
+
+    def setUp(self):
+        self.spec_cache = SpecCache(3)
+        self.extras = {"x": Choice("x", {"one": 1, "two": 2})}
+
+    def test_create_compound_matches_compound(self):
+        spec = "hello [there] <x> (a | b)"
+        compound = Compound(spec, elements=self.extras, value=NullAction())
+        cached_compound = self.spec_cache.create_compound(spec, self.extras, NullAction())
+
+        self.assertEqual(compound.gstring(), cached_compound.gstring())
+
+    def test_cached_compound_is_compatible(self):
+        self.assertTrue(spec_cache._is_cached_compound_compatible())
+
+    def test_incompatible_dragonfly_uses_plain_compounds(self):
+        with patch.object(spec_cache, "_COMPOUND_INIT_ARGS", ("self", "spec")):
+            self.spec_cache = SpecCache(3)
+        compound = self.spec_cache.create_compound("hello <x>", self.extras, NullAction())
+
+        self.assertIs(Compound, type(compound))
+        self.assertIn("element trees 0 hits / 0 misses", self.spec_cache.get_stats_report())
+
+    def test_create_element_matches_mapping_rule(self):
+        mapping = {"hello <x>": NullAction(), "goodbye": NullAction()}
+        rule = MappingRule(mapping=mapping, extras=self.extras.values())
+        element = self.spec_cache.create_element(mapping, self.extras)
+
+        self.assertEqual(rule.element.gstring(), element.gstring())
+
+    def test_reuse_with_same_extras(self):
+        first = self.spec_cache.create_compound("hello <x>", self.extras, NullAction())
+        second = self.spec_cache.create_compound("hello <x>", self.extras, NullAction())
+
+        self.assertIs(first.children[0], second.children[0])
+        self.assertIn("element trees 1 hits / 1 misses", self.spec_cache.get_stats_report())
+
+    def test_no_reuse_with_different_extras(self):
+        other_extras = {"x": Choice("x", {"three": 3})}
+        first = self.spec_cache.create_compound("hello <x>", self.extras, NullAction())
+        second = self.spec_cache.create_compound("hello <x>", other_extras, NullAction())
+
+        self.assertIsNot(first.children[0], second.children[0])
+        self.assertIn("three", second.gstring())
+        self.assertIn("parse trees 1 hits / 1 misses", self.spec_cache.get_stats_report())
+
+    def test_unreferenced_extras_do_not_matter(self):
+        other_extras = dict(self.extras)
+        other_extras["y"] = Choice("y", {"three": 3})
+        first = self.spec_cache.create_compound("hello <x>", self.extras, NullAction())
+        second = self.spec_cache.create_compound("hello <x>", other_extras, NullAction())
+
+        self.assertIs(first.children[0], second.children[0])
+
+    def test_eviction(self):
+        for spec in ["a", "b", "c", "d"]:
+            self.spec_cache.create_compound(spec, {}, NullAction())
+        self.spec_cache.create_compound("a", {}, NullAction())
+
+        self.assertIn("element trees 0 hits / 5 misses (3 cached)", self.spec_cache.get_stats_report())
+
+    def test_missing_extra(self):
+        self.assertRaises(ParseError, self.spec_cache.create_compound, "hello <y>", self.extras, NullAction())
@@ -41,3 +41,16 @@ class TestBiDiGraph(TestCase):
             values.extend(n[1])
         self.assertItemsEqual(["a", "b", "c"], keys)
         self.assertItemsEqual(["a", "a", "b", "b", "c", "c"], values)
+
+    def test_remove(self):
+        """
+        Tests that removing a node also removes its connections.
+        """
+        graph = BiDiGraph()
+        graph.add("a", "b")
+        graph.add("a", "c")
+        graph.remove("a")
+        graph.remove("z")
+        self.assertItemsEqual([], graph.get_node("a"))
+        self.assertItemsEqual([], graph.get_node("b"))
+        self.assertItemsEqual([], graph.get_node("c"))
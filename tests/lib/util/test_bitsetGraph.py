@@ -0,0 +1,53 @@
+from unittest import TestCase
+
+from castervoice.lib.util.bitset_graph import BitsetGraph
+
+
+class TestBitsetGraph(TestCase):
+    def test_get_node(self):
+        """
+        Tests that each node added is connected to the other
+        nodes added with it, but not nodes added separately.
+        """
+        graph = BitsetGraph()
+        graph.add("a", "b")
+        graph.add("a", "c", "d")
+        self.assertItemsEqual(["b", "c", "d"], graph.get_node("a"))
+        self.assertItemsEqual(["a"], graph.get_node("b"))
+        self.assertItemsEqual(["a", "d"], graph.get_node("c"))
+        self.assertItemsEqual([], graph.get_node("z"))
+
+    def test_get_all_nodes(self):
+        graph = BitsetGraph()
+        graph.add("a", "b", "c")
+        graph.add("d")
+        nodes = dict(graph.get_all_nodes())
+        self.assertItemsEqual(["a", "b", "c", "d"], nodes.keys())
+        self.assertItemsEqual(["b", "c"], nodes["a"])
+        self.assertItemsEqual([], nodes["d"])
+
+    def test_remove(self):
+        """
+        Tests that removing a node also removes its connections.
+        """
+        graph = BitsetGraph()
+        graph.add("a", "b")
+        graph.add("a", "c")
+        graph.remove("a")
+        graph.remove("z")
+        self.assertItemsEqual([], graph.get_node("a"))
+        self.assertItemsEqual([], graph.get_node("b"))
+        self.assertItemsEqual([], graph.get_node("c"))
+
+    def test_reuse_removed_node_id(self):
+        """
+        A node added after a removal may get the removed node's id,
+        but none of its connections.
+        """
+        graph = BitsetGraph()
+        graph.add("a", "b")
+        graph.remove("a")
+        graph.add("c", "d")
+        self.assertItemsEqual([], graph.get_node("b"))
+        self.assertItemsEqual(["d"], graph.get_node("c"))
+        self.assertItemsEqual(["c"], graph.get_node("d"))